@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Streamed MP3 Transcoding
+========================
+
+Audio-only downloads normally write the whole source file (Opus/WebM or
+M4A) to disk, then FFmpeg reads it back and encodes the MP3. In streaming
+mode the downloaded bytes are piped straight into FFmpeg's stdin, so the
+MP3 is encoded while the download runs and the source is never stored.
+
+Features:
+- One network pass and one disk write per MP3
+- Chunked HTTP requests (as yt-dlp does for YouTube), resumed after network errors
+- yt-dlp progress hooks keep working (progress, bandwidth limit, cancellation)
+- FFmpeg runs with the active FFmpegManager's threads, priority and stats, outside
+  its process limit (the encoder waits on the network most of the time)
+- Falls back to the normal download + FFmpegExtractAudio path for formats
+  that can't be piped (HLS/DASH fragments) or when the stream fails
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import time
+import functools
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import network_exceptions
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP
+from yt_dlp.utils import DownloadCancelled, Popen, replace_extension
+
+from ffmpeg_manager import active_manager
+
+
+# Protocols whose bytes arrive in file order from a single URL
+STREAMABLE_PROTOCOLS = ('http', 'https')
+
+# Read size when the options don't set one
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+@contextmanager
+def _piped(cmd: List[str], **kwargs) -> Iterator[Popen]:
+    """FFmpegManager.piped without a manager: wait for the process when the block ends"""
+    process = Popen(cmd, **kwargs)
+    try:
+        yield process
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        process.wait()
+
+
+class StreamError(Exception):
+    """The stream can't continue (e.g. the server can't resume); fall back to a normal download"""
+
+
+class StreamingMP3PP(FFmpegExtractAudioPP):
+    """
+    FFmpegExtractAudioPP (MP3) that can also encode during the download.
+    FinalizingYoutubeDL calls stream() in place of the normal download;
+    run() then only renames the finished MP3. Files downloaded the normal
+    way are converted exactly like FFmpegExtractAudioPP does.
+    """
+
+    def __init__(self, downloader=None, preferredquality: str = '192'):
+        super().__init__(downloader, preferredcodec='mp3', preferredquality=preferredquality)
+
+    @staticmethod
+    def stream_blocker(info: Dict) -> Optional[str]:
+        """
+        Check whether a selected format can be piped into FFmpeg.
+
+        Args:
+            info (dict): Info dict of the format about to be downloaded
+
+        Returns:
+            Optional[str]: None if it can, otherwise the reason why not
+        """
+        if info.get('requested_formats'):
+            return 'separate formats to merge'
+        protocol = info.get('protocol') or 'https'
+        if protocol not in STREAMABLE_PROTOCOLS:
+            return f'{protocol} fragments need reassembly'
+        if info.get('fragments'):
+            return 'fragmented format'
+        if not info.get('url'):
+            return 'no media URL'
+        return None
+
+    def _hook_progress(self, status: Dict, info: Dict) -> None:
+        """Report to the downloader's progress hooks, like a yt-dlp file downloader"""
+        status['info_dict'] = info
+        for hook in self._downloader._progress_hooks:
+            hook(status)
+
+    def _pipe(self, info: Dict, stdin, name: str, temp_path: str) -> int:
+        """
+        Download the format into FFmpeg's stdin.
+
+        Returns:
+            int: Bytes downloaded
+
+        Raises:
+            StreamError: If the download can't continue where it stopped
+        """
+        ydl = self._downloader
+        chunk_size = (info.get('downloader_options') or {}).get('http_chunk_size')
+        buffer_size = ydl.params.get('buffersize') or DEFAULT_BUFFER_SIZE
+        retries = ydl.params.get('retries', 3)
+        total = info.get('filesize')
+        downloaded = 0
+        errors = 0
+        started = time.monotonic()
+
+        while total is None or downloaded < total:
+            headers = dict(info.get('http_headers') or {})
+            if chunk_size or downloaded:
+                end = downloaded + chunk_size - 1 if chunk_size else ''
+                headers['Range'] = f'bytes={downloaded}-{end}'
+            received = 0
+            try:
+                with ydl.urlopen(Request(info['url'], headers=headers)) as response:
+                    whole_file = response.status != 206
+                    if whole_file and downloaded:
+                        raise StreamError("the server can't resume the stream")
+                    content_range = response.headers.get('Content-Range') or ''
+                    if content_range.rpartition('/')[2].isdigit():
+                        total = int(content_range.rpartition('/')[2])
+                    elif whole_file and (response.headers.get('Content-Length') or '').isdigit():
+                        total = int(response.headers['Content-Length'])
+
+                    while True:
+                        block = response.read(buffer_size)
+                        if not block:
+                            break
+                        stdin.write(block)
+                        received += len(block)
+                        downloaded += len(block)
+                        elapsed = time.monotonic() - started
+                        self._hook_progress({
+                            'status': 'downloading',
+                            'filename': name,
+                            'tmpfilename': temp_path,
+                            'downloaded_bytes': downloaded,
+                            'total_bytes': total,
+                            'elapsed': elapsed,
+                            'speed': downloaded / elapsed if elapsed > 0 else None,
+                        }, info)
+            except (StreamError, BrokenPipeError):
+                raise
+            except (OSError, *network_exceptions) as err:
+                # Network error: resume where the stream stopped
+                errors += 1
+                if errors > retries:
+                    raise
+                self.report_warning(f'{err}; resuming the stream at byte {downloaded} ({errors}/{retries})')
+                continue
+
+            if total is None:
+                if whole_file or not chunk_size or received < chunk_size:
+                    break
+            elif received == 0:
+                raise StreamError(f'the stream stopped at byte {downloaded} of {total}')
+        return downloaded
+
+    def stream(self, name: str, info: Dict) -> bool:
+        """
+        Download a format through FFmpeg into an MP3 at the download's path.
+
+        Args:
+            name (str): File the download would have been written to
+            info (dict): Info dict of the format (changed in place on success)
+
+        Returns:
+            bool: True if the MP3 was written; False if the caller should
+            download the file normally
+
+        Raises:
+            DownloadCancelled: If a progress hook cancelled the download
+        """
+        # Same temporary name as yt-dlp's downloaders, so progress hooks see the usual names
+        temp_path = f'{name}.part'
+        cmd = [self.executable, '-y', '-loglevel', 'error', '-i', 'pipe:0', '-vn',
+               '-c:a', 'libmp3lame', *self._quality_args('libmp3lame'), '-f', 'mp3',
+               self._ffmpeg_filename_argument(temp_path)]
+        self.to_screen(f'Encoding format {info.get("format_id")} while downloading; Destination: {name}')
+        self.write_debug(f'ffmpeg command line: {" ".join(cmd)}')
+
+        # Thread budget, priority and stats of the active FFmpeg manager. The run lasts as
+        # long as the download, so it doesn't take one of the manager's process slots
+        manager = active_manager()
+        start = functools.partial(manager.piped, limited=False) if manager is not None else _piped
+        with tempfile.TemporaryFile() as stderr:
+            try:
+                broken_pipe = None
+                with start(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr) as process:
+                    try:
+                        downloaded = self._pipe(info, process.stdin, name, temp_path)
+                    except BrokenPipeError as err:
+                        # FFmpeg stopped reading; its own message says why
+                        broken_pipe = err
+                    finally:
+                        try:
+                            process.stdin.close()
+                        except BrokenPipeError:
+                            pass
+                if process.returncode != 0:
+                    stderr.seek(0)
+                    message = stderr.read().decode('utf-8', 'replace').strip().splitlines()
+                    raise StreamError(message[-1] if message else f'FFmpeg exited with code {process.returncode}')
+                if broken_pipe is not None:
+                    raise broken_pipe
+            except DownloadCancelled:
+                self._discard(temp_path)
+                raise
+            except Exception as err:
+                self._discard(temp_path)
+                self.report_warning(f'Streaming failed ({err}); downloading the file first')
+                return False
+            except BaseException:
+                self._discard(temp_path)
+                raise
+
+        os.replace(temp_path, name)
+        self._hook_progress({
+            'status': 'finished',
+            'filename': name,
+            'downloaded_bytes': downloaded,
+            'total_bytes': downloaded,
+        }, info)
+        # The file is an MP3 now: no container fixups, and run() only renames it
+        info.pop('container', None)
+        info['__mp3_streamed'] = True
+        return True
+
+    @staticmethod
+    def _discard(temp_path: str) -> None:
+        """Remove FFmpeg's partial output"""
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        if not info.pop('__mp3_streamed', False):
+            return super().run(info)
+
+        # Same name FFmpegExtractAudioPP would give the MP3
+        path = info['filepath']
+        new_path = replace_extension(path, 'mp3', info['ext'])
+        if new_path != path:
+            os.replace(path, new_path)
+        info.update(filepath=new_path, ext='mp3', acodec='mp3', vcodec='none')
+        return [], info
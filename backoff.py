@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Shared Rate-Limit Backoff
+=========================
+
+Coordinates all download workers when YouTube starts rate limiting
+(HTTP 429 / Too Many Requests). Instead of every worker retrying on its
+own and escalating the block, the first rate-limit signal pauses new
+requests for everyone; afterwards workers are let back in one at a time.
+
+Features:
+- Exponential backoff with jitter, shared by all workers
+- yt-dlp's own retries (HTTP, fragments, extractors) sleep until the pause ends
+- Checked before every video and playlist entry, so long playlist tasks pause too
+- Gradual resume: waiting workers are admitted a few seconds apart
+- Metrics: pauses, time backed off and time workers spent waiting
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import time
+import random
+import threading
+from typing import Callable, Dict
+
+from concurrency import is_rate_limit_error
+
+
+class BackoffCoordinator:
+    """
+    Process-wide pause shared by all download workers. Feed it yt-dlp
+    messages (record_message) and call wait() before starting a request.
+    """
+
+    def __init__(self, base_delay: float = 10.0, max_delay: float = 600.0, jitter: float = 0.25,
+                 resume_spacing: float = 3.0, reset_after: float = 900.0,
+                 log: Callable[[str], None] = print):
+        """
+        Args:
+            base_delay (float): First pause in seconds
+            max_delay (float): Longest pause; each new rate limit doubles the pause up to this
+            jitter (float): Random spread of each pause (0.25 = +/-25%)
+            resume_spacing (float): Seconds between workers admitted after a pause
+            reset_after (float): Seconds without rate limits after which the pause
+                length starts from base_delay again
+            log (Callable): Receives one line per pause
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.resume_spacing = resume_spacing
+        self.reset_after = reset_after
+        self.log = log
+
+        self.pauses = 0
+        self.backoff_time = 0.0   # Wall-clock seconds spent paused
+        self.waited_time = 0.0    # Seconds workers spent blocked, summed over workers
+        self.longest_pause = 0.0
+
+        self._condition = threading.Condition()
+        self._delay = base_delay
+        self._paused_until = 0.0
+        self._resume_until = 0.0
+        self._next_admission = 0.0
+        self._last_signal = None
+        self._admitted = threading.local()  # .pause: pause the thread was last admitted after
+
+    # ----------------------------------------------------------------
+    # Signals
+    # ----------------------------------------------------------------
+
+    def record_message(self, message: str) -> None:
+        """Inspect a yt-dlp warning or error; rate-limit messages trigger a pause"""
+        if is_rate_limit_error(message):
+            self.rate_limited()
+
+    def rate_limited(self) -> None:
+        """Pause all workers (unless a pause is already running)"""
+        with self._condition:
+            now = time.monotonic()
+            if now < self._paused_until:
+                # Other requests that were already in flight; same incident
+                return
+            if self._last_signal is not None and now - self._last_signal > self.reset_after:
+                self._delay = self.base_delay
+            elif self.pauses:
+                self._delay = min(self.max_delay, self._delay * 2)
+            self._last_signal = now
+
+            pause = self._delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._paused_until = now + pause
+            self._resume_until = self._paused_until + max(self.resume_spacing, pause / 2)
+            self._next_admission = self._paused_until
+            self.pauses += 1
+            self.backoff_time += pause
+            self.longest_pause = max(self.longest_pause, pause)
+            self._condition.notify_all()
+        self.log(f"🛑 Rate limited (HTTP 429): pausing all workers for {pause:.0f}s (backoff #{self.pauses})")
+
+    # ----------------------------------------------------------------
+    # Gates
+    # ----------------------------------------------------------------
+
+    def remaining(self) -> float:
+        """Seconds left in the current pause (0 when not paused)"""
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def wait(self) -> float:
+        """
+        Block while paused; right after a pause, admit callers one at a time.
+
+        Returns:
+            float: Seconds waited
+        """
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    # Woken early if the pause is extended
+                    self._condition.wait(self._paused_until - now)
+                    continue
+                if now < self._resume_until:
+                    if getattr(self._admitted, 'pause', None) == self.pauses:
+                        # Already let back in; the worker's next entries don't queue again
+                        admission = now
+                        break
+                    self._admitted.pause = self.pauses
+                    admission = max(now, self._next_admission)
+                    self._next_admission = admission + self.resume_spacing
+                    break
+                admission = now
+                break
+        if admission > now:
+            time.sleep(admission - now)
+
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            with self._condition:
+                self.waited_time += waited
+        return waited
+
+    def retry_sleep(self, n: int) -> float:
+        """
+        yt-dlp retry_sleep_functions entry: in-flight retries sleep until the
+        shared pause ends (plus jitter), other retries don't sleep.
+
+        Args:
+            n (int): Retry attempt (0-based)
+
+        Returns:
+            float: Seconds to sleep before the retry
+        """
+        remaining = self.remaining()
+        if not remaining:
+            return 0.0
+        delay = remaining + random.uniform(0, self.resume_spacing)
+        with self._condition:
+            self.waited_time += delay
+        return delay
+
+    def apply(self, ydl_opts: Dict) -> Dict:
+        """
+        Make yt-dlp's retries follow the shared pause, gate every video and
+        playlist entry on it, and feed it yt-dlp's warnings and errors
+        (options of remux.FinalizingYoutubeDL).
+
+        Args:
+            ydl_opts (dict): yt-dlp options, changed in place
+
+        Returns:
+            dict: The same options
+        """
+        ydl_opts['retry_sleep_functions'] = {
+            'http': self.retry_sleep,
+            'fragment': self.retry_sleep,
+            'extractor': self.retry_sleep,
+        }
+        ydl_opts['entry_gate'] = self.wait
+        for option in ('warning_hooks', 'error_hooks'):
+            ydl_opts[option] = list(ydl_opts.get(option) or []) + [self.record_message]
+        return ydl_opts
+
+    def stats(self) -> Dict:
+        """
+        Get backoff metrics for the download summary.
+
+        Returns:
+            dict: pauses, backoff_time, waited_time and longest_pause (seconds)
+        """
+        with self._condition:
+            return {
+                'pauses': self.pauses,
+                'backoff_time': self.backoff_time,
+                'waited_time': self.waited_time,
+                'longest_pause': self.longest_pause,
+            }
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Global Bandwidth Limiter
+========================
+
+Caps the combined download rate of every worker thread and worker process
+with one shared token bucket, instead of yt-dlp's per-download ratelimit
+(which multiplies with the number of workers).
+
+Features:
+- Token bucket in shared memory, usable from threads and worker processes
+- Throttles through a yt-dlp progress hook, so no downloader internals change
+- Time-of-day schedules (e.g. 20% during office hours, full speed at night)
+- Limit changeable at runtime (API or a control file), running downloads
+  slow down or speed up within a second
+
+Usage:
+    python download.py --limit-rate 10M --rate-schedule "09:00-18:00=20%"
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import time
+import threading
+import multiprocessing
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from yt_dlp.utils import parse_bytes
+
+
+# Download block size while limiting; small blocks keep the throttling smooth
+LIMITED_BUFFER_SIZE = 64 * 1024
+
+# Longest single sleep, so runtime rate changes take effect quickly
+MAX_SLEEP = 1.0
+
+
+def parse_rate(value: str, base: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a bandwidth limit.
+
+    Args:
+        value (str): Bytes per second with optional K/M/G suffix ('500K', '10M'),
+            a percentage of base ('20%'), or 'off'/'unlimited'
+        base (float, optional): Limit that percentages refer to
+
+    Returns:
+        Optional[float]: Bytes per second, None for unlimited
+
+    Raises:
+        ValueError: If the value can't be parsed
+    """
+    value = value.strip()
+    if value.lower() in ('off', 'none', 'unlimited', '0'):
+        return None
+    if value.endswith('%'):
+        if base is None:
+            raise ValueError(f"'{value}' needs a base limit (--limit-rate) to be a percentage of")
+        return base * float(value[:-1]) / 100
+    rate = parse_bytes(value)
+    if rate is None:
+        raise ValueError(f"Invalid rate '{value}' (examples: 500K, 10M, 20%, off)")
+    return float(rate) or None
+
+
+# ====================================================================
+# Token Bucket
+# ====================================================================
+
+class TokenBucket:
+    """
+    Token bucket in shared memory. Downloads take tokens for the bytes they
+    received and sleep while the bucket is in debt. The same object can be
+    passed to worker processes (see process_pool.py).
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: float = 1.0):
+        """
+        Args:
+            rate (float, optional): Bytes per second, None for unlimited
+            burst (float): Seconds of full-rate traffic the bucket may save up
+        """
+        # [rate (0 = unlimited), tokens, last refill time, burst seconds]
+        self._state = multiprocessing.get_context('spawn').Array(
+            'd', [rate or 0.0, 0.0, time.monotonic(), burst])
+        self._file_bytes: Dict[str, int] = {}
+
+    def __getstate__(self) -> Dict:
+        # Per-file progress is tracked per process
+        return {'_state': self._state}
+
+    def __setstate__(self, state: Dict) -> None:
+        self._state = state['_state']
+        self._file_bytes = {}
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Current limit in bytes per second (None = unlimited)"""
+        return self._state[0] or None
+
+    def set_rate(self, rate: Optional[float]) -> None:
+        """
+        Change the limit; waiting downloads pick it up within MAX_SLEEP.
+
+        Args:
+            rate (float, optional): Bytes per second, None for unlimited
+        """
+        with self._state.get_lock():
+            self._refill()
+            self._state[0] = rate or 0.0
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill (caller holds the lock)"""
+        now = time.monotonic()
+        rate = self._state[0]
+        if rate > 0:
+            self._state[1] = min(rate * self._state[3], self._state[1] + (now - self._state[2]) * rate)
+        else:
+            self._state[1] = 0.0
+        self._state[2] = now
+
+    def consume(self, amount: int) -> float:
+        """
+        Take tokens for downloaded bytes and sleep until the bucket is out of debt.
+
+        Args:
+            amount (int): Bytes just downloaded
+
+        Returns:
+            float: Seconds slept
+        """
+        with self._state.get_lock():
+            self._refill()
+            if self._state[0] <= 0:
+                return 0.0
+            self._state[1] -= amount
+
+        slept = 0.0
+        while True:
+            with self._state.get_lock():
+                self._refill()
+                rate, tokens = self._state[0], self._state[1]
+            if rate <= 0 or tokens >= 0:
+                return slept
+            delay = min(MAX_SLEEP, -tokens / rate)
+            time.sleep(delay)
+            slept += delay
+
+    def progress_hook(self, status: Dict) -> None:
+        """yt-dlp progress hook: throttle by the bytes received since the last call"""
+        if status.get('status') not in ('downloading', 'finished'):
+            return
+        filename = status.get('tmpfilename') or status.get('filename')
+        downloaded = status.get('downloaded_bytes')
+        if not filename or downloaded is None:
+            return
+        if status['status'] == 'finished':
+            # Reported under the final name; its bytes were counted while downloading
+            self._file_bytes.pop(filename, None)
+            self._file_bytes.pop(filename + '.part', None)
+            return
+        previous = self._file_bytes.get(filename, 0)
+        self._file_bytes[filename] = downloaded
+        if downloaded > previous:
+            self.consume(downloaded - previous)
+
+    def apply(self, ydl_opts: Dict) -> Dict:
+        """
+        Add the throttling hook (and a small, fixed block size) to yt-dlp options.
+
+        Args:
+            ydl_opts (dict): yt-dlp options, changed in place
+
+        Returns:
+            dict: The same options
+        """
+        ydl_opts['progress_hooks'] = list(ydl_opts.get('progress_hooks') or []) + [self.progress_hook]
+        ydl_opts['buffersize'] = LIMITED_BUFFER_SIZE
+        ydl_opts['noresizebuffer'] = True
+        return ydl_opts
+
+
+# ====================================================================
+# Schedules and Runtime Control
+# ====================================================================
+
+def parse_schedule(spec: str, base: Optional[float] = None) -> List[Tuple[int, int, Optional[float]]]:
+    """
+    Parse a time-of-day schedule.
+
+    Args:
+        spec (str): Comma-separated 'HH:MM-HH:MM=RATE' windows in local time,
+            e.g. '09:00-18:00=20%,18:00-23:00=5M'. Windows may wrap past midnight
+        base (float, optional): Limit that percentages refer to
+
+    Returns:
+        List[Tuple[int, int, Optional[float]]]: (start minute, end minute, bytes per second)
+
+    Raises:
+        ValueError: If the spec can't be parsed
+    """
+    windows = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            period, rate = part.split('=', 1)
+            start, end = (datetime.strptime(t.strip(), '%H:%M') for t in period.split('-', 1))
+        except ValueError:
+            raise ValueError(f"Invalid schedule window '{part}' (expected HH:MM-HH:MM=RATE)")
+        windows.append((start.hour * 60 + start.minute, end.hour * 60 + end.minute, parse_rate(rate, base)))
+    return windows
+
+
+class BandwidthGovernor:
+    """
+    Keeps a TokenBucket at the limit that applies right now: the runtime
+    override if one is set, else the active schedule window, else the base limit.
+    """
+
+    def __init__(self, bucket: TokenBucket, limit: Optional[float] = None,
+                 schedule: Optional[List[Tuple[int, int, Optional[float]]]] = None,
+                 control_file: Optional[str] = None, interval: float = 5.0,
+                 log: Callable[[str], None] = print):
+        """
+        Args:
+            bucket (TokenBucket): Bucket shared by all downloads
+            limit (float, optional): Base limit in bytes per second, None for unlimited
+            schedule (list, optional): Windows from parse_schedule
+            control_file (str, optional): File holding a runtime limit ('2M', '50%', 'off');
+                re-read every interval. New contents replace the current override (empty
+                contents clear it); an unchanged or missing file leaves it alone
+            interval (float): Seconds between checks
+            log (Callable): Receives a line whenever the limit changes
+        """
+        self.bucket = bucket
+        self.limit = limit
+        self.schedule = schedule or []
+        self.control_file = control_file
+        self.interval = interval
+        self.log = log
+        self._override = None  # (rate,) when set at runtime
+        self._control_value = None  # Control file contents last applied
+        self._stop = threading.Event()
+        self._thread = None
+        if self.control_file:
+            self._read_control_file()
+        self.bucket.set_rate(self.current_limit())
+
+    def set_limit(self, rate: Optional[float]) -> None:
+        """
+        Override the schedule at runtime; running downloads adapt within a second.
+
+        Args:
+            rate (float, optional): Bytes per second, None for unlimited
+        """
+        self._override = (rate,)
+        self.update()
+
+    def clear_override(self) -> None:
+        """Return to the schedule / base limit"""
+        self._override = None
+        self.update()
+
+    def current_limit(self, now: Optional[datetime] = None) -> Optional[float]:
+        """
+        Get the limit that applies now.
+
+        Args:
+            now (datetime, optional): Local time. Defaults to now
+
+        Returns:
+            Optional[float]: Bytes per second, None for unlimited
+        """
+        if self._override is not None:
+            return self._override[0]
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, rate in self.schedule:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                return rate
+        return self.limit
+
+    def _read_control_file(self) -> None:
+        """Apply the runtime limit from the control file if its contents changed"""
+        try:
+            with open(self.control_file, 'r', encoding='utf-8') as f:
+                value = f.read().strip()
+        except OSError:
+            # Missing: keep the current limit, including one from set_limit()
+            return
+        if value == self._control_value:
+            return
+        self._control_value = value
+        if not value:
+            self._override = None
+            return
+        try:
+            self._override = (parse_rate(value, self.limit),)
+        except ValueError as e:
+            self.log(f"⚠️  Ignoring {self.control_file}: {e}")
+
+    def update(self) -> None:
+        """Re-evaluate the limit and apply it to the bucket if it changed"""
+        if self.control_file:
+            self._read_control_file()
+        rate = self.current_limit()
+        if rate != self.bucket.rate:
+            self.bucket.set_rate(rate)
+            self.log(f"🚦 Bandwidth limit: {format_rate(rate)}")
+
+    def _run(self) -> None:
+        """Governor thread: follow the schedule and control file"""
+        while not self._stop.wait(self.interval):
+            self.update()
+
+    def start(self) -> None:
+        """Start following the schedule and control file in a background thread"""
+        if self.schedule or self.control_file:
+            self._thread = threading.Thread(target=self._run, name='bandwidth-governor', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the governor thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def format_rate(rate: Optional[float]) -> str:
+    """
+    Format a limit for messages.
+
+    Args:
+        rate (float, optional): Bytes per second
+
+    Returns:
+        str: e.g. '2.0 MB/s' or 'unlimited'
+    """
+    if not rate:
+        return 'unlimited'
+    if rate >= 1024 * 1024:
+        return f"{rate / (1024 * 1024):.1f} MB/s"
+    return f"{rate / 1024:.0f} KB/s"
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Fragment Concurrency Benchmark
+==============================
+
+Measures how concurrent fragment downloads speed up HLS downloads. A local
+HTTP server serves an HLS playlist of synthetic fragments, each delayed by
+an injected latency, so the run shows the effect of per-request latency
+without touching YouTube.
+
+Features:
+- Fixed fragment concurrency levels for a single video
+- Several simultaneous videos, fragment concurrency 1 vs auto mode
+  (fair share of a global connection budget)
+- No FFmpeg needed (native HLS downloader, fixups disabled)
+
+Usage:
+    python benchmark_fragments.py --fragments 40 --latency 0.1
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from yt_dlp import YoutubeDL
+
+from fragments import FragmentBudget
+
+
+# ====================================================================
+# Synthetic HLS Server
+# ====================================================================
+
+def make_handler(fragment_count: int, fragment_size: int, latency: float):
+    """
+    Build a request handler serving /<video>.m3u8 and its fragments.
+
+    Args:
+        fragment_count (int): Fragments per playlist
+        fragment_size (int): Bytes per fragment
+        latency (float): Seconds each fragment request waits before responding
+
+    Returns:
+        type: BaseHTTPRequestHandler subclass
+    """
+    payload = os.urandom(fragment_size)
+
+    class SyntheticHLSHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, content_type: str, body: bytes) -> None:
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            name = self.path.lstrip('/')
+            if name.endswith('.m3u8'):
+                video = name[:-len('.m3u8')]
+                lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+                for index in range(fragment_count):
+                    lines += ['#EXTINF:2.0,', f'{video}-{index}.ts']
+                lines.append('#EXT-X-ENDLIST')
+                self._send('application/vnd.apple.mpegurl', '\n'.join(lines).encode())
+            elif name.endswith('.ts'):
+                time.sleep(latency)
+                self._send('video/mp2t', payload)
+            else:
+                self.send_error(404)
+
+    return SyntheticHLSHandler
+
+
+def start_server(fragment_count: int, fragment_size: int, latency: float) -> ThreadingHTTPServer:
+    """
+    Start the synthetic HLS server on a free local port.
+
+    Returns:
+        ThreadingHTTPServer: Running server (call shutdown() when done)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(fragment_count, fragment_size, latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='benchmark-server', daemon=True).start()
+    return server
+
+
+# ====================================================================
+# Benchmark Runs
+# ====================================================================
+
+def download(url: str, output_dir: str, fragment_downloads: int) -> None:
+    """Download one synthetic HLS video with the given fragment concurrency"""
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'fixup': 'never',
+        'outtmpl': os.path.join(output_dir, '%(id)s.%(ext)s'),
+        'concurrent_fragment_downloads': fragment_downloads,
+    }
+    with YoutubeDL(ydl_opts) as ydl:
+        ydl.download([url])
+
+
+def run_videos(base_url: str, videos: int, budget: FragmentBudget) -> float:
+    """
+    Download several videos at once, each with concurrency from the budget.
+
+    Returns:
+        float: Wall time in seconds
+    """
+    output_dir = tempfile.mkdtemp(prefix='fragment-benchmark-')
+
+    def job(index: int) -> None:
+        with budget.job() as fragment_downloads:
+            download(f'{base_url}/video{index}.m3u8', output_dir, fragment_downloads)
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=videos) as executor:
+            list(executor.map(job, range(videos)))
+        return time.monotonic() - started
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_benchmark(fragment_count: int = 40, fragment_size: int = 256 * 1024, latency: float = 0.1,
+                  levels: Optional[List[int]] = None, videos: int = 4, budget: int = 16) -> Dict:
+    """
+    Run the fixed-level and multi-video benchmarks.
+
+    Args:
+        fragment_count (int): Fragments per video
+        fragment_size (int): Bytes per fragment
+        latency (float): Injected latency per fragment request (seconds)
+        levels (List[int], optional): Fragment concurrency levels for the single-video run
+        videos (int): Simultaneous videos for the budget run
+        budget (int): Connection budget for auto mode
+
+    Returns:
+        dict: {'single': {level: seconds}, 'multi': {'fixed-1': seconds, 'auto': seconds}}
+    """
+    server = start_server(fragment_count, fragment_size, latency)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    results = {'single': {}, 'multi': {}}
+    try:
+        for level in levels or [1, 2, 4, 8]:
+            results['single'][level] = run_videos(base_url, 1, FragmentBudget(fixed=level))
+        results['multi']['fixed-1'] = run_videos(base_url, videos, FragmentBudget(fixed=1))
+        auto = FragmentBudget(budget=budget, expected_jobs=videos)
+        results['multi']['auto'] = run_videos(base_url, videos, auto)
+        results['multi']['auto_peak_connections'] = auto.peak
+    finally:
+        server.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent fragment downloads against a local HLS server")
+    parser.add_argument('--fragments', type=int, default=40, help="fragments per video (default: 40)")
+    parser.add_argument('--size', type=int, default=256, help="KiB per fragment (default: 256)")
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds of latency per fragment (default: 0.1)")
+    parser.add_argument('--videos', type=int, default=4, help="simultaneous videos in the budget run (default: 4)")
+    parser.add_argument('--budget', type=int, default=16, help="connection budget in auto mode (default: 16)")
+    args = parser.parse_args()
+
+    print(f"🧪 {args.fragments} fragments x {args.size} KiB per video, {args.latency * 1000:.0f} ms latency each")
+    results = run_benchmark(args.fragments, args.size * 1024, args.latency, videos=args.videos, budget=args.budget)
+
+    mib = args.fragments * args.size / 1024
+    print("\n📊 One video:")
+    baseline = results['single'][1]
+    for level, seconds in results['single'].items():
+        print(f"   {level:>2} fragment(s) at once: {seconds:6.2f}s  {mib / seconds:7.1f} MiB/s  "
+              f"x{baseline / seconds:.1f}")
+
+    multi = results['multi']
+    print(f"\n📊 {args.videos} videos at once:")
+    print(f"   1 fragment per video:   {multi['fixed-1']:6.2f}s")
+    print(f"   auto (budget {args.budget}):      {multi['auto']:6.2f}s  "
+          f"x{multi['fixed-1'] / multi['auto']:.1f}, peak {multi['auto_peak_connections']} connections")
+
+
+if __name__ == "__main__":
+    main()
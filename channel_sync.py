@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Incremental Channel Sync
+========================
+
+Per-channel high-water marks so that repeated runs of a channel URL only
+touch uploads that appeared since the last successful sync.
+
+Features:
+- SQLite store of the most recent synced video IDs and upload date per channel
+  (dates come from the finished downloads, since flat entries carry none)
+- yt-dlp match filter that stops enumeration at already-synced content
+- Channel tabs (Videos, Shorts, Live) are synced independently
+- New/skipped counts for the download summary
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import json
+import time
+import sqlite3
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional
+
+from yt_dlp.utils import RejectedVideoReached
+
+from metadata_cache import get_data_dir
+
+
+# Number of newest video IDs remembered per channel. Several are kept so
+# that deleting the newest upload doesn't make the next sync run to the end.
+RECENT_IDS_KEPT = 50
+
+
+# ====================================================================
+# Watermark Storage
+# ====================================================================
+
+class ChannelSyncState:
+    """
+    SQLite-backed per-channel watermarks, safe to share between threads
+    and processes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(get_data_dir(), 'channel_sync.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller must hold the lock)"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS channels ('
+                ' channel TEXT PRIMARY KEY,'
+                ' recent_ids TEXT NOT NULL,'
+                ' upload_date TEXT,'
+                ' synced_count INTEGER NOT NULL,'
+                ' updated REAL NOT NULL)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, channel: str) -> Optional[Dict]:
+        """
+        Get the watermark of a channel.
+
+        Args:
+            channel (str): Channel key (canonical channel URL)
+
+        Returns:
+            Optional[dict]: recent_ids, upload_date and synced_count,
+            or None if the channel was never synced
+        """
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT recent_ids, upload_date, synced_count FROM channels WHERE channel = ?',
+                (channel,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'recent_ids': json.loads(row[0]),
+            'upload_date': row[1],
+            'synced_count': row[2],
+        }
+
+    def update(self, channel: str, new_ids: List[str], upload_date: Optional[str]) -> None:
+        """
+        Move a channel's watermark forward.
+
+        Args:
+            channel (str): Channel key (canonical channel URL)
+            new_ids (List[str]): Newly synced video IDs, newest first
+            upload_date (str, optional): Newest upload date seen (YYYYMMDD)
+        """
+        previous = self.get(channel) or {'recent_ids': [], 'upload_date': None, 'synced_count': 0}
+        recent_ids = list(dict.fromkeys(new_ids + previous['recent_ids']))[:RECENT_IDS_KEPT]
+        newest_date = max(filter(None, [upload_date, previous['upload_date']]), default=None)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO channels (channel, recent_ids, upload_date, synced_count, updated) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (channel, json.dumps(recent_ids), newest_date,
+                 previous['synced_count'] + len(new_ids), time.time()))
+            conn.commit()
+
+
+# ====================================================================
+# Per-Run Sync Tracking
+# ====================================================================
+
+class ChannelSync:
+    """
+    Tracks one incremental sync of one channel.
+    Install match_filter and postprocessor_hook into the yt-dlp options, then
+    call run() with the raw (unprocessed) channel extraction result. Callers
+    that enumerate entries themselves use reached()/record_seen(). Either
+    way, finish with commit().
+    """
+
+    def __init__(self, state: ChannelSyncState, channel: str):
+        self.state = state
+        self.channel = channel
+        self.watermark = state.get(channel)
+        self.known_ids = set(self.watermark['recent_ids']) if self.watermark else set()
+        self.seen_ids = {}  # Insertion-ordered set, newest first
+        self.completed_ids = set()
+        self.skipped_ids = set()
+        self.newest_date = None
+
+    def reached(self, info_dict: Dict) -> Optional[str]:
+        """
+        Check if an entry is at or past the watermark. Entries that are
+        count as skipped in this run's summary.
+
+        Args:
+            info_dict (dict): Flat playlist entry or video info
+
+        Returns:
+            Optional[str]: Reason if this entry was synced before, else None
+        """
+        video_id = info_dict.get('id')
+        upload_date = info_dict.get('upload_date')
+
+        reason = None
+        if video_id in self.known_ids:
+            reason = f'Reached already synced video {video_id}'
+        elif (upload_date and self.watermark and self.watermark['upload_date']
+                and upload_date < self.watermark['upload_date']):
+            reason = f'Reached uploads older than {self.watermark["upload_date"]}'
+        if reason is not None and video_id:
+            self.skipped_ids.add(video_id)
+        return reason
+
+    def record_seen(self, info_dict: Dict) -> None:
+        """
+        Remember a new entry (enumeration order is newest first).
+
+        Args:
+            info_dict (dict): Flat playlist entry or video info
+        """
+        video_id = info_dict.get('id')
+        if video_id:
+            self.seen_ids.setdefault(video_id, None)
+
+    def record_completed(self, video_id: Optional[str], upload_date: Optional[str] = None) -> None:
+        """
+        Remember a video that finished downloading and post-processing.
+
+        Args:
+            video_id (str): Video ID
+            upload_date (str, optional): Upload date from the full video info (YYYYMMDD)
+        """
+        if not video_id:
+            return
+        self.completed_ids.add(video_id)
+        if upload_date and (self.newest_date is None or upload_date > self.newest_date):
+            self.newest_date = upload_date
+
+    def match_filter(self, info_dict: Dict, incomplete: bool = False) -> Optional[str]:
+        """yt-dlp match filter: stop the current tab at already-synced content"""
+        reason = self.reached(info_dict)
+        if reason is not None:
+            raise RejectedVideoReached(reason)
+        self.record_seen(info_dict)
+        return None
+
+    def postprocessor_hook(self, status: Dict) -> None:
+        """
+        yt-dlp postprocessor hook: remember which videos actually finished.
+        MoveFilesAfterDownload is the last step yt-dlp runs for every video,
+        including ones whose files already existed. Its info dict is the
+        full video info, so it also has the upload date flat entries lack.
+        """
+        if status.get('status') == 'finished' and status.get('postprocessor') == 'MoveFilesAfterDownload':
+            info_dict = status.get('info_dict') or {}
+            self.record_completed(info_dict.get('id'), info_dict.get('upload_date'))
+
+    def run(self, ydl, ie_result: Dict, prepare: Optional[Callable[[Dict], Dict]] = None) -> None:
+        """
+        Download new uploads of the channel. Call commit() afterwards to
+        advance the watermark (once post-processing has finished).
+
+        Args:
+            ydl (YoutubeDL): Downloader configured with this tracker's hooks
+            ie_result (dict): Raw channel result from extract_info(process=False)
+            prepare (Callable, optional): Applied to each tab before processing
+        """
+        for part in split_channel_tabs(ie_result):
+            if prepare is not None:
+                part = prepare(part)
+            try:
+                ydl.process_ie_result(part, download=True)
+            except RejectedVideoReached:
+                # Everything after this point in the tab was synced before
+                pass
+
+    def commit(self) -> None:
+        """Advance the stored watermark past every video that finished"""
+        new_ids = [video_id for video_id in self.seen_ids if video_id in self.completed_ids]
+        self.state.update(self.channel, new_ids, self.newest_date)
+
+    def summary(self) -> Dict:
+        """
+        Get the per-channel counts for the download summary.
+
+        Returns:
+            dict: new (downloaded this run) and skipped (reached by this run
+            but synced previously)
+        """
+        return {
+            'new': len(self.completed_ids),
+            'skipped': len(self.skipped_ids),
+        }
+
+
+def split_channel_tabs(ie_result: Dict) -> List[Dict]:
+    """
+    Split a raw channel result into separately processable parts.
+    A channel home page yields one nested playlist per tab; stopping at the
+    watermark must end only the current tab, not the whole channel.
+
+    Args:
+        ie_result (dict): Raw channel result from extract_info(process=False)
+
+    Returns:
+        List[dict]: Tab URL results, or the channel result itself
+    """
+    entries = ie_result.get('entries')
+    if ie_result.get('_type') != 'playlist' or entries is None:
+        return [ie_result]
+
+    # Peek at the first entry without enumerating a (possibly huge) generator
+    entries = iter(entries)
+    first = next(entries, None)
+    if first is None:
+        ie_result['entries'] = []
+        return [ie_result]
+
+    if first.get('_type') in ('url', 'url_transparent') and first.get('ie_key') == 'YoutubeTab':
+        return [first] + [entry for entry in entries if entry]
+
+    ie_result['entries'] = itertools.chain([first], entries)
+    return [ie_result]
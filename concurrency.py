@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Adaptive Download Concurrency
+=============================
+
+AIMD-style controller for the number of active download workers. It starts
+small, adds one worker at a time while aggregate throughput keeps improving,
+and halves the worker count on congestion signals.
+
+Features:
+- Aggregate throughput measured from yt-dlp progress hooks
+- Backs off on failed downloads, HTTP 429 responses and CPU saturation
+  (CPU used by the managed FFmpeg jobs doesn't count against downloads)
+- Hard minimum/maximum worker bounds
+- Every decision is logged (and kept in history) for tuning
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import math
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+# Messages that mean the server is rate limiting us
+RATE_LIMIT_MARKERS = ('HTTP Error 429', 'Too Many Requests')
+
+# Averaging window of the load average get_cpu_load() reads (seconds)
+LOAD_AVERAGE_WINDOW = 60.0
+
+
+def is_rate_limit_error(message: str) -> bool:
+    """
+    Check if a yt-dlp error message reports rate limiting.
+
+    Args:
+        message (str): Error message printed by yt-dlp
+
+    Returns:
+        bool: True for HTTP 429 / Too Many Requests errors
+    """
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def get_cpu_load() -> Optional[float]:
+    """
+    Get the 1-minute load average per CPU core.
+
+    Returns:
+        Optional[float]: 1.0 means every core is busy, None if unavailable (Windows)
+    """
+    if not hasattr(os, 'getloadavg'):
+        return None
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+# ====================================================================
+# AIMD Controller
+# ====================================================================
+
+class AdaptiveConcurrency:
+    """
+    Grows and shrinks the active worker count from measured throughput,
+    error rate and CPU load. Apply the decisions by passing a callback
+    (e.g. WorkQueue.set_limit) to start().
+    """
+
+    def __init__(self, min_workers: int = 1, max_workers: int = 16, interval: float = 5.0,
+                 min_gain: float = 0.05, max_error_rate: float = 0.2, max_cpu_load: float = 0.9,
+                 log: Callable[[str], None] = print,
+                 excluded_load: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            min_workers (int): Hard lower bound, also the starting worker count
+            max_workers (int): Hard upper bound
+            interval (float): Seconds between decisions
+            min_gain (float): Relative throughput gain that justifies another worker
+            max_error_rate (float): Failed share of finished downloads that triggers a decrease
+            max_cpu_load (float): Load per CPU core that triggers a decrease
+            log (Callable): Receives one line per decision
+            excluded_load (Callable, optional): Returns the CPU cores currently busy with
+                local work that fewer downloads wouldn't relieve, e.g.
+                FFmpegManager.cpu_demand; it is subtracted from the load average
+        """
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.interval = interval
+        self.min_gain = min_gain
+        self.max_error_rate = max_error_rate
+        self.max_cpu_load = max_cpu_load
+        self.log = log
+        self.excluded_load = excluded_load
+
+        self.limit = self.min_workers
+        self.history: List[Dict] = []
+
+        self._lock = threading.Lock()
+        self._file_bytes: Dict[str, int] = {}
+        self._bytes = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._rate_limited = 0
+        self._baseline = None  # Throughput before the last increase
+        self._excluded_average = 0.0  # excluded_load averaged like the load average
+        self._holds = 0
+        self._apply = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----------------------------------------------------------------
+    # Measurements (called from worker threads)
+    # ----------------------------------------------------------------
+
+    def progress_hook(self, status: Dict) -> None:
+        """yt-dlp progress hook: count bytes downloaded by all workers"""
+        if status.get('status') not in ('downloading', 'finished'):
+            return
+        filename = status.get('tmpfilename') or status.get('filename')
+        downloaded = status.get('downloaded_bytes')
+        if not filename or downloaded is None:
+            return
+        with self._lock:
+            if status['status'] == 'finished':
+                # Reported under the final name; its bytes were counted while downloading
+                self._file_bytes.pop(filename, None)
+                self._file_bytes.pop(filename + '.part', None)
+                return
+            previous = self._file_bytes.get(filename, 0)
+            if downloaded > previous:
+                self._bytes += downloaded - previous
+            self._file_bytes[filename] = downloaded
+
+    def record_error(self, message: str) -> None:
+        """Register an error message printed by yt-dlp"""
+        if is_rate_limit_error(message):
+            with self._lock:
+                self._rate_limited += 1
+
+    def record_result(self, success: bool) -> None:
+        """Register a finished download task"""
+        with self._lock:
+            if success:
+                self._succeeded += 1
+            else:
+                self._failed += 1
+
+    # ----------------------------------------------------------------
+    # Decisions
+    # ----------------------------------------------------------------
+
+    def evaluate(self, elapsed: float) -> Dict:
+        """
+        Take one AIMD decision from the measurements since the last one.
+
+        Args:
+            elapsed (float): Seconds since the last decision
+
+        Returns:
+            dict: The decision (old/new limit, reason and measurements)
+        """
+        with self._lock:
+            throughput = self._bytes / elapsed if elapsed > 0 else 0.0
+            finished = self._succeeded + self._failed
+            error_rate = self._failed / finished if finished else 0.0
+            rate_limited = self._rate_limited
+            self._bytes = self._succeeded = self._failed = self._rate_limited = 0
+        cpu_load = self._download_cpu_load(elapsed)
+
+        old_limit = self.limit
+        if rate_limited:
+            reason = f"{rate_limited} rate-limit (429) error(s)"
+            self.limit = max(self.min_workers, old_limit // 2)
+        elif error_rate > self.max_error_rate:
+            reason = f"error rate {error_rate:.0%}"
+            self.limit = max(self.min_workers, old_limit // 2)
+        elif cpu_load is not None and cpu_load > self.max_cpu_load:
+            reason = f"CPU load {cpu_load:.2f} per core"
+            self.limit = max(self.min_workers, old_limit // 2)
+        elif self._baseline is not None and throughput < self._baseline * (1 + self.min_gain):
+            # The last extra worker didn't pay off: give it back, probe again later
+            reason = "no throughput gain from the last increase"
+            self.limit = max(self.min_workers, old_limit - 1)
+        elif self._holds:
+            reason = "holding"
+            self._holds -= 1
+        else:
+            reason = "probing for more throughput"
+            self.limit = min(self.max_workers, old_limit + 1)
+
+        if self.limit > old_limit:
+            self._baseline = throughput
+        elif self.limit < old_limit:
+            self._baseline = None
+            self._holds = 3
+
+        decision = {
+            'time': time.time(),
+            'old_limit': old_limit,
+            'limit': self.limit,
+            'reason': reason,
+            'throughput': throughput,
+            'error_rate': error_rate,
+            'rate_limited': rate_limited,
+            'cpu_load': cpu_load,
+        }
+        self.history.append(decision)
+        return decision
+
+    def _download_cpu_load(self, elapsed: float) -> Optional[float]:
+        """
+        Load per core without the excluded work. The load average trails
+        the actual load by about a minute, so the excluded cores are
+        averaged over the same window before they are subtracted.
+        """
+        cpu_load = get_cpu_load()
+        if self.excluded_load is None:
+            return cpu_load
+        decay = math.exp(-max(0.0, elapsed) / LOAD_AVERAGE_WINDOW)
+        self._excluded_average = self._excluded_average * decay + self.excluded_load() * (1 - decay)
+        if cpu_load is None:
+            return None
+        return max(0.0, cpu_load - self._excluded_average / (os.cpu_count() or 1))
+
+    def _format_decision(self, decision: Dict) -> str:
+        """One log line for a decision"""
+        if decision['limit'] > decision['old_limit']:
+            arrow = '⬆️ '
+        elif decision['limit'] < decision['old_limit']:
+            arrow = '⬇️ '
+        else:
+            arrow = '⏸️ '
+        cpu = f", CPU {decision['cpu_load']:.2f}" if decision['cpu_load'] is not None else ''
+        return (f"🎛️  Workers {decision['old_limit']} → {decision['limit']} {arrow} "
+                f"({decision['reason']}; {decision['throughput'] / (1024 * 1024):.1f} MB/s, "
+                f"errors {decision['error_rate']:.0%}{cpu})")
+
+    def _run(self) -> None:
+        """Controller thread: decide every interval until stopped"""
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            decision = self.evaluate(now - last)
+            last = now
+            if decision['limit'] != decision['old_limit'] or decision['reason'] != 'holding':
+                self.log(self._format_decision(decision))
+            if self._apply is not None:
+                self._apply(self.limit)
+
+    def start(self, apply: Callable[[int], None]) -> None:
+        """
+        Start taking decisions in a background thread.
+
+        Args:
+            apply (Callable): Called with the new worker limit after every decision
+        """
+        self._apply = apply
+        apply(self.limit)
+        self.log(f"🎛️  Adaptive concurrency: starting with {self.limit} worker(s) "
+                 f"(bounds {self.min_workers}-{self.max_workers})")
+        self._thread = threading.Thread(target=self._run, name='concurrency-controller', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the controller thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
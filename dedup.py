@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+In-Run Video De-duplication
+===========================
+
+A video can show up more than once in a batch (in two playlists, or in a
+playlist and a channel). The first task for a video ID downloads it; later
+tasks for the same ID wait for that download and link or copy the
+finished file to their own location. Bandwidth and FFmpeg time are spent
+once per unique video.
+
+Features:
+- In-flight map keyed by video ID (the download archive ID)
+- Duplicates don't occupy a download worker while they wait
+- Hardlink first, then reflink (copy-on-write clone), then a plain copy
+- Statistics for the download summary
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import shutil
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+
+# Linux ioctl that clones a file's extents (Btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+
+# ====================================================================
+# Linking Files
+# ====================================================================
+
+def reflink(source: str, destination: str) -> None:
+    """
+    Clone a file copy-on-write: no data is copied until either file changes.
+
+    Args:
+        source (str): Existing file
+        destination (str): New file
+
+    Raises:
+        OSError: If the platform or filesystem can't clone files
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+
+    try:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+
+
+def link_or_copy(source: str, destination: str) -> str:
+    """
+    Make a file available at a second path as cheaply as possible.
+
+    Args:
+        source (str): Finished file
+        destination (str): Where the duplicate belongs
+
+    Returns:
+        str: 'exists', 'hardlink', 'reflink' or 'copy'
+    """
+    if os.path.exists(destination):
+        return 'exists'
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+
+    try:
+        os.link(source, destination)
+        return 'hardlink'
+    except OSError:
+        # Different filesystem, or one without hardlinks (e.g. FAT)
+        pass
+    try:
+        reflink(source, destination)
+        return 'reflink'
+    except OSError:
+        pass
+    shutil.copy2(source, destination)
+    return 'copy'
+
+
+# ====================================================================
+# De-duplication Map
+# ====================================================================
+
+class VideoDeduplicator:
+    """
+    Thread-safe map from video ID to the task downloading it.
+    The first task to claim() an ID downloads the video and publishes its
+    result; later claims get a future for that result.
+    """
+
+    def __init__(self):
+        self.duplicates = 0
+        self.methods: Dict[str, int] = {}
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Future] = {}
+
+    def claim(self, video_id: str) -> Optional[Future]:
+        """
+        Claim a video for download.
+
+        Args:
+            video_id (str): Video key (e.g. "youtube dQw4w9WgXcQ")
+
+        Returns:
+            Optional[Future]: None if the caller should download the video, otherwise
+            a future for the first task's result dict (None if that task crashed)
+        """
+        with self._lock:
+            owner = self._owners.get(video_id)
+            if owner is None:
+                self._owners[video_id] = Future()
+                return None
+            self.duplicates += 1
+            return owner
+
+    def finish(self, video_id: str, result: Optional[Dict]) -> None:
+        """
+        Publish the downloading task's final result to the duplicates.
+
+        Args:
+            video_id (str): Key passed to claim()
+            result (dict, optional): Final task result; None if the task crashed
+        """
+        with self._lock:
+            owner = self._owners[video_id]
+        if not owner.done():
+            owner.set_result(result)
+
+    def publish(self, video_id: str, result: Dict) -> Dict:
+        """
+        Publish a task result, once it is final. A result that is still
+        waiting for post-processing (see pipeline.deferred_result) is published
+        when it is finished.
+
+        Args:
+            video_id (str): Key passed to claim()
+            result (dict): Task result
+
+        Returns:
+            dict: The result to report in place of the original
+        """
+        if 'post_processing' not in result:
+            self.finish(video_id, result)
+            return result
+
+        finish = result['finish']
+
+        def finish_and_publish() -> Dict:
+            try:
+                final = finish()
+            except BaseException:
+                self.finish(video_id, None)
+                raise
+            self.finish(video_id, final)
+            return final
+
+        return dict(result, finish=finish_and_publish)
+
+    def materialize(self, files: List[str], destination: str) -> List[str]:
+        """
+        Link or copy the first task's files for a duplicate.
+
+        Args:
+            files (List[str]): Finished files of the first task
+            destination (str): Path of the duplicate's (first) file. Further files
+                keep their names and go to the same folder
+
+        Returns:
+            List[str]: Method used per file (see link_or_copy)
+        """
+        methods = []
+        for index, source in enumerate(files):
+            if index == 0:
+                # Keep the real extension in case post-processing changed it
+                target = os.path.splitext(destination)[0] + os.path.splitext(source)[1]
+            else:
+                target = os.path.join(os.path.dirname(destination), os.path.basename(source))
+            if os.path.abspath(target) == os.path.abspath(source):
+                method = 'exists'
+            else:
+                method = link_or_copy(source, target)
+            methods.append(method)
+            with self._lock:
+                self.methods[method] = self.methods.get(method, 0) + 1
+                self.bytes_saved += os.path.getsize(source)
+        return methods
+
+    def stats(self) -> Dict:
+        """
+        Get de-duplication statistics for the download summary.
+
+        Returns:
+            dict: duplicates, methods (method -> file count) and bytes_saved
+            (bytes not downloaded again)
+        """
+        with self._lock:
+            return {
+                'duplicates': self.duplicates,
+                'methods': dict(self.methods),
+                'bytes_saved': self.bytes_saved,
+            }
@@ -14,14 +14,33 @@ Repository: https://github.com/AdemCE-eng/Youtube-downloader-pro
 import os
 import sys
 import re
-from typing import Optional, List, Dict, Tuple
+import time
+import argparse
+import threading
+from typing import Callable, Optional, List, Dict, Iterator, Tuple
 from yt_dlp import YoutubeDL
 from urllib.parse import urlparse, parse_qs
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import platform
 import shutil
 
+from metadata_cache import MetadataCache, SingleFlight, TTLCache, canonicalize_url, trim_info
+from url_classifier import classify_url
+from channel_sync import ChannelSync, ChannelSyncState
+from download_archive import DownloadArchive
+from prefetch import EntryPrefetcher
+from scheduler import (SCHEDULING_POLICIES, TaskPriority, WorkQueue, interleave, iter_collection_entries,
+                       playlist_entry_info, simulate_schedule)
+from concurrency import AdaptiveConcurrency
+from backoff import BackoffCoordinator
+from dedup import VideoDeduplicator
+from format_selection import CompatibleFormatSelector, FormatSelector
+from fragments import FragmentBudget, parse_fragments
+from ffmpeg_manager import IONICE_CLASSES, FFmpegManager
+from bandwidth import BandwidthGovernor, TokenBucket, format_rate, parse_rate, parse_schedule
+from pipeline import PostProcessPool, create_downloader, deferred_result, when_all_done
+from process_pool import ProcessDownloadPool
+
 
 # ====================================================================
 # FFmpeg Detection and Configuration
@@ -75,10 +94,37 @@ def detect_ffmpeg_location():
 # URL Analysis and Content Detection
 # ====================================================================
 
-@lru_cache(maxsize=128)
+# Persistent classification cache shared by every run (see metadata_cache.py)
+metadata_cache = MetadataCache()
+
+# In-process memo that also coalesces concurrent lookups of the same URL
+url_info_flight = SingleFlight(maxsize=128)
+
+# Full format tables from the resolution probe, reused by the download stage.
+# Kept short-lived because the signed media URLs inside them expire.
+FORMAT_INFO_TTL = 600
+format_info_cache = TTLCache(ttl=FORMAT_INFO_TTL)
+
+# Per-channel watermarks for incremental sync (see channel_sync.py)
+channel_sync_state = ChannelSyncState()
+
+# Indexed record of downloaded videos shared by all workers (see download_archive.py)
+download_archive = DownloadArchive()
+
+# Tasks a priority scheduling policy can choose from (queue capacity)
+SCHEDULE_WINDOW = 256
+
+# Times a task that failed during a rate-limit pause is retried after the pause
+RATE_LIMIT_RETRIES = 3
+
+
 def get_url_info(url: str) -> Tuple[str, Dict]:
     """
     Get URL information with caching to avoid duplicate yt-dlp calls.
+    Unambiguous URL shapes are classified offline (empty info dict); the
+    rest are coalesced per canonical URL, so concurrent callers (and aliases
+    of the same URL) share a single lookup through the persistent metadata
+    cache and, on a miss, a single network probe.
     Returns (content_type, info_dict) for efficient reuse.
 
     Args:
@@ -87,6 +133,46 @@ def get_url_info(url: str) -> Tuple[str, Dict]:
     Returns:
         Tuple[str, Dict]: (content_type, info_dict) where content_type is 'video', 'playlist', or 'channel'
     """
+    content_type = classify_url(url)
+    if content_type is not None:
+        return content_type, {}
+
+    return url_info_flight.do(canonicalize_url(url), lookup_url_info, url)
+
+
+def lookup_url_info(url: str) -> Tuple[str, Dict]:
+    """
+    Look up URL information in the persistent cache, probing on a miss.
+
+    Args:
+        url (str): YouTube URL to analyze
+
+    Returns:
+        Tuple[str, Dict]: (content_type, trimmed info_dict)
+    """
+    cached = metadata_cache.get(url)
+    if cached is not None:
+        return cached
+
+    content_type, info = probe_url_info(url)
+
+    # Only cache real yt-dlp results, never the URL-pattern fallback
+    if info:
+        metadata_cache.put(url, content_type, info)
+    return content_type, trim_info(info)
+
+
+def probe_url_info(url: str) -> Tuple[str, Dict]:
+    """
+    Classify a URL with a flat yt-dlp extraction (network access).
+    Falls back to URL pattern matching with an empty info dict on failure.
+
+    Args:
+        url (str): YouTube URL to analyze
+
+    Returns:
+        Tuple[str, Dict]: (content_type, info_dict)
+    """
     try:
         # Use yt-dlp to extract info without downloading
         ydl_opts = {
@@ -179,6 +265,59 @@ def get_content_type(url: str) -> str:
     return content_type
 
 
+def resolve_content_types(urls: List[str], max_workers: int = 16) -> Dict[str, str]:
+    """
+    Classify all URLs up front so later stages never probe serially.
+    Duplicate URLs are resolved once; URLs that need a network probe are
+    classified concurrently on a bounded thread pool.
+
+    Args:
+        urls (List[str]): YouTube URLs to classify
+        max_workers (int): Maximum number of concurrent probes
+
+    Returns:
+        Dict[str, str]: Mapping of URL to 'video', 'playlist', or 'channel'
+    """
+    content_types = {}
+    pending = []
+    for url in dict.fromkeys(urls):
+        content_type = classify_url(url)
+        if content_type is not None:
+            content_types[url] = content_type
+        else:
+            pending.append(url)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            for url, content_type in zip(pending, executor.map(get_content_type, pending)):
+                content_types[url] = content_type
+
+    return content_types
+
+
+def resolve_video_info(urls: List[str], max_workers: int = 16) -> Dict[str, Dict]:
+    """
+    Look up duration and size of single videos for size-aware scheduling.
+    Uses the metadata cache; misses are probed concurrently.
+
+    Args:
+        urls (List[str]): Video URLs
+        max_workers (int): Maximum number of concurrent probes
+
+    Returns:
+        Dict[str, Dict]: Mapping of URL to trimmed info (empty if unavailable)
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    def lookup(url: str) -> Dict:
+        return url_info_flight.do(canonicalize_url(url), lookup_url_info, url)[1]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return dict(zip(urls, executor.map(lookup, urls)))
+
+
 def parse_multiple_urls(input_string: str) -> List[str]:
     """
     Parse multiple URLs from input string separated by commas, spaces, newlines, or mixed formats.
@@ -222,6 +361,8 @@ def parse_multiple_urls(input_string: str) -> List[str]:
 def get_available_resolutions(url: str) -> dict:
     """
     Get available video resolutions for a YouTube URL.
+    The full info dict is kept in format_info_cache so the download
+    stage can reuse it instead of extracting the video again.
     
     Args:
         url (str): YouTube URL to check
@@ -241,6 +382,9 @@ def get_available_resolutions(url: str) -> dict:
             
             if not info or 'formats' not in info:
                 return {}
+
+            format_info_cache.put(
+                canonicalize_url(url), YoutubeDL.sanitize_info(info, remove_private_keys=True))
                 
             # Extract video formats with resolution info
             resolutions = {}
@@ -286,7 +430,7 @@ def get_available_resolutions(url: str) -> dict:
         return {}
 
 
-def choose_resolution(url: str) -> str:
+def choose_resolution(url: str) -> FormatSelector:
     """
     Let user choose video resolution from available options.
     
@@ -294,14 +438,14 @@ def choose_resolution(url: str) -> str:
         url (str): YouTube URL
         
     Returns:
-        str: Format selector string
+        FormatSelector: Compatibility-first selector for the chosen height, or 'audio_only'
     """
     print("🔍 Detecting available video resolutions...")
     resolutions = get_available_resolutions(url)
     
     if not resolutions:
         print("⚠️ Could not detect available resolutions, using default (1080p max)")
-        return 'bestvideo[height<=1080]+bestaudio/best[height<=1080]/best'
+        return CompatibleFormatSelector(1080)
     
     # Sort resolutions by height (descending)
     sorted_resolutions = sorted(resolutions.items(), key=lambda x: x[1]['height'], reverse=True)
@@ -342,7 +486,7 @@ def choose_resolution(url: str) -> str:
                 print(f"✅ Selected: {selected_res[0]} ({selected_res[1]['width']}x{height})")
                 
                 # Return format selector based on chosen resolution
-                return f'bestvideo[height<={height}]+bestaudio/best[height<={height}]/best'
+                return CompatibleFormatSelector(height)
             else:
                 print(f"❌ Please enter a number between 1 and {len(choices)+1}")
                 
@@ -350,7 +494,7 @@ def choose_resolution(url: str) -> str:
             print("❌ Please enter a valid number")
 
 
-def choose_resolution_for_collection(url: str, content_type: str) -> str:
+def choose_resolution_for_collection(url: str, content_type: str) -> FormatSelector:
     """
     Let user choose resolution for playlists or channels.
     
@@ -359,7 +503,7 @@ def choose_resolution_for_collection(url: str, content_type: str) -> str:
         content_type (str): 'playlist' or 'channel'
         
     Returns:
-        str: Format selector string
+        FormatSelector: Compatibility-first selector for the chosen height, or 'audio_only'
     """
     print(f"\n🔍 Interactive resolution for {content_type}...")
     print(f"📋 Note: This resolution preference will be applied to all videos in this {content_type}")
@@ -370,13 +514,13 @@ def choose_resolution_for_collection(url: str, content_type: str) -> str:
     print("=" * 60)
     
     resolution_options = [
-        ("4K (2160p) - Ultra HD Quality", "bestvideo[height<=2160]+bestaudio/best[height<=2160]/best"),
-        ("1440p (2K) - High Quality", "bestvideo[height<=1440]+bestaudio/best[height<=1440]/best"),
-        ("1080p (Full HD) - Standard HD", "bestvideo[height<=1080]+bestaudio/best[height<=1080]/best"),
-        ("720p (HD) - Basic HD", "bestvideo[height<=720]+bestaudio/best[height<=720]/best"),
-        ("480p - Standard Quality", "bestvideo[height<=480]+bestaudio/best[height<=480]/best"),
-        ("360p - Lower Quality", "bestvideo[height<=360]+bestaudio/best[height<=360]/best"),
-        ("Best Available (No Limit)", "bestvideo+bestaudio/best"),
+        ("4K (2160p) - Ultra HD Quality", CompatibleFormatSelector(2160)),
+        ("1440p (2K) - High Quality", CompatibleFormatSelector(1440)),
+        ("1080p (Full HD) - Standard HD", CompatibleFormatSelector(1080)),
+        ("720p (HD) - Basic HD", CompatibleFormatSelector(720)),
+        ("480p - Standard Quality", CompatibleFormatSelector(480)),
+        ("360p - Lower Quality", CompatibleFormatSelector(360)),
+        ("Best Available (No Limit)", CompatibleFormatSelector()),
         ("Audio Only (MP3)", "audio_only")
     ]
     
@@ -409,25 +553,25 @@ def choose_resolution_for_collection(url: str, content_type: str) -> str:
             print("❌ Please enter a valid number")
 
 
-def choose_general_resolution() -> str:
+def choose_general_resolution() -> FormatSelector:
     """
     Let user choose general resolution preference for multiple URLs.
     
     Returns:
-        str: Format selector string
+        FormatSelector: Compatibility-first selector for the chosen height, or 'audio_only'
     """
     print("\n🔍 Choose general resolution preference for all downloads...")
     print("📋 Note: This preference will be applied to all videos, playlists, and channels")
     print("🎯 Individual videos may not have all resolutions - the script will use the best available match")
     
     resolution_options = [
-        ("4K (2160p) - Ultra HD Quality", "bestvideo[height<=2160]+bestaudio/best[height<=2160]/best"),
-        ("1440p (2K) - High Quality", "bestvideo[height<=1440]+bestaudio/best[height<=1440]/best"),
-        ("1080p (Full HD) - Standard HD (Recommended)", "bestvideo[height<=1080]+bestaudio/best[height<=1080]/best"),
-        ("720p (HD) - Basic HD", "bestvideo[height<=720]+bestaudio/best[height<=720]/best"),
-        ("480p - Standard Quality", "bestvideo[height<=480]+bestaudio/best[height<=480]/best"),
-        ("360p - Lower Quality", "bestvideo[height<=360]+bestaudio/best[height<=360]/best"),
-        ("Best Available (No Limit)", "bestvideo+bestaudio/best"),
+        ("4K (2160p) - Ultra HD Quality", CompatibleFormatSelector(2160)),
+        ("1440p (2K) - High Quality", CompatibleFormatSelector(1440)),
+        ("1080p (Full HD) - Standard HD (Recommended)", CompatibleFormatSelector(1080)),
+        ("720p (HD) - Basic HD", CompatibleFormatSelector(720)),
+        ("480p - Standard Quality", CompatibleFormatSelector(480)),
+        ("360p - Lower Quality", CompatibleFormatSelector(360)),
+        ("Best Available (No Limit)", CompatibleFormatSelector()),
         ("Audio Only (MP3)", "audio_only")
     ]
     
@@ -490,19 +634,33 @@ def get_available_formats(url: str) -> None:
 # Download Functions
 # ====================================================================
 
-def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_only: bool = False, format_selector: Optional[str] = None) -> dict:
+def build_download_options(output_path: str, content_type: str, audio_only: bool = False,
+                           format_selector: Optional[FormatSelector] = None,
+                           concurrency: Optional[AdaptiveConcurrency] = None,
+                           bandwidth: Optional[TokenBucket] = None,
+                           backoff: Optional[BackoffCoordinator] = None,
+                           fragment_downloads: int = 1, ffmpeg: Optional[FFmpegManager] = None,
+                           stream_audio: bool = False) -> dict:
     """
-    Download a single YouTube video, playlist, or channel.
+    Build the yt-dlp options shared by every download of a given kind.
+    The output template depends on where the video came from, so videos
+    of a playlist or channel keep the collection's folder layout even
+    when they are downloaded as individual tasks.
 
     Args:
-        url (str): YouTube URL to download (video, playlist, or channel)
         output_path (str): Directory to save the download
-        thread_id (int): Thread identifier for logging
+        content_type (str): 'video', 'playlist', or 'channel' (source of the video)
         audio_only (bool): If True, download audio only in MP3 format
-        format_selector (str): Custom format selector string
+        format_selector (FormatSelector): yt-dlp format string or CompatibleFormatSelector
+        concurrency (AdaptiveConcurrency, optional): Controller fed with throughput and errors
+        bandwidth (TokenBucket, optional): Bandwidth limit shared by all downloads
+        backoff (BackoffCoordinator, optional): Shared pause on rate limiting
+        fragment_downloads (int): DASH/HLS fragments downloaded in parallel per video
+        ffmpeg (FFmpegManager, optional): Runs the FFmpeg processes of post-processing
+        stream_audio (bool): If True, MP3s are encoded while downloading where the format allows
 
     Returns:
-        dict: Result status with success/failure info
+        dict: yt-dlp options
     """
     if audio_only or format_selector == 'audio_only':
         # Configure for audio-only MP3 downloads
@@ -513,22 +671,21 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
             'preferredcodec': 'mp3',
             'preferredquality': '192',
         }]
-        print(f"🎵 [Thread {thread_id}] Audio-only mode: Downloading MP3...")
+        if stream_audio:
+            # Plain HTTP formats can be piped into the encoder; the extraction
+            # is done by remux.FinalizingYoutubeDL (see audio_stream.StreamingMP3PP)
+            format_selector = 'bestaudio[protocol=https]/bestaudio[protocol=http]/bestaudio/best'
+            postprocessors = []
         audio_only = True
     else:
         # Configure for video downloads with AAC audio (Windows Media Player compatible)
         if format_selector is None:
-            format_selector = (
-                # Try best video+audio combination first
-                'bestvideo[height<=1080]+bestaudio/best[height<=1080]/'
-                # Fallback to best available quality
-                'best'
-            )
+            # Best quality up to 1080p, preferring streams that need no transcoding
+            format_selector = CompatibleFormatSelector(1080)
         file_extension = 'mp4'
-        postprocessors = [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }]
+        # MP4 compatibility is handled by remux.MP4FinalizePP, which only
+        # transcodes the streams that need it (see remux.FinalizingYoutubeDL)
+        postprocessors = []
 
     # Configure yt-dlp options
     ydl_opts = {
@@ -546,6 +703,7 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
         'clean_infojson': True,
         'retries': 3,
         'fragment_retries': 3,
+        'concurrent_fragment_downloads': fragment_downloads,
         # Ensure playlists are fully downloaded
         'noplaylist': False,  # Allow playlist downloads
     }
@@ -558,79 +716,231 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
     # Add merge format for video downloads only
     if not audio_only:
         ydl_opts['merge_output_format'] = 'mp4'
-        # Add FFmpeg postprocessor to convert audio to AAC for compatibility
-        ydl_opts['postprocessor_args'] = {
-            'ffmpeg': ['-c:a', 'aac', '-b:a', '192k']
-        }
+        # The finalizer converts only non-AAC audio (and video MP4 can't
+        # hold), in the same FFmpeg run as the merge when there is one
+        ydl_opts['finalize_mp4'] = {'audio_bitrate': '192k'}
+    elif stream_audio:
+        ydl_opts['stream_mp3'] = {'preferredquality': '192'}
+
+    # Report throughput and errors to the adaptive concurrency controller
+    if concurrency is not None:
+        ydl_opts['progress_hooks'] = [concurrency.progress_hook]
+        ydl_opts['error_hooks'] = [concurrency.record_error]
+
+    # Rate-limit messages pause all workers; retries and later entries wait out the pause
+    if backoff is not None:
+        backoff.apply(ydl_opts)
+
+    # Throttle against the limit shared by all workers
+    if bandwidth is not None:
+        bandwidth.apply(ydl_opts)
+
+    # FFmpeg processes of all workers share the process limit and the CPU cores
+    if ffmpeg is not None:
+        ydl_opts['ffmpeg_manager'] = ffmpeg
+
+    # Set different output templates for playlists, channels and single videos
+    if content_type == 'playlist':
+        ydl_opts['outtmpl'] = os.path.join(
+            output_path, '%(playlist_title)s', f'%(playlist_index)s-%(title)s.{file_extension}')
+    elif content_type == 'channel':
+        ydl_opts['outtmpl'] = os.path.join(
+            output_path, '%(uploader)s', f'%(upload_date)s-%(title)s.{file_extension}')
+    else:  # single video
+        ydl_opts['outtmpl'] = os.path.join(
+            output_path, f'%(title)s.{file_extension}')
+
+    return ydl_opts
+
+
+def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_only: bool = False,
+                          format_selector: Optional[FormatSelector] = None, content_type: Optional[str] = None,
+                          incremental_sync: bool = False, use_archive: bool = False,
+                          prefetch_depth: int = 2, concurrency: Optional[AdaptiveConcurrency] = None,
+                          post_process_pool: Optional[PostProcessPool] = None,
+                          bandwidth: Optional[TokenBucket] = None,
+                          backoff: Optional[BackoffCoordinator] = None,
+                          fragment_downloads: int = 1, ffmpeg: Optional[FFmpegManager] = None,
+                          stream_audio: bool = False) -> dict:
+    """
+    Download a single YouTube video, playlist, or channel.
+
+    Args:
+        url (str): YouTube URL to download (video, playlist, or channel)
+        output_path (str): Directory to save the download
+        thread_id (int): Thread identifier for logging
+        audio_only (bool): If True, download audio only in MP3 format
+        format_selector (FormatSelector): yt-dlp format string or CompatibleFormatSelector
+        content_type (str, optional): Pre-resolved content type (skips detection)
+        incremental_sync (bool): If True, only download channel uploads newer than the last sync
+        use_archive (bool): If True, skip videos recorded in the download archive and record new ones
+        prefetch_depth (int): Playlist entries to extract ahead of the current download (0 disables)
+        concurrency (AdaptiveConcurrency, optional): Controller fed with throughput and errors
+        post_process_pool (PostProcessPool, optional): Runs FFmpeg post-processing off this thread
+        bandwidth (TokenBucket, optional): Bandwidth limit shared by all downloads
+        backoff (BackoffCoordinator, optional): Shared pause on rate limiting
+        fragment_downloads (int): DASH/HLS fragments downloaded in parallel per video
+        ffmpeg (FFmpegManager, optional): Runs the FFmpeg processes of post-processing
+        stream_audio (bool): If True, MP3s are encoded while downloading where the format allows
+
+    Returns:
+        dict: Result status with success/failure info (see pipeline.deferred_result)
+    """
+    audio_only = audio_only or format_selector == 'audio_only'
+    if audio_only:
+        print(f"🎵 [Thread {thread_id}] Audio-only mode: Downloading MP3...")
 
     # Set different output templates for playlists, channels and single videos
-    content_type, cached_info = get_url_info(url)
+    if content_type is None:
+        content_type = get_content_type(url)
 
     # Log content type for user awareness
     if thread_id == 1:  # Only print for first thread to avoid spam
         print(f"🔍 Content detected: {content_type.title()}")
 
+    ydl_opts = build_download_options(output_path, content_type, audio_only, format_selector, concurrency,
+                                      bandwidth, backoff, fragment_downloads, ffmpeg, stream_audio)
+
     if content_type == 'playlist':
-        ydl_opts['outtmpl'] = os.path.join(
-            output_path, '%(playlist_title)s', f'%(playlist_index)s-%(title)s.{file_extension}')
         print(
             f"📋 [Thread {thread_id}] Detected playlist URL. Downloading entire playlist...")
     elif content_type == 'channel':
-        ydl_opts['outtmpl'] = os.path.join(
-            output_path, '%(uploader)s', f'%(upload_date)s-%(title)s.{file_extension}')
         print(
             f"📺 [Thread {thread_id}] Detected channel URL. Downloading entire channel...")
     else:  # single video
-        ydl_opts['outtmpl'] = os.path.join(
-            output_path, f'%(title)s.{file_extension}')
         print(
             f"🎥 [Thread {thread_id}] Detected single video URL. Downloading {'audio' if audio_only else 'video'}...")
 
+    # Count finished files as they complete instead of enumerating up front
+    finished_files = []
+
+    def on_file_finished(filepath: str) -> None:
+        finished_files.append(filepath)
+        if content_type != 'video':
+            print(f"📥 [Thread {thread_id}] {content_type.title()}: {len(finished_files)} "
+                  f"{'MP3s' if audio_only else 'videos'} done so far")
+
+    ydl_opts['post_hooks'] = [on_file_finished]
+
+    if content_type in ('playlist', 'channel'):
+        # Stream entries: start downloading the first video immediately and
+        # don't hold every resolved entry (with its format table) in memory
+        ydl_opts['lazy_playlist'] = True
+        ydl_opts['extract_flat'] = 'discard_in_playlist'
+
+    # Archived videos are skipped from their flat playlist entry, before extraction
+    if use_archive:
+        ydl_opts['download_archive'] = download_archive
+
+    # Stop channel enumeration at the newest video synced by a previous run
+    sync = None
+    if incremental_sync and content_type == 'channel':
+        sync = ChannelSync(channel_sync_state, canonicalize_url(url))
+        ydl_opts['match_filter'] = sync.match_filter
+        ydl_opts['postprocessor_hooks'] = [sync.postprocessor_hook]
+
+    # Extract upcoming playlist entries while the current one downloads
+    prefetcher = None
+    if prefetch_depth > 0 and content_type in ('playlist', 'channel'):
+        def skip_prefetch(entry: dict) -> bool:
+            # Entries yt-dlp will skip anyway must not be extracted
+            if use_archive and get_archive_id(entry) in download_archive:
+                return True
+            return sync is not None and entry.get('id') in sync.known_ids
+
+        prefetcher = EntryPrefetcher(ydl_opts, depth=prefetch_depth, skip=skip_prefetch)
+
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            # Extract fresh info for download (cached info is only for detection)
-            info = ydl.extract_info(url, download=False)
+        with create_downloader(ydl_opts, post_process_pool) as ydl:
+            # Reuse the format table from the resolution probe if still fresh
+            ie_result = format_info_cache.pop(canonicalize_url(url))
+            if ie_result is not None:
+                print(f"♻️  [Thread {thread_id}] Reusing format info from resolution check")
+            else:
+                # Extract once without resolving entries/formats; the same result
+                # is then processed and downloaded, so nothing is extracted twice
+                ie_result = ydl.extract_info(url, download=False, process=False)
 
             # Check if info extraction was successful
-            if info is None:
+            if ie_result is None:
                 return {
                     'url': url,
                     'success': False,
                     'message': f"❌ [Thread {thread_id}] Failed to extract video information. Video may be private or unavailable."
                 }
 
-            if info.get('_type') == 'playlist':
-                title = info.get('title', 'Unknown Playlist')
-                video_count = len(info.get('entries', []))
+            if ie_result.get('_type') == 'playlist':
+                title = ie_result.get('title', 'Unknown Playlist')
                 print(
-                    f"📋 [Thread {thread_id}] {content_type.title()}: '{title}' ({video_count} videos)")
+                    f"📋 [Thread {thread_id}] {content_type.title()}: '{title}'")
+                pad_playlist_index(ydl, ie_result)
+
+            if sync is not None:
+                sync.run(ydl, ie_result, prepare=(lambda part: prefetcher.wrap(ydl, part)) if prefetcher else None)
+                # Only videos that made it through post-processing count as synced
+                wait(getattr(ydl, 'post_process_jobs', []))
+                sync.commit()
+                counts = sync.summary()
+                return {
+                    'url': url,
+                    'success': True,
+                    'message': f"✅ [Thread {thread_id}] Channel '{ie_result.get('title', url)}' synced! ({counts['new']} new {'MP3s' if audio_only else 'videos'})",
+                    'sync': dict(counts, channel=ie_result.get('title', url)),
+                }
+
+            if prefetcher is not None:
+                ie_result = prefetcher.wrap(ydl, ie_result)
+
+            # Resolve and download content from the already extracted info
+            info = ydl.process_ie_result(ie_result, download=True)
 
-                # Ensure we have entries to download
-                if video_count == 0:
+            if prefetcher is not None and (prefetcher.prefetched or prefetcher.expired):
+                print(f"⏩ [Thread {thread_id}] Prefetched {prefetcher.prefetched} entries "
+                      f"({prefetcher.expired} expired and re-extracted)")
+
+            if info is None:
+                return {
+                    'url': url,
+                    'success': False,
+                    'message': f"❌ [Thread {thread_id}] Failed to download content. Video may be private or unavailable."
+                }
+
+            if info.get('_type') == 'playlist':
+                # Ensure we actually had entries to download
+                if not any(info.get('entries') or []):
                     return {
                         'url': url,
                         'success': False,
                         'message': f"❌ [Thread {thread_id}] {content_type.title()} appears to be empty or private"
                     }
 
-            # Download content
-            ydl.download([url])
-
-            if info.get('_type') == 'playlist':
-                title = info.get('title', f'Unknown {content_type.title()}')
-                video_count = len(info.get('entries', []))
-                return {
-                    'url': url,
-                    'success': True,
-                    'message': f"✅ [Thread {thread_id}] {content_type.title()} '{title}' download completed! ({video_count} {'MP3s' if audio_only else 'videos'})"
-                }
-            else:
+            def make_result() -> dict:
+                # Called once every file of this URL has been post-processed
+                if info.get('_type') == 'playlist':
+                    title = info.get('title', f'Unknown {content_type.title()}')
+                    video_count = len(finished_files)
+                    return {
+                        'url': url,
+                        'success': True,
+                        'message': f"✅ [Thread {thread_id}] {content_type.title()} '{title}' download completed! ({video_count} {'MP3s' if audio_only else 'videos'})"
+                    }
+                # With ignoreerrors, a failed media download still returns the info
+                if not finished_files and not (use_archive and ydl.in_download_archive(info)):
+                    return {
+                        'url': url,
+                        'success': False,
+                        'message': f"❌ [Thread {thread_id}] Failed to download content. Video may be private or unavailable."
+                    }
                 return {
                     'url': url,
                     'success': True,
-                    'message': f"✅ [Thread {thread_id}] {'Audio' if audio_only else 'Video'} download completed successfully!"
+                    'message': f"✅ [Thread {thread_id}] {'Audio' if audio_only else 'Video'} download completed successfully!",
+                    'files': finished_files,
+                    'info': trim_info(info),
                 }
 
+            return deferred_result(ydl, make_result)
+
     except Exception as e:
         return {
             'url': url,
@@ -639,12 +949,245 @@ def download_single_video(url: str, output_path: str, thread_id: int = 0, audio_
         }
 
 
+def get_archive_id(entry: dict) -> str:
+    """
+    Build the download archive ID of a flat entry or video info.
+
+    Args:
+        entry (dict): Flat playlist entry or extracted video info
+
+    Returns:
+        str: Archive ID, e.g. "youtube dQw4w9WgXcQ"
+    """
+    extractor = entry.get('ie_key') or entry.get('extractor_key') or 'youtube'
+    return f"{extractor.lower()} {entry.get('id')}"
+
+
+def task_video_id(task: dict) -> Optional[str]:
+    """
+    Get the key of the video a download task is for, before downloading it.
+
+    Args:
+        task (dict): Task from the work queue
+
+    Returns:
+        Optional[str]: Archive ID of the video, or None if the task isn't a
+        single video or the ID isn't known up front
+    """
+    if task['kind'] == 'entry':
+        entry = task['entry']
+        return get_archive_id(entry) if entry.get('id') else None
+    if task['content_type'] == 'video':
+        video_id = parse_qs(urlparse(canonicalize_url(task['url'])).query).get('v')
+        if video_id:
+            return f"youtube {video_id[0]}"
+    return None
+
+
+def pad_playlist_index(ydl: YoutubeDL, ie_result: dict) -> None:
+    """
+    Zero-pad %(playlist_index)s for a lazily processed playlist.
+    yt-dlp pads the index to the width of the last index, which a lazy
+    playlist doesn't know up front; use the reported playlist size instead
+    so filenames match a fully resolved playlist (01-, 02-, ...).
+
+    Args:
+        ydl (YoutubeDL): Downloader that will process the playlist
+        ie_result (dict): Raw playlist result
+    """
+    count = ie_result.get('playlist_count')
+    if not count:
+        return
+    outtmpl = ydl.params['outtmpl']
+    outtmpl['default'] = outtmpl['default'].replace(
+        '%(playlist_index)s', f'%(playlist_index)0{len(str(count))}d')
+
+
+def expand_collection(url: str, content_type: str, collection: dict, use_archive: bool = False,
+                      sync: Optional[ChannelSync] = None,
+                      prefetcher: Optional[EntryPrefetcher] = None) -> Iterator[dict]:
+    """
+    Enumerate a playlist or channel lazily as individual video tasks.
+    Entries are produced as the collection is paged through, so the first
+    videos are queued long before a large channel is fully listed.
+
+    Args:
+        url (str): Playlist or channel URL
+        content_type (str): 'playlist' or 'channel'
+        collection (dict): Per-collection record; title and skipped are filled in
+        use_archive (bool): If True, archived videos are skipped without a task
+        sync (ChannelSync, optional): Stops each channel tab at the last synced video
+        prefetcher (EntryPrefetcher, optional): Extracts upcoming entries ahead of time
+
+    Yields:
+        dict: Video task for download_collection_entry
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+    }
+
+    with YoutubeDL(ydl_opts) as ydl:
+        ie_result = ydl.extract_info(url, download=False, process=False)
+        if ie_result is None:
+            raise ValueError("Failed to extract information. It may be private or unavailable.")
+
+        collection['title'] = ie_result.get('title') or url
+        print(f"📋 {content_type.title()}: '{collection['title']}' - queuing videos...")
+
+        for entry, playlist, index in iter_collection_entries(
+                ydl, ie_result, prefetcher, stop=sync.reached if sync is not None else None):
+            if sync is not None:
+                sync.record_seen(entry)
+            if use_archive and get_archive_id(entry) in download_archive:
+                collection['skipped'] += 1
+                continue
+            yield {
+                'kind': 'entry',
+                'url': entry.get('webpage_url') or entry.get('url'),
+                'title': entry.get('title'),
+                'source_url': url,
+                'content_type': content_type,
+                'entry': entry,
+                'extra_info': playlist_entry_info(playlist, index),
+                'sync': sync,
+            }
+
+
+def download_collection_entry(task: dict, output_path: str, thread_id: int = 0, audio_only: bool = False,
+                              format_selector: Optional[FormatSelector] = None, use_archive: bool = False,
+                              prefetcher: Optional[EntryPrefetcher] = None,
+                              concurrency: Optional[AdaptiveConcurrency] = None,
+                              post_process_pool: Optional[PostProcessPool] = None,
+                              bandwidth: Optional[TokenBucket] = None,
+                              backoff: Optional[BackoffCoordinator] = None,
+                              fragment_downloads: int = 1, ffmpeg: Optional[FFmpegManager] = None,
+                              stream_audio: bool = False) -> dict:
+    """
+    Download one video of a playlist or channel as its own task.
+    The collection's playlist fields are passed to yt-dlp, so the file
+    lands in the same folder with the same name as a whole-playlist download.
+
+    Args:
+        task (dict): Video task from expand_collection
+        output_path (str): Directory to save the download
+        thread_id (int): Thread identifier for logging
+        audio_only (bool): If True, download audio only in MP3 format
+        format_selector (FormatSelector): yt-dlp format string or CompatibleFormatSelector
+        use_archive (bool): If True, record the video in the download archive
+        prefetcher (EntryPrefetcher, optional): Prefetcher that produced the entry
+        concurrency (AdaptiveConcurrency, optional): Controller fed with throughput and errors
+        post_process_pool (PostProcessPool, optional): Runs FFmpeg post-processing off this thread
+        bandwidth (TokenBucket, optional): Bandwidth limit shared by all downloads
+        backoff (BackoffCoordinator, optional): Shared pause on rate limiting
+        fragment_downloads (int): DASH/HLS fragments downloaded in parallel per video
+        ffmpeg (FFmpegManager, optional): Runs the FFmpeg processes of post-processing
+        stream_audio (bool): If True, MP3s are encoded while downloading where the format allows
+
+    Returns:
+        dict: Result status with success/failure info (see pipeline.deferred_result)
+    """
+    audio_only = audio_only or format_selector == 'audio_only'
+    ydl_opts = build_download_options(output_path, task['content_type'], audio_only, format_selector, concurrency,
+                                      bandwidth, backoff, fragment_downloads, ffmpeg, stream_audio)
+
+    finished_files = []
+    ydl_opts['post_hooks'] = [finished_files.append]
+    if use_archive:
+        ydl_opts['download_archive'] = download_archive
+    if task['sync'] is not None:
+        ydl_opts['postprocessor_hooks'] = [task['sync'].postprocessor_hook]
+
+    entry = task['entry']
+    if prefetcher is not None and not prefetcher.is_fresh(entry):
+        # The signed media URLs have expired; let yt-dlp extract it again
+        entry = {'_type': 'url', 'url': task['url'], 'id': entry.get('id'), 'ie_key': entry.get('extractor_key')}
+
+    name = task['title'] or task['url']
+    try:
+        with create_downloader(ydl_opts, post_process_pool) as ydl:
+            info = ydl.process_ie_result(entry, download=True, extra_info=task['extra_info'])
+    except Exception as e:
+        return {
+            'url': task['url'],
+            'success': False,
+            'message': f"❌ [Thread {thread_id}] Error downloading '{name}': {str(e)}"
+        }
+
+    def make_result() -> dict:
+        if not finished_files:
+            return {
+                'url': task['url'],
+                'success': False,
+                'message': f"❌ [Thread {thread_id}] Failed to download '{name}'. Video may be private or unavailable."
+            }
+        return {
+            'url': task['url'],
+            'success': True,
+            'message': f"✅ [Thread {thread_id}] Downloaded '{name}'",
+            'files': finished_files,
+            'info': trim_info(info),
+        }
+
+    return deferred_result(ydl, make_result)
+
+
+def build_process_payload(task: dict, output_path: str, thread_id: int = 0, audio_only: bool = False,
+                          format_selector: Optional[FormatSelector] = None, use_archive: bool = False,
+                          fragment_downloads: int = 1, stream_audio: bool = False) -> dict:
+    """
+    Turn a download task into a compact, picklable record for a worker process.
+    The worker extracts the video itself, so only the URL is sent along.
+
+    Args:
+        task (dict): Video task ('url' kind for single videos, 'entry' kind from expand_collection)
+        output_path (str): Directory to save the download
+        thread_id (int): Dispatching worker, for logging
+        audio_only (bool): If True, download audio only in MP3 format
+        format_selector (FormatSelector): yt-dlp format string or CompatibleFormatSelector
+        use_archive (bool): If True, skip and record videos in the download archive
+        fragment_downloads (int): DASH/HLS fragments downloaded in parallel
+        stream_audio (bool): If True, MP3s are encoded while downloading where the format allows
+
+    Returns:
+        dict: Payload for ProcessDownloadPool.run
+    """
+    entry = task.get('entry') or {}
+    return {
+        'url': task['url'],
+        'title': task.get('title'),
+        'entry': {
+            '_type': 'url',
+            'url': task['url'],
+            'id': entry.get('id'),
+            'ie_key': entry.get('ie_key') or entry.get('extractor_key'),
+            'title': entry.get('title'),
+        },
+        'extra_info': task.get('extra_info') or {},
+        'ydl_opts': build_download_options(output_path, task['content_type'], audio_only, format_selector,
+                                           fragment_downloads=fragment_downloads, stream_audio=stream_audio),
+        'use_archive': use_archive,
+        'thread_id': thread_id,
+    }
+
+
 def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
                              list_formats: bool = False, max_workers: int = 3, audio_only: bool = False, 
-                             interactive_resolution: bool = False) -> None:
+                             interactive_resolution: bool = False, incremental_sync: bool = False,
+                             use_archive: bool = False, prefetch_depth: int = 2,
+                             flatten_collections: bool = True,
+                             concurrency: Optional[AdaptiveConcurrency] = None,
+                             postprocess_workers: Optional[int] = None, process_workers: int = 0,
+                             schedule: str = 'input', bandwidth: Optional[BandwidthGovernor] = None,
+                             backoff_delay: float = 10.0, fragments: Optional[FragmentBudget] = None,
+                             deduplicate: bool = True, ffmpeg_options: Optional[Dict] = None,
+                             stream_audio: bool = False) -> None:
     """
     Download YouTube content (single videos, playlists, or channels) in MP4 format or MP3 audio only.
-    Supports multiple URLs for simultaneous downloading.
+    Supports multiple URLs for simultaneous downloading. Playlists and channels are
+    expanded into per-video tasks on one shared work queue, so every worker
+    stays busy until the last video regardless of how the input is grouped.
 
     Args:
         urls (List[str]): List of YouTube URLs to download (videos, playlists, or channels)
@@ -653,6 +1196,30 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
         max_workers (int): Maximum number of concurrent downloads
         audio_only (bool): If True, download audio only in MP3 format
         interactive_resolution (bool): If True, let user choose resolution for each video
+        incremental_sync (bool): If True, only download channel uploads newer than the last sync
+        use_archive (bool): If True, skip videos recorded in the download archive and record new ones
+        prefetch_depth (int): Playlist entries to extract ahead of the current download (0 disables)
+        flatten_collections (bool): If False, each playlist/channel is downloaded by a single worker
+        concurrency (AdaptiveConcurrency, optional): Adjusts the active worker count at runtime
+            within its own bounds; max_workers is ignored when given
+        postprocess_workers (int, optional): FFmpeg post-processing workers, run as a separate
+            pipeline stage. Defaults to the CPU count; 0 post-processes in the download workers
+        process_workers (int): If > 0, download and extract videos in this many worker
+            processes instead of threads (collections are always flattened)
+        schedule (str): Order of queued downloads: 'input', 'shortest' (shortest video
+            first), 'largest' (largest download first) or 'round-robin' (across playlists)
+        bandwidth (BandwidthGovernor, optional): Caps the combined download rate of all workers
+        backoff_delay (float): First pause of all workers after an HTTP 429; doubles on
+            repeated rate limiting (0 disables the shared backoff)
+        fragments (FragmentBudget, optional): DASH/HLS fragment concurrency per video.
+            Defaults to auto mode within a connection budget
+        deduplicate (bool): If True, a video that appears in several inputs is downloaded
+            once and linked (or copied) to its other locations
+        ffmpeg_options (dict, optional): FFmpegManager arguments (max_processes, threads,
+            nice, ionice). By default one FFmpeg process may run per worker that
+            post-processes, at most one per CPU core
+        stream_audio (bool): If True, audio-only downloads are piped into the MP3 encoder
+            while they download; formats that can't be piped are downloaded first as before
     """
     # Set default output path if none provided
     if output_path is None:
@@ -667,19 +1234,17 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
         get_available_formats(urls[0])
         return
 
+    # Classify every URL once, concurrently; all later stages use this table
+    content_types = resolve_content_types(urls)
+
     # Interactive resolution selection
     format_selector = None
     if interactive_resolution and not audio_only:
         print("\n🎯 Interactive Resolution Mode Activated!")
         
-        # Check content types
-        video_count = sum(1 for url in urls if get_content_type(url) == 'video')
-        playlist_count = sum(1 for url in urls if get_content_type(url) == 'playlist')
-        channel_count = sum(1 for url in urls if get_content_type(url) == 'channel')
-        
         if len(urls) == 1:
             # Single URL - check what type it is
-            content_type = get_content_type(urls[0])
+            content_type = content_types[urls[0]]
             if content_type == 'video':
                 format_selector = choose_resolution(urls[0])
             elif content_type in ['playlist', 'channel']:
@@ -695,16 +1260,27 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
     # Create output directory if it doesn't exist
     os.makedirs(output_path, exist_ok=True)
 
-    print(
-        f"\n🚀 Starting download of {len(urls)} URL(s) with {max_workers} concurrent workers...")
+    if process_workers > 0 and concurrency is None:
+        max_workers = process_workers
+
+    if concurrency is not None:
+        max_workers = concurrency.max_workers
+        print(f"\n🚀 Starting download of {len(urls)} URL(s) with adaptive concurrency "
+              f"({concurrency.min_workers}-{concurrency.max_workers} workers)...")
+    else:
+        print(
+            f"\n🚀 Starting download of {len(urls)} URL(s) with {max_workers} concurrent workers...")
+    if process_workers > 0:
+        print(f"🧮 Process mode: downloads and extraction run in {max_workers} worker processes")
     print(f"📁 Output directory: {output_path}")
-    print(f"🎧 Format: {'MP3 Audio Only' if audio_only else 'MP4 Video'}")
+    print(f"🎧 Format: {'MP3 Audio Only' if audio_only else 'MP4 Video'}"
+          f"{' (encoded while downloading)' if audio_only and stream_audio else ''}")
 
     # Show what types of content we're downloading
     playlist_count = sum(
-        1 for url in urls if get_content_type(url) == 'playlist')
+        1 for url in urls if content_types[url] == 'playlist')
     channel_count = sum(
-        1 for url in urls if get_content_type(url) == 'channel')
+        1 for url in urls if content_types[url] == 'channel')
     video_count = len(urls) - playlist_count - channel_count
 
     content_summary = []
@@ -720,21 +1296,277 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
     else:
         print("🎥 Content: Unknown content type")
 
+    # Fragment connections of all running downloads share one budget
+    fragment_budget = fragments or FragmentBudget()
+    fragment_budget.expected_jobs = concurrency.limit if concurrency is not None else max_workers
+    print(f"🧩 Fragment downloads: {fragment_budget.describe()}")
+
+    # FFmpeg runs in the post-processing pool, else in the download workers
+    if postprocess_workers != 0 and process_workers == 0:
+        ffmpeg_workers = postprocess_workers or os.cpu_count() or 1
+    else:
+        ffmpeg_workers = max_workers
+    ffmpeg_options = dict(ffmpeg_options or {})
+    ffmpeg_options.setdefault('max_processes', min(ffmpeg_workers, os.cpu_count() or 1))
+    ffmpeg = FFmpegManager(**ffmpeg_options)
+    print(f"🎬 FFmpeg processes: {ffmpeg.describe()}")
+    if concurrency is not None:
+        # Transcodes load the CPU, but fewer downloads wouldn't make them finish sooner
+        concurrency.excluded_load = ffmpeg.cpu_demand
+
+    # One token bucket caps the combined rate of every worker
+    bucket = bandwidth.bucket if bandwidth is not None else None
+    if bandwidth is not None:
+        windows = f" ({len(bandwidth.schedule)} scheduled window(s))" if bandwidth.schedule else ''
+        print(f"🚦 Bandwidth limit: {format_rate(bandwidth.current_limit())} for all workers combined{windows}")
+
     print("-" * 60)
 
-    # Concurrent downloads
+    # Concurrent downloads through one shared work queue
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {
-            executor.submit(download_single_video, url, output_path, i+1, audio_only, format_selector): url
-            for i, url in enumerate(urls)
-        }
+    collections = {}  # Collection URL -> per-collection progress
+    results_lock = threading.Lock()
+
+    finished_jobs = []  # {'task', 'seconds', 'finished'} for the scheduling report
+
+    # A rate limit seen by one worker pauses new requests of all workers
+    backoff = BackoffCoordinator(base_delay=backoff_delay) if backoff_delay > 0 else None
+
+    def download_task(task: dict, worker_id: int) -> dict:
+        with fragment_budget.job() as fragment_downloads:
+            return start_download(task, worker_id, fragment_downloads)
+
+    def start_download(task: dict, worker_id: int, fragment_downloads: int) -> dict:
+        if process_pool is not None:
+            result = process_pool.run(build_process_payload(
+                task, output_path, worker_id, audio_only, format_selector, use_archive, fragment_downloads,
+                stream_audio))
+            if task.get('sync') is not None:
+                task['sync'].record_completed(result['video_id'], result['info'].get('upload_date'))
+            return result
+        if task['kind'] == 'entry':
+            return download_collection_entry(task, output_path, worker_id, audio_only, format_selector,
+                                             use_archive, prefetcher, concurrency, post_process_pool,
+                                             bucket, backoff, fragment_downloads, ffmpeg, stream_audio)
+        return download_single_video(task['url'], output_path, worker_id, audio_only, format_selector,
+                                     task['content_type'], incremental_sync, use_archive, prefetch_depth,
+                                     concurrency, post_process_pool, bucket, backoff, fragment_downloads,
+                                     ffmpeg, stream_audio)
+
+    # The first task for a video downloads it; duplicates link its files
+    deduplicator = VideoDeduplicator() if deduplicate else None
+
+    def duplicate_result(task: dict, worker_id: int, original: Future) -> dict:
+        name = task.get('title') or task['url']
+
+        def make_result() -> dict:
+            first = original.result()
+            if first is None or not first['success']:
+                return {
+                    'url': task['url'],
+                    'success': False,
+                    'message': f"❌ [Thread {worker_id}] '{name}' not downloaded: the same video failed in another task"
+                }
+            if first.get('files'):
+                # Same video, so only the collection fields of the filename differ
+                outtmpl = build_download_options(output_path, task['content_type'], audio_only, format_selector)['outtmpl']
+                try:
+                    with YoutubeDL({'outtmpl': outtmpl, 'quiet': True}) as ydl:
+                        destination = ydl.prepare_filename(dict(first['info'], **(task.get('extra_info') or {})))
+                    methods = deduplicator.materialize(first['files'], destination)
+                except Exception as e:
+                    return {
+                        'url': task['url'],
+                        'success': False,
+                        'message': f"❌ [Thread {worker_id}] Error copying duplicate '{name}': {str(e)}"
+                    }
+                if task.get('sync') is not None:
+                    task['sync'].record_completed(first['info'].get('id'), first['info'].get('upload_date'))
+                return {
+                    'url': task['url'],
+                    'success': True,
+                    'message': f"🔗 [Thread {worker_id}] '{name}' already downloaded in this run ({', '.join(methods)})"
+                }
+            return {
+                'url': task['url'],
+                'success': True,
+                'message': f"✅ [Thread {worker_id}] '{name}' already downloaded"
+            }
+
+        # Reported like a download waiting for post-processing, so the worker moves on
+        return {'post_processing': [original], 'finish': make_result}
+
+    def run_task(task: dict, worker_id: int) -> dict:
+        task['started'] = time.monotonic()
+        video_id = task_video_id(task) if deduplicator is not None else None
+        if video_id is None:
+            return download_with_backoff(task, worker_id)
+
+        original = deduplicator.claim(video_id)
+        if original is not None:
+            return duplicate_result(task, worker_id, original)
+        try:
+            result = download_with_backoff(task, worker_id)
+        except BaseException:
+            deduplicator.finish(video_id, None)
+            raise
+        return deduplicator.publish(video_id, result)
+
+    def download_with_backoff(task: dict, worker_id: int) -> dict:
+        if backoff is None:
+            return download_task(task, worker_id)
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            backoff.wait()
+            pauses = backoff.pauses
+            result = download_task(task, worker_id)
+            # A failure while a new pause started was most likely the rate limit itself
+            if 'post_processing' in result or result['success'] or backoff.pauses == pauses:
+                break
+            if attempt < RATE_LIMIT_RETRIES:
+                print(f"🔁 [Thread {worker_id}] Rate limited: '{task.get('title') or task['url']}' "
+                      f"will be retried after the pause")
+        return result
+
+    def on_result(task: dict, result) -> None:
+        if isinstance(result, dict) and 'post_processing' in result:
+            # The download worker has moved on; report once the files are processed
+            when_all_done(result['post_processing'], lambda: on_result(task, result['finish']()))
+            return
+        if isinstance(result, Exception):
+            result = {'url': task['url'], 'success': False, 'message': f"❌ Error: {str(result)}"}
+        if concurrency is not None:
+            concurrency.record_result(result['success'])
+        with results_lock:
+            now = time.monotonic()
+            finished_jobs.append({'task': task, 'seconds': now - task.get('started', now),
+                                  'finished': now - run_started})
+            if task['kind'] != 'entry':
+                results.append(result)
+                print(result['message'])
+                return
+            collection = collections[task['source_url']]
+            if result['success']:
+                collection['completed'] += 1
+                print(f"📥 {task['content_type'].title()} '{collection['title']}': {collection['completed']} "
+                      f"{'MP3s' if audio_only else 'videos'} done so far")
+            else:
+                collection['failed'].append(result)
+                print(result['message'])
+
+    # Collections are only expanded when they're not downloaded as a whole;
+    # worker processes only take single videos, so process mode always expands
+    flatten_collections = flatten_collections or process_workers > 0
+    flattened = [url for url in urls if flatten_collections and content_types[url] in ('playlist', 'channel')]
+
+    # A single worker downloads entries in order, so look ahead for it; with
+    # more workers the other downloads already overlap each extraction
+    prefetcher = None
+    if flattened and prefetch_depth > 0 and max_workers == 1 and process_workers == 0:
+        def skip_prefetch(entry: dict) -> bool:
+            if use_archive and get_archive_id(entry) in download_archive:
+                return True
+            return any(collection['sync'] is not None and entry.get('id') in collection['sync'].known_ids
+                       for collection in list(collections.values()))
+
+        prefetcher = EntryPrefetcher({}, depth=prefetch_depth, skip=skip_prefetch, slim_finished=False)
+
+    # Post-processing (FFmpeg) runs as its own stage with its own pool, so
+    # download workers start the next download while files are transcoded
+    post_process_pool = None
+    if postprocess_workers != 0 and process_workers == 0:
+        post_process_pool = PostProcessPool(max_workers=postprocess_workers)
+
+    # Worker processes own their YoutubeDL instances and report progress
+    # over a shared channel; the queue's threads only dispatch to them
+    process_pool = None
+    if process_workers > 0:
+        def on_process_error(message: str) -> None:
+            if concurrency is not None:
+                concurrency.record_error(message)
+            if backoff is not None:
+                backoff.record_message(message)
+
+        process_pool = ProcessDownloadPool(
+            max_workers, archive_path=download_archive.path, bandwidth=bucket, ffmpeg=ffmpeg,
+            on_progress=concurrency.progress_hook if concurrency is not None else None,
+            on_error=on_process_error,
+            on_warning=backoff.record_message if backoff is not None else None)
+
+    # Only queued tasks can be reordered, so a priority policy gets a larger window
+    video_info = {}
+    if schedule in ('shortest', 'largest'):
+        video_info = resolve_video_info([url for url in urls if url not in flattened])
+
+    def task_info(task: dict) -> dict:
+        return task.get('entry') or video_info.get(task['url']) or {}
+
+    priority = None
+    if schedule != 'input':
+        priority = TaskPriority(schedule, task_info)
+        print(f"🗂️  Scheduling policy: {schedule}")
+
+    work_queue = WorkQueue(run_task, max_workers, on_result=on_result, priority=priority,
+                           max_pending=SCHEDULE_WINDOW if priority is not None else None)
+    if concurrency is not None:
+        concurrency.start(work_queue.set_limit)
+    if bandwidth is not None:
+        bandwidth.start()
+
+    run_started = time.monotonic()
+
+    def submit(task: dict) -> None:
+        task['queued_at'] = time.monotonic()
+        work_queue.submit(task)
 
-        # Collect results
-        for future in as_completed(future_to_url):
-            result = future.result()
-            results.append(result)
-            print(result['message'])
+    try:
+        # Plain URLs go first so they aren't stuck behind a long collection listing
+        for url in dict.fromkeys(urls):
+            if url not in flattened:
+                submit({'kind': 'url', 'url': url, 'content_type': content_types[url]})
+
+        expansions = {}
+        for url in dict.fromkeys(flattened):
+            content_type = content_types[url]
+            sync = None
+            if incremental_sync and content_type == 'channel':
+                sync = ChannelSync(channel_sync_state, canonicalize_url(url))
+            collection = collections[url] = {
+                'title': url, 'content_type': content_type, 'queued': 0, 'completed': 0,
+                'skipped': 0, 'failed': [], 'error': None, 'sync': sync,
+            }
+            expansions[url] = expand_collection(url, content_type, collection, use_archive, sync, prefetcher)
+
+        def expansion_failed(url: str, error: Exception) -> None:
+            collections[url]['error'] = str(error)
+
+        # Round-robin lists all collections side by side; otherwise one after another
+        groups = [expansions] if schedule == 'round-robin' else [{url: tasks} for url, tasks in expansions.items()]
+        for group in groups:
+            for url, task in interleave(group, expansion_failed):
+                with results_lock:
+                    collections[url]['queued'] += 1
+                submit(task)
+    finally:
+        work_queue.join()
+        if post_process_pool is not None:
+            post_process_pool.join()
+        if process_pool is not None:
+            process_pool.shutdown()
+        if concurrency is not None:
+            concurrency.stop()
+        if bandwidth is not None:
+            bandwidth.stop()
+
+    for url, collection in collections.items():
+        result = collection_result(url, collection, audio_only)
+        results.append(result)
+        results.extend(collection['failed'])
+        print(result['message'])
+
+    if prefetcher is not None and (prefetcher.prefetched or prefetcher.expired):
+        print(f"⏩ Prefetched {prefetcher.prefetched} entries "
+              f"({prefetcher.expired} expired and re-extracted)")
 
     print("\n" + "=" * 60)
     print("📊 DOWNLOAD SUMMARY")
@@ -752,17 +1584,242 @@ def download_youtube_content(urls: List[str], output_path: Optional[str] = None,
             print(f"   • {result['url']}")
             print(f"     Reason: {result['message']}")
 
+    synced = [r for r in results if r.get('sync')]
+    if synced:
+        print("\n🔄 Channel sync:")
+        for result in synced:
+            print(f"   • {result['sync']['channel']}: {result['sync']['new']} new, "
+                  f"{result['sync']['skipped']} already synced")
+
+    cache_stats = metadata_cache.stats()
+    if cache_stats['hits'] or cache_stats['misses']:
+        print(f"\n🗃️  Metadata cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es)")
+    if deduplicator is not None:
+        dedup_stats = deduplicator.stats()
+        if dedup_stats['duplicates']:
+            methods = ', '.join(f"{count} {method}" for method, count in dedup_stats['methods'].items())
+            print(f"🔗 Duplicate videos: {dedup_stats['duplicates']} not downloaded again "
+                  f"({dedup_stats['bytes_saved'] / 1024 / 1024:.1f} MB saved{'; ' + methods if methods else ''})")
+    flight_stats = url_info_flight.stats()
+    if flight_stats['coalesced']:
+        print(f"🔀 Duplicate URL lookups avoided: {flight_stats['coalesced']}")
+    if post_process_pool is not None:
+        pipeline_stats = post_process_pool.stats()
+        if pipeline_stats['processed'] or pipeline_stats['failed']:
+            print(f"⚙️  Post-processing: {pipeline_stats['processed']} file(s) on {post_process_pool.max_workers} "
+                  f"worker(s), {pipeline_stats['busy_time']:.0f}s of FFmpeg work off the download workers"
+                  f" (downloads waited {pipeline_stats['blocked_time']:.0f}s for a free slot)")
+    ffmpeg_stats = ffmpeg.stats()
+    if ffmpeg_stats['jobs']:
+        cpu = ''
+        if ffmpeg_stats['cpu_seconds'] is not None:
+            cpu = (f", {ffmpeg_stats['cpu_seconds']:.0f} CPU-s "
+                   f"({ffmpeg_stats['cpu_seconds'] / max(ffmpeg_stats['seconds'], 0.001):.1f} cores per job)")
+        print(f"🎬 FFmpeg: {ffmpeg_stats['jobs']} job(s), {ffmpeg_stats['seconds']:.0f}s{cpu}, "
+              f"{ffmpeg.threads} thread(s) each, waited {ffmpeg_stats['waited']:.0f}s for a free slot")
+    if backoff is not None and backoff.pauses:
+        backoff_stats = backoff.stats()
+        print(f"⏸️  Rate-limit backoff: {backoff_stats['pauses']} pause(s), {backoff_stats['backoff_time']:.0f}s "
+              f"backed off (longest {backoff_stats['longest_pause']:.0f}s), workers waited "
+              f"{backoff_stats['waited_time']:.0f}s in total")
+    if len(finished_jobs) > 1:
+        print_schedule_report(finished_jobs, schedule, concurrency.limit if concurrency is not None else max_workers,
+                              task_info)
+    if concurrency is not None and concurrency.history:
+        peak = max(decision['limit'] for decision in concurrency.history)
+        print(f"🎛️  Adaptive concurrency: {len(concurrency.history)} decision(s), "
+              f"peak {peak} worker(s), finished at {concurrency.limit}")
+
     if successful:
         print(f"\n🎉 All files saved to: {output_path}")
 
 
+def print_schedule_report(finished_jobs: List[dict], schedule: str, workers: int,
+                          task_info: Callable[[dict], dict]) -> None:
+    """
+    Print how the scheduling policy did, next to the wall time the other
+    policies would have reached with the same measured job times.
+
+    Args:
+        finished_jobs (List[dict]): {'task', 'seconds', 'finished'} per finished task
+        schedule (str): Policy used for this run
+        workers (int): Number of download workers
+        task_info (Callable): Known info (duration, size) of a task
+    """
+    completions = sorted(job['finished'] for job in finished_jobs)
+    p95 = completions[min(len(completions) - 1, int(len(completions) * 0.95))]
+    print(f"🗂️  Scheduling ({schedule}): {len(completions)} job(s) in {completions[-1]:.1f}s, "
+          f"first result after {completions[0]:.1f}s, 95% done after {p95:.1f}s")
+
+    jobs = sorted(finished_jobs, key=lambda job: job['task'].get('queued_at', 0))
+    simulated = []
+    for policy in SCHEDULING_POLICIES:
+        outcome = simulate_schedule(jobs, workers, policy, task_info)
+        marker = '*' if policy == schedule else ''
+        simulated.append(f"{policy}{marker} {outcome['wall_time']:.1f}s "
+                         f"(mean completion {outcome['mean_completion']:.1f}s)")
+    print(f"   Same jobs on {workers} worker(s), simulated: {', '.join(simulated)}")
+
+
+def collection_result(url: str, collection: dict, audio_only: bool = False) -> dict:
+    """
+    Summarize a flattened playlist or channel once all its videos finished.
+    Also advances the channel's sync watermark past the completed videos.
+
+    Args:
+        url (str): Playlist or channel URL
+        collection (dict): Per-collection progress from download_youtube_content
+        audio_only (bool): If True, counts are reported as MP3s
+
+    Returns:
+        dict: Result status with success/failure info
+    """
+    content_type = collection['content_type']
+    title = collection['title']
+    unit = 'MP3s' if audio_only else 'videos'
+
+    if collection['error'] is not None:
+        return {
+            'url': url,
+            'success': False,
+            'message': f"❌ {content_type.title()} '{title}': {collection['error']}"
+        }
+
+    sync = collection['sync']
+    if sync is not None:
+        sync.commit()
+        counts = sync.summary()
+        return {
+            'url': url,
+            'success': True,
+            'message': f"✅ Channel '{title}' synced! ({counts['new']} new {unit})",
+            'sync': dict(counts, channel=title),
+        }
+
+    # Ensure we actually had entries to download
+    if not collection['queued'] and not collection['skipped']:
+        return {
+            'url': url,
+            'success': False,
+            'message': f"❌ {content_type.title()} '{title}' appears to be empty or private"
+        }
+
+    archived = f", {collection['skipped']} already archived" if collection['skipped'] else ''
+    return {
+        'url': url,
+        'success': True,
+        'message': f"✅ {content_type.title()} '{title}' download completed! ({collection['completed']} {unit}{archived})"
+    }
+
+
 # ====================================================================
 # Main Application Entry Point
 # ====================================================================
 
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line options.
+
+    Args:
+        argv (List[str], optional): Arguments to parse. Defaults to sys.argv[1:]
+
+    Returns:
+        argparse.Namespace: Parsed options
+    """
+    parser = argparse.ArgumentParser(description="YouTube Downloader Pro - interactive YouTube downloader")
+    parser.add_argument('--list-formats', action='store_true',
+                        help="list available formats for a URL and exit")
+    parser.add_argument('--sync', action='store_true',
+                        help="only download channel uploads newer than the last synced run")
+    parser.add_argument('--archive', action='store_true',
+                        help="skip videos recorded in the download archive and record new downloads")
+    parser.add_argument('--prefetch', type=int, default=2, metavar='K',
+                        help="playlist entries to extract ahead of the current download (default: 2, 0 disables)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="adjust the number of simultaneous downloads from measured throughput, errors and CPU load")
+    parser.add_argument('--min-workers', type=int, default=1, metavar='N',
+                        help="lower bound for simultaneous downloads (default: 1)")
+    parser.add_argument('--max-workers', type=int, default=16, metavar='N',
+                        help="upper bound for simultaneous downloads (default: 16)")
+    parser.add_argument('--postprocess-workers', type=int, default=None, metavar='N',
+                        help="parallel FFmpeg post-processing jobs, separate from downloads "
+                             "(default: CPU count, 0 = post-process in the download workers)")
+    parser.add_argument('--processes', type=int, default=0, metavar='N',
+                        help="download and extract in N worker processes instead of threads "
+                             "(scales CPU-heavy extraction across cores)")
+    parser.add_argument('--schedule', choices=SCHEDULING_POLICIES, default='input',
+                        help="order of queued downloads: input order, shortest video first, largest "
+                             "download first, or round-robin across playlists/channels (default: input)")
+    parser.add_argument('--limit-rate', metavar='RATE',
+                        help="combined download rate of all workers, e.g. 500K or 10M (default: unlimited)")
+    parser.add_argument('--rate-schedule', metavar='SPEC',
+                        help="time-of-day limits, e.g. '09:00-18:00=20%%,18:00-23:00=5M' "
+                             "(percentages refer to --limit-rate)")
+    parser.add_argument('--rate-control', metavar='FILE',
+                        help="file holding a limit (e.g. 2M, 50%%, off) that overrides the others until "
+                             "it is emptied; re-read every few seconds, so the limit can change mid-download")
+    parser.add_argument('--backoff', type=float, default=10.0, metavar='SECONDS',
+                        help="pause all workers this long after an HTTP 429, doubling on repeats "
+                             "(default: 10, 0 disables)")
+    parser.add_argument('--fragments', default='auto', metavar='N',
+                        help="DASH/HLS fragments downloaded in parallel per video, or 'auto' to share "
+                             "a budget of --fragment-budget connections among running downloads (default: auto)")
+    parser.add_argument('--fragment-budget', type=int, default=16, metavar='N',
+                        help="total fragment connections of all downloads in auto mode (default: 16)")
+    parser.add_argument('--ffmpeg-jobs', type=int, metavar='N',
+                        help="FFmpeg processes running at once (default: one per post-processing worker, "
+                             "at most one per CPU core)")
+    parser.add_argument('--ffmpeg-threads', type=int, metavar='N',
+                        help="threads per FFmpeg process (default: CPU cores / --ffmpeg-jobs)")
+    parser.add_argument('--ffmpeg-nice', type=int, metavar='N',
+                        help="run FFmpeg with this niceness, e.g. 10, so downloads stay responsive (Linux)")
+    parser.add_argument('--ffmpeg-ionice', choices=list(IONICE_CLASSES),
+                        help="run FFmpeg in this I/O scheduling class (Linux)")
+    parser.add_argument('--stream-audio', action='store_true',
+                        help="in audio-only mode, encode the MP3 while downloading instead of saving the "
+                             "source audio first (falls back for formats that can't be streamed)")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="download a video again for every playlist/channel it appears in, instead of linking the first copy")
+    parser.add_argument('--no-flatten', action='store_true',
+                        help="download each playlist/channel in a single worker instead of sharing videos across workers")
+    parser.add_argument('--import-archive', metavar='FILE',
+                        help="import a yt-dlp text archive into the download archive and exit")
+    parser.add_argument('--export-archive', metavar='FILE',
+                        help="export the download archive in yt-dlp text format and exit")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    # Check for command line arguments
-    if len(sys.argv) > 1 and sys.argv[1] == '--list-formats':
+    args = parse_arguments()
+
+    bandwidth = None
+    if args.limit_rate or args.rate_schedule or args.rate_control:
+        try:
+            rate_limit = parse_rate(args.limit_rate) if args.limit_rate else None
+            rate_schedule = parse_schedule(args.rate_schedule, rate_limit) if args.rate_schedule else None
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        bandwidth = BandwidthGovernor(TokenBucket(rate_limit), rate_limit, rate_schedule, args.rate_control)
+
+    try:
+        fragments = FragmentBudget(parse_fragments(args.fragments), budget=args.fragment_budget)
+    except ValueError as e:
+        print(f"❌ Invalid --fragments value: {e}")
+        sys.exit(1)
+
+    ffmpeg_options = {key: value for key, value in (
+        ('max_processes', args.ffmpeg_jobs), ('threads', args.ffmpeg_threads),
+        ('nice', args.ffmpeg_nice), ('ionice', args.ffmpeg_ionice)) if value is not None}
+
+    if args.import_archive or args.export_archive:
+        if args.import_archive:
+            imported = download_archive.import_file(args.import_archive)
+            print(f"📥 Imported {imported} new archive entries from {args.import_archive}")
+        if args.export_archive:
+            exported = download_archive.export_file(args.export_archive)
+            print(f"📤 Exported {exported} archive entries to {args.export_archive}")
+    elif args.list_formats:
         url = input("Enter the YouTube URL to list formats: ")
         download_youtube_content([url], list_formats=True)
     else:
@@ -839,33 +1896,68 @@ if __name__ == "__main__":
         else:
             print("🎥 Selected: Auto Quality MP4 Video (1080p max)")
 
-        # Only ask for concurrent workers if there are multiple URLs
-        max_workers = 1  # Default for single URL
-        if len(urls) > 1:
+        # Only ask for concurrent workers if there are multiple URLs or a
+        # playlist/channel, whose videos are shared across workers
+        min_workers = max(1, args.min_workers)
+        max_workers_bound = max(min_workers, args.max_workers)
+        max_workers = min_workers  # Default for single URL
+        adaptive = args.adaptive
+        if not adaptive and not args.processes and (len(urls) > 1 or classify_url(urls[0]) != 'video'):
             print(f"\n⚡ You're downloading {len(urls)} videos/playlists")
             print("💡 Concurrent downloads = downloading multiple videos at the same time (faster)")
             print("⚠️  Higher numbers = faster but uses more internet/CPU")
             workers_input = input(
-                "How many videos to download simultaneously? (1-5, default=3): ").strip()
-            try:
-                max_workers = int(workers_input) if workers_input else 3
-                max_workers = max(1, min(5, max_workers))  # Clamp between 1-5
-            except ValueError:
-                max_workers = 3
+                f"How many videos to download simultaneously? "
+                f"({min_workers}-{max_workers_bound}, 'auto' = adapt to connection, default=3): ").strip()
+            if workers_input.lower() == 'auto':
+                adaptive = True
+            else:
+                try:
+                    max_workers = int(workers_input) if workers_input else 3
+                except ValueError:
+                    max_workers = 3
+                # Clamp to the --min-workers/--max-workers bounds
+                max_workers = max(min_workers, min(max_workers_bound, max_workers))
+
+        concurrency = None
+        if adaptive:
+            concurrency = AdaptiveConcurrency(min_workers=min_workers, max_workers=max_workers_bound)
 
         print(f"\n🎬 Starting downloads...")
         print(f"📊 URLs to download: {len(urls)}")
         print(f"🎧 Format: {'MP3 Audio' if audio_only else ('Choose Quality' if interactive_resolution else 'Auto Quality MP4 (1080p max)')}")
-        if len(urls) > 1:
+        if concurrency is not None:
+            print(f"⚡ Simultaneous downloads: adaptive ({min_workers}-{max_workers_bound})")
+        elif args.processes:
+            print(f"⚡ Simultaneous downloads: {args.processes} worker processes")
+        elif len(urls) > 1:
             print(f"⚡ Simultaneous downloads: {max_workers}")
         print(
             f"📁 Output: {output_dir if output_dir else 'default (./downloads)'}")
 
+        # Channels only fetch uploads newer than the last run with --sync
+        if args.sync:
+            print("🔄 Incremental channel sync: only new uploads will be downloaded")
+        if args.archive:
+            print("🗄️  Download archive: previously downloaded videos will be skipped")
+
         if output_dir:
             download_youtube_content(
                 urls, output_dir, max_workers=max_workers, audio_only=audio_only, 
-                interactive_resolution=interactive_resolution)
+                interactive_resolution=interactive_resolution, incremental_sync=args.sync,
+                use_archive=args.archive, prefetch_depth=args.prefetch,
+                flatten_collections=not args.no_flatten, concurrency=concurrency,
+                postprocess_workers=args.postprocess_workers, process_workers=args.processes,
+                schedule=args.schedule, bandwidth=bandwidth, backoff_delay=args.backoff,
+                fragments=fragments, deduplicate=not args.no_dedup, ffmpeg_options=ffmpeg_options,
+                stream_audio=args.stream_audio)
         else:
             download_youtube_content(
                 urls, max_workers=max_workers, audio_only=audio_only, 
-                interactive_resolution=interactive_resolution)
+                interactive_resolution=interactive_resolution, incremental_sync=args.sync,
+                use_archive=args.archive, prefetch_depth=args.prefetch,
+                flatten_collections=not args.no_flatten, concurrency=concurrency,
+                postprocess_workers=args.postprocess_workers, process_workers=args.processes,
+                schedule=args.schedule, bandwidth=bandwidth, backoff_delay=args.backoff,
+                fragments=fragments, deduplicate=not args.no_dedup, ffmpeg_options=ffmpeg_options,
+                stream_audio=args.stream_audio)
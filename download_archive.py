@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Indexed Download Archive
+========================
+
+Records downloaded videos so later runs skip them before any per-video
+extraction. Drop-in replacement for yt-dlp's plain-text archive file.
+
+Features:
+- SQLite store with the archive ID ("youtube VIDEO_ID") as primary key,
+  so membership checks are O(1) and never load the whole archive
+- Safe to share between worker threads and between processes (WAL mode)
+- Import from / export to yt-dlp's plain-text archive format
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+from metadata_cache import get_data_dir
+
+
+# ====================================================================
+# Download Archive
+# ====================================================================
+
+class DownloadArchive:
+    """
+    SQLite-backed download archive.
+    Implements the set-like interface yt-dlp accepts for its
+    'download_archive' option ('in' and add()).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(get_data_dir(), 'download_archive.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller must hold the lock)"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS archive (id TEXT PRIMARY KEY) WITHOUT ROWID')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def __bool__(self) -> bool:
+        # yt-dlp skips archive checks for an empty (falsy) archive; always
+        # report True so it never needs a COUNT(*) just to decide that
+        return True
+
+    def __contains__(self, archive_id: str) -> bool:
+        with self._lock:
+            return self._connect().execute(
+                'SELECT 1 FROM archive WHERE id = ?', (archive_id,)).fetchone() is not None
+
+    def add(self, archive_id: str) -> None:
+        """
+        Record a downloaded video.
+
+        Args:
+            archive_id (str): yt-dlp archive ID, e.g. "youtube dQw4w9WgXcQ"
+        """
+        self.add_many([archive_id])
+
+    def add_many(self, archive_ids: Iterable[str]) -> int:
+        """
+        Record several downloaded videos in one transaction.
+
+        Args:
+            archive_ids (Iterable[str]): yt-dlp archive IDs
+
+        Returns:
+            int: Number of IDs that were not recorded before
+        """
+        with self._lock:
+            conn = self._connect()
+            before = conn.total_changes
+            for archive_id in archive_ids:
+                conn.execute('INSERT OR IGNORE INTO archive (id) VALUES (?)', (archive_id,))
+            conn.commit()
+            return conn.total_changes - before
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM archive').fetchone()[0]
+
+    def import_file(self, filename: str) -> int:
+        """
+        Import a yt-dlp plain-text archive (one "extractor id" per line).
+
+        Args:
+            filename (str): Path to the text archive
+
+        Returns:
+            int: Number of newly imported IDs
+        """
+        with open(filename, 'r', encoding='utf-8') as archive_file:
+            return self.add_many(line.strip() for line in archive_file if line.strip())
+
+    def export_file(self, filename: str) -> int:
+        """
+        Export the archive in yt-dlp's plain-text format.
+
+        Args:
+            filename (str): Path of the text archive to write
+
+        Returns:
+            int: Number of exported IDs
+        """
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            with open(filename, 'w', encoding='utf-8') as archive_file:
+                for (archive_id,) in conn.execute('SELECT id FROM archive ORDER BY id'):
+                    archive_file.write(archive_id + '\n')
+                    count += 1
+        return count
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Asyncio Download Engine
+=======================
+
+Coroutine-based orchestration of the resolve -> download -> post-process
+stages, for embedding the downloader in asyncio services. Blocking yt-dlp
+and FFmpeg calls run in per-stage executors; each stage is bounded by its
+own semaphore, so thousands of queued jobs cost only a coroutine each.
+
+Features:
+- Per-stage concurrency limits (resolve, download, post-process)
+- Results streamed as an async iterator as soon as each job finishes
+- Per-job download timeouts and cancellation (downloads stop at the next progress update)
+- Same output layout, archive and incremental channel sync as download.py
+
+Usage:
+    engine = DownloadEngine('downloads', download_limit=8)
+    async for result in engine.run(urls):
+        print(result['message'])
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from yt_dlp.utils import DownloadCancelled
+
+from bandwidth import TokenBucket
+from channel_sync import ChannelSync
+from ffmpeg_manager import FFmpegManager
+from format_selection import FormatSelector
+from fragments import FragmentBudget
+from metadata_cache import canonicalize_url
+from pipeline import create_downloader, run_post_processing
+from download import (build_download_options, channel_sync_state, collection_result, download_archive,
+                      expand_collection, get_content_type, task_video_id)
+
+
+class JobCancelled(DownloadCancelled):
+    """Raised from a progress hook to stop a cancelled or timed-out download"""
+    msg = 'Download cancelled'
+
+
+# ====================================================================
+# Post-Processing Stage
+# ====================================================================
+
+class AsyncPostProcessStage:
+    """
+    Post-processing stage driven by the event loop. Implements the
+    submit() interface of pipeline.PostProcessPool, so download threads
+    hand their files over exactly as in the threaded pipeline.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, limit: int, max_pending: int):
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(limit)
+        self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix='engine-postprocess')
+        # Download threads block here when too many files wait for FFmpeg
+        self._pending = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, ydl, filename: str, info: Dict, files_to_move: Optional[Dict] = None):
+        """Queue a downloaded file (called from a download thread)"""
+        self._pending.acquire()
+        return asyncio.run_coroutine_threadsafe(self._process(ydl, filename, info, files_to_move), self._loop)
+
+    async def _process(self, ydl, filename: str, info: Dict, files_to_move: Optional[Dict]) -> None:
+        try:
+            async with self._semaphore:
+                await self._loop.run_in_executor(
+                    self._executor, run_post_processing, ydl, filename, info, files_to_move)
+        finally:
+            self._pending.release()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+# ====================================================================
+# Engine
+# ====================================================================
+
+class DownloadEngine:
+    """
+    Asyncio orchestration of downloads. Playlists and channels are always
+    expanded into per-video jobs.
+    """
+
+    def __init__(self, output_path: Optional[str] = None, audio_only: bool = False,
+                 format_selector: Optional[FormatSelector] = None, use_archive: bool = False,
+                 incremental_sync: bool = False, resolve_limit: int = 16, download_limit: int = 3,
+                 postprocess_limit: Optional[int] = None, max_in_flight: int = 10000,
+                 job_timeout: Optional[float] = None, bandwidth: Optional[TokenBucket] = None,
+                 fragments: Optional[FragmentBudget] = None, ffmpeg: Optional[FFmpegManager] = None,
+                 stream_audio: bool = False):
+        """
+        Args:
+            output_path (str, optional): Directory to save downloads. Defaults to './downloads'
+            audio_only (bool): If True, download audio only in MP3 format
+            format_selector (FormatSelector): yt-dlp format string or CompatibleFormatSelector
+            use_archive (bool): If True, skip and record videos in the download archive
+            incremental_sync (bool): If True, only download channel uploads newer than the last sync
+            resolve_limit (int): Concurrent URL classifications / collection listings
+            download_limit (int): Concurrent downloads
+            postprocess_limit (int, optional): Concurrent FFmpeg jobs. Defaults to the CPU count
+            max_in_flight (int): Queued video jobs before collection listing pauses
+            job_timeout (float, optional): Seconds a single video's download may take (from
+                getting its download slot) before it is cancelled. Post-processing isn't timed:
+                a running FFmpeg job can't be stopped, so the result waits for it
+            bandwidth (TokenBucket, optional): Caps the combined download rate
+            fragments (FragmentBudget, optional): DASH/HLS fragment concurrency per video.
+                Defaults to auto mode within a connection budget
+            ffmpeg (FFmpegManager, optional): Runs the FFmpeg processes. Defaults to
+                postprocess_limit processes (at most one per CPU core), sharing the cores
+            stream_audio (bool): If True, MP3s are encoded while downloading where the format allows
+        """
+        self.output_path = output_path or os.path.join(os.getcwd(), 'downloads')
+        self.audio_only = audio_only or format_selector == 'audio_only'
+        self.format_selector = None if format_selector == 'audio_only' else format_selector
+        self.use_archive = use_archive
+        self.incremental_sync = incremental_sync
+        self.resolve_limit = resolve_limit
+        self.download_limit = download_limit
+        self.postprocess_limit = postprocess_limit or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.job_timeout = job_timeout
+        self.bandwidth = bandwidth
+        self.fragments = fragments or FragmentBudget()
+        self.fragments.expected_jobs = download_limit
+        self.stream_audio = stream_audio
+        self.ffmpeg = ffmpeg or FFmpegManager(min(self.postprocess_limit, os.cpu_count() or 1))
+        self._cancel_events: Dict[int, threading.Event] = {}
+
+    # ----------------------------------------------------------------
+    # Blocking work (runs in executors)
+    # ----------------------------------------------------------------
+
+    def _download_blocking(self, task: Dict, cancelled: threading.Event, post_process) -> Dict:
+        """Download one video; post-processing is handed to the async stage"""
+
+        def check_cancelled(status: Dict) -> None:
+            if cancelled.is_set():
+                raise JobCancelled()
+
+        finished_files = []
+        entry = task.get('entry') or {'_type': 'url', 'url': task['url']}
+        with self.fragments.job() as fragment_downloads:
+            ydl_opts = build_download_options(self.output_path, task['content_type'], self.audio_only,
+                                              self.format_selector, bandwidth=self.bandwidth,
+                                              fragment_downloads=fragment_downloads, ffmpeg=self.ffmpeg,
+                                              stream_audio=self.stream_audio)
+            ydl_opts['progress_hooks'] = [check_cancelled] + ydl_opts.get('progress_hooks', [])
+            ydl_opts['post_hooks'] = [finished_files.append]
+            if self.use_archive:
+                ydl_opts['download_archive'] = download_archive
+            if task.get('sync') is not None:
+                ydl_opts['postprocessor_hooks'] = [task['sync'].postprocessor_hook]
+
+            with create_downloader(ydl_opts, post_process) as ydl:
+                info = ydl.process_ie_result(entry, download=True, extra_info=task.get('extra_info') or {})
+                archived = not finished_files and self._archived(ydl, task, info)
+        return {'jobs': ydl.post_process_jobs, 'files': finished_files, 'archived': archived}
+
+    def _archived(self, ydl, task: Dict, info: Optional[Dict]) -> bool:
+        """Check if yt-dlp skipped the video because it is in the download archive"""
+        if not self.use_archive:
+            return False
+        if info is not None:
+            return ydl.in_download_archive(info)
+        # yt-dlp returns nothing when it skips an archived video before extracting it
+        archive_id = task_video_id(task)
+        return archive_id is not None and archive_id in download_archive
+
+    # ----------------------------------------------------------------
+    # Coroutines
+    # ----------------------------------------------------------------
+
+    async def _run_job(self, task: Dict) -> Dict:
+        """Download and post-process one video, with timeout and cancellation"""
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+        self._cancel_events[id(cancelled)] = cancelled
+        started = time.monotonic()
+        name = task.get('title') or task['url']
+        result = {'kind': 'video', 'url': task['url'], 'source_url': task.get('source_url', task['url']),
+                  'success': False, 'skipped': False, 'files': []}
+
+        try:
+            # Waiting for a download slot doesn't count against the job's timeout
+            await self._download_slots.acquire()
+            future = loop.run_in_executor(self._download_executor, self._download_blocking,
+                                          task, cancelled, self._post_process)
+            # Keep the slot until the thread has really stopped, even if we stop waiting
+            future.add_done_callback(lambda _: self._download_slots.release())
+            # Only the download can be stopped (at its next progress update), so only it is timed
+            outcome = await asyncio.wait_for(asyncio.shield(future), self.job_timeout)
+            for job in outcome['jobs']:
+                # A running FFmpeg job can't be stopped; don't let cancellation free its pending slot early
+                await asyncio.shield(asyncio.wrap_future(job))
+        except asyncio.TimeoutError:
+            cancelled.set()
+            result['message'] = f"⏱️ Timed out after {self.job_timeout:g}s: '{name}'"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        except Exception as e:
+            result['message'] = f"❌ Error downloading '{name}': {str(e)}"
+        else:
+            result['files'] = outcome['files']
+            result['success'] = bool(outcome['files']) or outcome['archived']
+            result['skipped'] = outcome['archived']
+            if outcome['files']:
+                result['message'] = f"✅ Downloaded '{name}'"
+            elif outcome['archived']:
+                result['message'] = f"⏭️ Skipped '{name}': already in the download archive"
+            else:
+                result['message'] = f"❌ Failed to download '{name}'. Video may be private or unavailable."
+        finally:
+            self._cancel_events.pop(id(cancelled), None)
+
+        result['elapsed'] = time.monotonic() - started
+        return result
+
+    async def _run_collection(self, url: str, content_type: str, results: asyncio.Queue) -> Dict:
+        """List a playlist/channel in the resolve executor and run its videos as jobs"""
+        loop = asyncio.get_running_loop()
+        sync = None
+        if self.incremental_sync and content_type == 'channel':
+            sync = ChannelSync(channel_sync_state, canonicalize_url(url))
+        collection = {
+            'title': url, 'content_type': content_type, 'queued': 0, 'completed': 0,
+            'skipped': 0, 'failed': [], 'error': None, 'sync': sync,
+        }
+        jobs: List[asyncio.Task] = []
+
+        async def run_entry(task: Dict) -> None:
+            try:
+                result = await self._run_job(task)
+            finally:
+                self._in_flight.release()
+            if result['skipped']:
+                collection['skipped'] += 1
+            elif result['success']:
+                collection['completed'] += 1
+            else:
+                collection['failed'].append(result)
+            await results.put(result)
+
+        entries = expand_collection(url, content_type, collection, self.use_archive, sync)
+        try:
+            while True:
+                async with self._resolve_slots:
+                    task = await loop.run_in_executor(self._resolve_executor, next, entries, None)
+                if task is None:
+                    break
+                await self._in_flight.acquire()
+                collection['queued'] += 1
+                jobs.append(asyncio.ensure_future(run_entry(task)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            collection['error'] = str(e)
+        finally:
+            await loop.run_in_executor(self._resolve_executor, entries.close)
+
+        await asyncio.gather(*jobs)
+        result = collection_result(url, collection, self.audio_only)
+        result.update(kind='collection', source_url=url)
+        return result
+
+    async def _run_url(self, url: str, results: asyncio.Queue) -> None:
+        """Resolve one input URL and run it"""
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._resolve_slots:
+                content_type = await loop.run_in_executor(self._resolve_executor, get_content_type, url)
+            if content_type in ('playlist', 'channel'):
+                result = await self._run_collection(url, content_type, results)
+            else:
+                await self._in_flight.acquire()
+                try:
+                    result = await self._run_job({'kind': 'url', 'url': url, 'content_type': 'video'})
+                finally:
+                    self._in_flight.release()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result = {'kind': 'video', 'url': url, 'source_url': url, 'success': False, 'skipped': False,
+                      'message': f"❌ Error: {str(e)}"}
+        await results.put(result)
+
+    async def run(self, urls: List[str]) -> AsyncIterator[Dict]:
+        """
+        Download URLs and stream results as they finish.
+
+        Args:
+            urls (List[str]): Videos, playlists and channels
+
+        Yields:
+            dict: One result per video ('kind': 'video') and one per playlist or
+            channel once all its videos finished ('kind': 'collection'), with
+            url, source_url, success and message. Video results also have
+            skipped (True for videos already in the download archive)
+        """
+        loop = asyncio.get_running_loop()
+        self._resolve_slots = asyncio.Semaphore(self.resolve_limit)
+        self._download_slots = asyncio.Semaphore(self.download_limit)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._resolve_executor = ThreadPoolExecutor(max_workers=self.resolve_limit,
+                                                    thread_name_prefix='engine-resolve')
+        self._download_executor = ThreadPoolExecutor(max_workers=self.download_limit,
+                                                     thread_name_prefix='engine-download')
+        self._post_process = AsyncPostProcessStage(loop, self.postprocess_limit,
+                                                   max_pending=self.postprocess_limit * 2)
+
+        results: asyncio.Queue = asyncio.Queue()
+        url_tasks = [asyncio.ensure_future(self._run_url(url, results)) for url in dict.fromkeys(urls)]
+        done = asyncio.ensure_future(asyncio.gather(*url_tasks))
+        done.add_done_callback(lambda _: results.put_nowait(None))
+
+        try:
+            while True:
+                result = await results.get()
+                if result is None:
+                    break
+                yield result
+            await done
+        finally:
+            # Consumer stopped early or was cancelled: stop everything still running
+            if not done.done():
+                self.cancel()
+                for task in url_tasks:
+                    task.cancel()
+                await asyncio.gather(*url_tasks, return_exceptions=True)
+            self._resolve_executor.shutdown(wait=False)
+            self._download_executor.shutdown(wait=False)
+            self._post_process.shutdown()
+
+    def cancel(self) -> None:
+        """Ask every running download to stop at its next progress update"""
+        for event in list(self._cancel_events.values()):
+            event.set()
+
+
+async def download_all(urls: List[str], **engine_options) -> List[Dict]:
+    """
+    Download URLs with a DownloadEngine and collect every result.
+
+    Args:
+        urls (List[str]): Videos, playlists and channels
+        **engine_options: Passed to DownloadEngine
+
+    Returns:
+        List[dict]: Results in completion order
+    """
+    return [result async for result in DownloadEngine(**engine_options).run(urls)]
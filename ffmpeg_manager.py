@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+FFmpeg Process Manager
+======================
+
+Runs the FFmpeg processes of yt-dlp's post-processors (merging, fixups,
+MP4 finalization, MP3 extraction) under one manager. Without it, every
+worker starts FFmpeg with no thread limit, so several overlapping jobs
+each spawn a thread per core and thrash the CPU.
+
+Features:
+- Caps the number of FFmpeg processes running at once
+- Thread budget per process: CPU cores / concurrent processes (-threads)
+- Optional lower CPU and I/O priority on Linux (nice / ionice)
+- Wall time and CPU seconds of every job, plus totals for the summary
+- Also runs FFmpeg processes fed through pipes (streamed MP3 encoding); those
+  are paced by their download and stay outside the process limit
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from yt_dlp.postprocessor import ffmpeg as ffmpeg_postprocessor
+from yt_dlp.utils import Popen
+
+
+# ionice scheduling classes by name
+IONICE_CLASSES = {
+    'idle': ['-c', '3'],
+    'best-effort': ['-c', '2', '-n', '7'],
+}
+
+# Manager of the FFmpeg runs started by the current thread (see FFmpegManager.activate)
+_active = threading.local()
+
+
+def thread_budget(processes: int, cores: Optional[int] = None) -> int:
+    """
+    FFmpeg threads per process so that all processes together use each core once.
+
+    Args:
+        processes (int): FFmpeg processes running at once
+        cores (int, optional): CPU cores. Defaults to os.cpu_count()
+
+    Returns:
+        int: Threads per process (at least 1)
+    """
+    cores = cores or os.cpu_count() or 1
+    return max(1, cores // max(1, processes))
+
+
+def _exit_code(status: int) -> int:
+    """Popen-style return code from a wait status (negative signal number if killed)"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+# ====================================================================
+# Process Manager
+# ====================================================================
+
+class FFmpegManager:
+    """
+    Thread-safe runner for FFmpeg commands. Post-processing threads run
+    their FFmpeg calls through it inside activate(); each call waits for a
+    free process slot and gets its share of the CPU cores.
+    """
+
+    def __init__(self, max_processes: Optional[int] = None, threads: Optional[int] = None,
+                 nice: Optional[int] = None, ionice: Optional[str] = None,
+                 report: Optional[Callable[[str], None]] = print,
+                 on_job: Optional[Callable[[Dict], None]] = None, slots=None,
+                 on_start: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            max_processes (int, optional): FFmpeg processes at once. Defaults to the CPU count
+            threads (int, optional): Threads per FFmpeg process. Defaults to thread_budget()
+            nice (int, optional): Niceness of FFmpeg processes (Linux)
+            ionice (str, optional): I/O scheduling class, 'idle' or 'best-effort' (Linux)
+            report (callable, optional): Receives one line per finished job; None to stay quiet
+            on_job (callable, optional): Receives the stats dict of every finished job
+            slots (optional): Semaphore limiting the processes, e.g. a multiprocessing
+                semaphore shared by worker processes. Defaults to one of max_processes
+            on_start (callable, optional): Called when a job gets its slot and starts
+
+        Raises:
+            ValueError: If ionice isn't a known class
+        """
+        if ionice is not None and ionice not in IONICE_CLASSES:
+            raise ValueError(f"Unknown ionice class '{ionice}' (choose from {', '.join(IONICE_CLASSES)})")
+        self.max_processes = max(1, max_processes or os.cpu_count() or 1)
+        self.threads = threads or thread_budget(self.max_processes)
+        self.nice = nice
+        self.ionice = ionice
+        self.report = report
+        self.jobs: List[Dict] = []
+        self.running = 0
+        self.peak = 0
+        self.on_job = on_job
+        self.on_start = on_start
+        self._slots = slots or threading.BoundedSemaphore(self.max_processes)
+        self._lock = threading.Lock()
+
+    def options(self) -> Dict:
+        """Constructor arguments, e.g. to set up the same manager in a worker process"""
+        return {'max_processes': self.max_processes, 'threads': self.threads,
+                'nice': self.nice, 'ionice': self.ionice}
+
+    def describe(self) -> str:
+        """One line for the startup banner"""
+        text = f"up to {self.max_processes} at once, {self.threads} thread(s) each"
+        if self.nice is not None:
+            text += f", nice {self.nice}"
+        if self.ionice is not None:
+            text += f", ionice {self.ionice}"
+        return text
+
+    @contextmanager
+    def activate(self) -> Iterator['FFmpegManager']:
+        """Run the FFmpeg calls yt-dlp makes in this thread through this manager"""
+        install()
+        previous = getattr(_active, 'manager', None)
+        _active.manager = self
+        try:
+            yield self
+        finally:
+            _active.manager = previous
+
+    @staticmethod
+    def manages(args: List[str]) -> bool:
+        """True for FFmpeg runs that write an output (not probes or version checks)"""
+        if not args or not os.path.basename(str(args[0])).lower().startswith('ffmpeg'):
+            return False
+        inputs = [index for index, arg in enumerate(args) if arg == '-i']
+        return bool(inputs) and inputs[-1] + 2 < len(args)
+
+    def command(self, args: List[str]) -> List[str]:
+        """
+        Add the thread budget and, on Linux, the priority wrappers to an FFmpeg command.
+
+        Args:
+            args (List[str]): FFmpeg command as yt-dlp built it
+
+        Returns:
+            List[str]: Command to run
+        """
+        args = list(args)
+        # Output option: goes right after the last input
+        last_input = max(index for index, arg in enumerate(args) if arg == '-i')
+        args[last_input + 2:last_input + 2] = ['-threads', str(self.threads)]
+
+        prefix = []
+        if sys.platform.startswith('linux'):
+            if self.ionice is not None and shutil.which('ionice'):
+                prefix += ['ionice'] + IONICE_CLASSES[self.ionice]
+            if self.nice is not None and shutil.which('nice'):
+                prefix += ['nice', '-n', str(self.nice)]
+        return prefix + args
+
+    @staticmethod
+    def _wait(process: Popen) -> Optional[float]:
+        """Wait for a process; CPU seconds come from wait4() where the platform has it"""
+        if hasattr(os, 'wait4') and process.returncode is None:
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = _exit_code(status)
+            return usage.ru_utime + usage.ru_stime
+        process.wait()
+        return None
+
+    def _execute(self, args: List[str]) -> Tuple[bytes, bytes, int, Optional[float]]:
+        """Run a command and capture its output"""
+        with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            process = Popen(args, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr)
+            try:
+                cpu_seconds = self._wait(process)
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            stdout.seek(0)
+            stderr.seek(0)
+            return stdout.read(), stderr.read(), process.returncode, cpu_seconds
+
+    def run(self, args: List[str], *, text: bool = False, **kwargs) -> Tuple:
+        """
+        Run an FFmpeg command in a free slot. Same interface as yt-dlp's
+        Popen.run; output is always captured, other Popen options are ignored.
+
+        Args:
+            args (List[str]): FFmpeg command
+            text (bool): If True, return stdout and stderr as text
+
+        Returns:
+            tuple: (stdout, stderr, returncode)
+        """
+        queued = time.monotonic()
+        with self._slots:
+            started = time.monotonic()
+            self.job_started()
+            try:
+                stdout, stderr, returncode, cpu_seconds = self._execute(self.command(args))
+            finally:
+                self._job_ended()
+
+        self._finished(args, queued, started, returncode, cpu_seconds)
+        if text:
+            stdout = stdout.decode('utf-8', 'replace')
+            stderr = stderr.decode('utf-8', 'replace')
+        return stdout, stderr, returncode
+
+    @contextmanager
+    def piped(self, args: List[str], limited: bool = True, **kwargs) -> Iterator[Popen]:
+        """
+        Run an FFmpeg command the caller feeds or reads through pipes. The
+        process is waited for when the block ends, and killed first if the
+        block raised.
+
+        Args:
+            args (List[str]): FFmpeg command
+            limited (bool): If True, wait for a free slot first. Pass False for
+                runs paced by a download (streamed encoding): they only get the
+                thread budget, priority and statistics, and don't count as running
+            **kwargs: Popen options (stdin, stdout, stderr)
+
+        Yields:
+            Popen: The running process; its returncode is set after the block
+        """
+        queued = time.monotonic()
+        with self._slots if limited else nullcontext():
+            started = time.monotonic()
+            if limited:
+                self.job_started()
+            try:
+                process = Popen(self.command(args), **kwargs)
+                try:
+                    yield process
+                except BaseException:
+                    process.kill()
+                    raise
+                finally:
+                    cpu_seconds = self._wait(process)
+                    self._finished(args, queued, started, process.returncode, cpu_seconds, limited)
+            finally:
+                if limited:
+                    self._job_ended()
+
+    def _finished(self, args: List[str], queued: float, started: float, returncode: int,
+                  cpu_seconds: Optional[float], limited: bool = True) -> None:
+        """Record a job that ran in this process"""
+        self.record({'output': os.path.basename(str(args[-1]).replace('file:', '', 1)),
+                     'seconds': time.monotonic() - started, 'cpu_seconds': cpu_seconds,
+                     'waited': started - queued, 'threads': self.threads, 'returncode': returncode,
+                     'limited': limited})
+
+    def job_started(self) -> None:
+        """Count a job that got its slot (also called for jobs of worker processes)"""
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        if self.on_start is not None:
+            self.on_start()
+
+    def _job_ended(self) -> None:
+        with self._lock:
+            self.running -= 1
+
+    def record_remote(self, job: Dict) -> None:
+        """
+        Record a job a worker process ran (it reported job_started() earlier,
+        unless the job ran outside the process limit).
+
+        Args:
+            job (dict): Stats dict the worker's manager passed to on_job
+        """
+        if job.get('limited', True):
+            self._job_ended()
+        self.record(job)
+
+    def cpu_demand(self) -> float:
+        """
+        CPU cores the running jobs can keep busy.
+
+        Returns:
+            float: Running processes x threads, at most the number of cores
+        """
+        with self._lock:
+            return float(min(os.cpu_count() or 1, self.running * self.threads))
+
+    def record(self, job: Dict) -> None:
+        """
+        Add a finished job to the statistics and report it.
+
+        Args:
+            job (dict): output, seconds, cpu_seconds, waited, threads and returncode
+        """
+        with self._lock:
+            self.jobs.append(job)
+        if self.report is not None:
+            self.report(f"⏱️  FFmpeg job '{job['output']}': {self.describe_job(job)}")
+        if self.on_job is not None:
+            self.on_job(job)
+
+    def describe_job(self, job: Dict) -> str:
+        """e.g. '12.3s, 40.1 CPU-s (3.3 cores), 4 thread(s), waited 2.0s for a slot'"""
+        text = f"{job['seconds']:.1f}s"
+        if job['cpu_seconds'] is not None:
+            text += f", {job['cpu_seconds']:.1f} CPU-s ({job['cpu_seconds'] / max(job['seconds'], 0.001):.1f} cores)"
+        text += f", {job['threads']} thread(s)"
+        if job['waited'] >= 0.1:
+            text += f", waited {job['waited']:.1f}s for a slot"
+        if job['returncode'] != 0:
+            text += f", exit code {job['returncode']}"
+        return text
+
+    def stats(self) -> Dict:
+        """
+        Get totals for the download summary.
+
+        Returns:
+            dict: jobs, seconds (FFmpeg wall time), cpu_seconds (None if not
+            measurable here), waited (time spent waiting for a slot) and peak
+            (most processes at once, including those of worker processes)
+        """
+        with self._lock:
+            jobs = list(self.jobs)
+            peak = self.peak
+        cpu = [job['cpu_seconds'] for job in jobs if job['cpu_seconds'] is not None]
+        return {
+            'jobs': len(jobs),
+            'seconds': sum(job['seconds'] for job in jobs),
+            'cpu_seconds': sum(cpu) if cpu else None,
+            'waited': sum(job['waited'] for job in jobs),
+            'peak': peak,
+        }
+
+
+# ====================================================================
+# yt-dlp Integration
+# ====================================================================
+
+class ManagedPopen(Popen):
+    """
+    yt-dlp's Popen as seen by its FFmpeg post-processors: FFmpeg runs of a
+    thread inside FFmpegManager.activate() go through that manager, all
+    other commands run unchanged.
+    """
+
+    @classmethod
+    def run(cls, *args, **kwargs):
+        manager = active_manager()
+        if manager is not None and args and manager.manages(args[0]):
+            kwargs.pop('stdin', None)
+            kwargs.pop('stdout', None)
+            kwargs.pop('stderr', None)
+            return manager.run(args[0], **kwargs)
+        return super().run(*args, **kwargs)
+
+
+def active_manager() -> Optional[FFmpegManager]:
+    """Manager activated in the current thread (see FFmpegManager.activate), if any"""
+    return getattr(_active, 'manager', None)
+
+
+def install() -> None:
+    """Route the FFmpeg post-processors' process launches through ManagedPopen"""
+    ffmpeg_postprocessor.Popen = ManagedPopen
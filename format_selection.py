@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Compatibility-First Format Selection
+====================================
+
+Chooses which video and audio streams to download for MP4 output. Within
+the height limit, candidates (video+audio pairs and combined formats) are
+ranked by quality and by the cost of turning them into an MP4: streams
+that can be stream-copied beat streams that must be transcoded. On YouTube
+this normally picks H.264 (avc1) + AAC (mp4a), which needs no transcoding.
+
+Features:
+- Quality first (height, frame rate), then conversion cost, then bitrate
+- Works as a yt-dlp 'format' option (a picklable callable)
+- Pure ranking functions; test them offline against saved format tables:
+      python format_selection.py info.json --height 1080
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import sys
+import json
+import argparse
+from typing import Dict, Iterator, List, Optional, Union
+
+from remux import MP4_AUDIO_CODECS, MP4_VIDEO_CODECS, codec_family
+
+
+# Cost of getting a stream into the MP4: 0 = plays everywhere as is,
+# COPY_COST = stream copy that fewer players decode, then transcoding
+NATIVE_VIDEO_CODECS = ('h264',)
+COPY_COST = 1
+AUDIO_TRANSCODE_COST = 10
+VIDEO_TRANSCODE_COST = 100
+
+# File extensions that already are MP4 (for formats without codec info)
+MP4_EXTENSIONS = ('mp4', 'm4a', 'm4v')
+
+
+# ====================================================================
+# Costs and Ranking
+# ====================================================================
+
+def video_cost(fmt: Dict) -> int:
+    """
+    Cost of putting a format's video stream into an MP4.
+
+    Args:
+        fmt (dict): yt-dlp format
+
+    Returns:
+        int: 0 (native), COPY_COST or VIDEO_TRANSCODE_COST
+    """
+    codec = codec_family(fmt.get('vcodec'))
+    if codec is None:
+        return 0 if fmt.get('ext') in MP4_EXTENSIONS else VIDEO_TRANSCODE_COST
+    if codec in NATIVE_VIDEO_CODECS:
+        return 0
+    return COPY_COST if codec in MP4_VIDEO_CODECS else VIDEO_TRANSCODE_COST
+
+
+def audio_cost(fmt: Dict) -> int:
+    """
+    Cost of putting a format's audio stream into an MP4.
+
+    Args:
+        fmt (dict): yt-dlp format
+
+    Returns:
+        int: 0 (stream copy) or AUDIO_TRANSCODE_COST
+    """
+    codec = codec_family(fmt.get('acodec'))
+    if codec is None:
+        return 0 if fmt.get('ext') in MP4_EXTENSIONS else AUDIO_TRANSCODE_COST
+    return 0 if codec in MP4_AUDIO_CODECS else AUDIO_TRANSCODE_COST
+
+
+def has_video(fmt: Dict) -> bool:
+    return fmt.get('vcodec') != 'none'
+
+
+def has_audio(fmt: Dict) -> bool:
+    return fmt.get('acodec') != 'none'
+
+
+def is_direct(fmt: Dict) -> bool:
+    """Plain HTTP(S) download, no fragment playlist to assemble"""
+    return (fmt.get('protocol') or 'https') in ('http', 'https')
+
+
+def rank_audio(formats: List[Dict]) -> List[Dict]:
+    """
+    Sort audio-only formats, best first: preferred language, stream copy,
+    direct download, bitrate.
+
+    Args:
+        formats (List[dict]): yt-dlp formats (worst to best, as yt-dlp sorts them)
+
+    Returns:
+        List[dict]: Audio-only formats, best first
+    """
+    candidates = [(index, fmt) for index, fmt in enumerate(formats) if has_audio(fmt) and not has_video(fmt)]
+    candidates.sort(key=lambda item: (
+        item[1].get('language_preference') or 0,
+        -audio_cost(item[1]),
+        is_direct(item[1]),
+        item[1].get('abr') or item[1].get('tbr') or 0,
+        item[0],
+    ), reverse=True)
+    return [fmt for _, fmt in candidates]
+
+
+def rank_candidates(formats: List[Dict], max_height: Optional[int] = None) -> List[Dict]:
+    """
+    Rank everything that could be downloaded for MP4 output, best first.
+    Candidates are video-only formats paired with the best audio, and
+    combined (video with audio) formats.
+
+    Quality comes first (height, then frame rate); among equal quality the
+    cheaper conversion wins, then direct downloads, then bitrate. If no
+    video fits under max_height, the smallest videos above it are ranked first.
+
+    Args:
+        formats (List[dict]): yt-dlp formats (worst to best, as yt-dlp sorts them)
+        max_height (int, optional): Height limit, None for no limit
+
+    Returns:
+        List[dict]: {'video': format or None, 'audio': format or None,
+        'height': int, 'cost': int} per candidate
+    """
+    formats = [fmt for fmt in formats if not fmt.get('has_drm') and (has_video(fmt) or has_audio(fmt))]
+    audio = rank_audio(formats)
+    best_audio = audio[0] if audio else None
+
+    candidates = []
+    for index, fmt in enumerate(formats):
+        if not has_video(fmt):
+            continue
+        if has_audio(fmt):
+            candidate = {'video': fmt, 'audio': None, 'cost': video_cost(fmt) + audio_cost(fmt)}
+        elif best_audio is not None:
+            candidate = {'video': fmt, 'audio': best_audio,
+                         'cost': video_cost(fmt) + audio_cost(best_audio)}
+        else:
+            candidate = {'video': fmt, 'audio': None, 'cost': video_cost(fmt)}
+        candidate['height'] = fmt.get('height') or 0
+        candidate['index'] = index
+        candidates.append(candidate)
+
+    if not candidates:
+        # Audio-only sources
+        return [{'video': None, 'audio': fmt, 'height': 0, 'cost': audio_cost(fmt)} for fmt in audio]
+
+    fitting = [c for c in candidates if max_height is None or c['height'] <= max_height]
+    over_limit = not fitting
+    if over_limit:
+        fitting = candidates
+
+    def quality(candidate: Dict):
+        video = candidate['video']
+        height = -candidate['height'] if over_limit else candidate['height']
+        return (height, video.get('fps') or 0, -candidate['cost'], is_direct(video),
+                video.get('tbr') or video.get('vbr') or 0, candidate['index'])
+
+    fitting.sort(key=quality, reverse=True)
+    for candidate in fitting:
+        del candidate['index']
+    return fitting
+
+
+def merge_formats(video: Dict, audio: Dict, container: str) -> Dict:
+    """
+    Build the merged format yt-dlp downloads for a video+audio pair.
+
+    Args:
+        video (dict): Video-only format
+        audio (dict): Audio-only format
+        container (str): Output container (merge target)
+
+    Returns:
+        dict: Format with requested_formats, as yt-dlp's own selector returns it
+    """
+    pair = [video, audio]
+    return {
+        'requested_formats': pair,
+        'format': '+'.join(fmt.get('format') or fmt['format_id'] for fmt in pair),
+        'format_id': '+'.join(fmt['format_id'] for fmt in pair),
+        'ext': container,
+        'protocol': '+'.join(fmt.get('protocol') or 'https' for fmt in pair),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'fps': video.get('fps'),
+        'dynamic_range': video.get('dynamic_range'),
+        'vcodec': video.get('vcodec'),
+        'vbr': video.get('vbr'),
+        'acodec': audio.get('acodec'),
+        'abr': audio.get('abr'),
+        'asr': audio.get('asr'),
+        'audio_channels': audio.get('audio_channels'),
+        'tbr': sum(fmt.get('tbr') or 0 for fmt in pair) or None,
+        'filesize_approx': sum(fmt.get('filesize') or fmt.get('filesize_approx') or 0 for fmt in pair) or None,
+    }
+
+
+# ====================================================================
+# yt-dlp Format Selector
+# ====================================================================
+
+class CompatibleFormatSelector:
+    """
+    yt-dlp 'format' option that picks the best candidate from rank_candidates.
+    Module-level and plain attributes only, so it can be pickled into worker
+    processes.
+    """
+
+    def __init__(self, max_height: Optional[int] = None, container: str = 'mp4'):
+        """
+        Args:
+            max_height (int, optional): Height limit, None for the best available
+            container (str): Output container of merged downloads
+        """
+        self.max_height = max_height
+        self.container = container
+
+    def __call__(self, ctx: Dict) -> Iterator[Dict]:
+        ranked = rank_candidates(list(ctx['formats']), self.max_height)
+        if not ranked:
+            return
+        best = ranked[0]
+        if best['video'] is None:
+            yield best['audio']
+        elif best['audio'] is None:
+            yield best['video']
+        else:
+            yield merge_formats(best['video'], best['audio'], self.container)
+
+    def __repr__(self) -> str:
+        # Stable text: worker processes key their downloaders by the options
+        return f"CompatibleFormatSelector(max_height={self.max_height!r}, container={self.container!r})"
+
+
+# A yt-dlp format string, or a selector object
+FormatSelector = Union[str, CompatibleFormatSelector]
+
+
+def describe_candidate(candidate: Dict) -> str:
+    """One line per candidate, e.g. '137+140  1080p30  avc1.640028 + mp4a.40.2  cost 0'"""
+    video, audio = candidate['video'], candidate['audio']
+    parts = [fmt for fmt in (video, audio) if fmt is not None]
+    ids = '+'.join(fmt['format_id'] for fmt in parts)
+    codecs = [video.get('vcodec')] if video is not None else []
+    if audio is not None or (video is not None and has_audio(video)):
+        codecs.append((audio or video).get('acodec'))
+    codecs = ' + '.join(str(codec) for codec in codecs)
+    resolution = f"{candidate['height']}p{video.get('fps') or ''}" if video is not None else 'audio'
+    return f"{ids:<12} {resolution:<9} {codecs:<32} cost {candidate['cost']}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rank the formats of a saved info JSON (yt-dlp --write-info-json)")
+    parser.add_argument('info_json', help="info JSON file, or - for stdin")
+    parser.add_argument('--height', type=int, default=1080, help="height limit (default: 1080, 0 for none)")
+    parser.add_argument('--top', type=int, default=10, help="candidates to show (default: 10)")
+    args = parser.parse_args()
+
+    if args.info_json == '-':
+        info = json.load(sys.stdin)
+    else:
+        with open(args.info_json, encoding='utf-8') as f:
+            info = json.load(f)
+
+    ranked = rank_candidates(info.get('formats') or [], args.height or None)
+    print(f"📺 {info.get('title', 'Unknown')}: {len(ranked)} candidate(s), best first")
+    for candidate in ranked[:args.top]:
+        print(f"   {describe_candidate(candidate)}")
+
+
+if __name__ == "__main__":
+    main()
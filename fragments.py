@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Fragment Download Concurrency
+=============================
+
+Chooses yt-dlp's concurrent_fragment_downloads per job, so DASH/HLS
+videos fetch several fragments at once while the total number of open
+connections across all running downloads stays within one budget.
+
+Features:
+- Fixed mode: the same fragment concurrency for every job
+- Auto mode: each job gets a fair share of the connection budget,
+  based on how many downloads are running when it starts
+- Connections are returned to the budget when a download finishes
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+# Defaults for auto mode
+DEFAULT_CONNECTION_BUDGET = 16
+DEFAULT_MAX_PER_JOB = 8
+
+
+def parse_fragments(value: str) -> Optional[int]:
+    """
+    Parse the --fragments option.
+
+    Args:
+        value (str): 'auto' or a positive number
+
+    Returns:
+        Optional[int]: Fixed fragment concurrency, None for auto
+
+    Raises:
+        ValueError: If the value is neither
+    """
+    if value.strip().lower() == 'auto':
+        return None
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is neither 'auto' nor a number")
+    if count < 1:
+        raise ValueError("fragment concurrency must be at least 1")
+    return count
+
+
+class FragmentBudget:
+    """
+    Hands out fragment connections to download jobs within a global budget.
+    """
+
+    def __init__(self, fixed: Optional[int] = None, budget: int = DEFAULT_CONNECTION_BUDGET,
+                 max_per_job: int = DEFAULT_MAX_PER_JOB, expected_jobs: int = 1):
+        """
+        Args:
+            fixed (int, optional): Same fragment concurrency for every job; None for auto mode
+            budget (int): Total fragment connections of all running jobs (auto mode).
+                Every job gets at least one connection, even when the budget is used up
+            max_per_job (int): Most connections a single job gets (auto mode)
+            expected_jobs (int): Downloads expected to run at once (the worker count), so
+                the first jobs of a run don't take the whole budget (auto mode)
+        """
+        self.fixed = fixed
+        self.budget = max(1, budget)
+        self.max_per_job = max(1, max_per_job)
+        self.expected_jobs = max(1, expected_jobs)
+        self.in_use = 0
+        self.peak = 0
+        self._jobs = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        """
+        Reserve connections for a job that is starting.
+
+        Returns:
+            int: Value for concurrent_fragment_downloads
+        """
+        with self._lock:
+            if self.fixed is not None:
+                count = self.fixed
+            else:
+                # Fair share with the jobs running or about to start, never beyond what is left
+                share = self.budget // max(self._jobs + 1, self.expected_jobs)
+                count = max(1, min(self.max_per_job, share, self.budget - self.in_use))
+            self._jobs += 1
+            self.in_use += count
+            self.peak = max(self.peak, self.in_use)
+            return count
+
+    def release(self, count: int) -> None:
+        """
+        Return a finished job's connections.
+
+        Args:
+            count (int): Value returned by acquire()
+        """
+        with self._lock:
+            self._jobs -= 1
+            self.in_use -= count
+
+    @contextmanager
+    def job(self) -> Iterator[int]:
+        """
+        Reserve connections for the duration of a download.
+
+        Yields:
+            int: Value for concurrent_fragment_downloads
+        """
+        count = self.acquire()
+        try:
+            yield count
+        finally:
+            self.release(count)
+
+    def describe(self) -> str:
+        """One line for the startup banner"""
+        if self.fixed is not None:
+            return f"{self.fixed} per video"
+        return f"auto (up to {self.max_per_job} per video, {self.budget} connections in total)"
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Persistent Metadata Cache
+=========================
+
+On-disk cache for URL classification results used by the YouTube Downloader.
+
+Features:
+- SQLite store keyed by canonical URL (aliases of the same URL share an entry)
+- Per-content-type TTLs (videos live long, channels change often)
+- Byte-size-bounded LRU eviction
+- Hit/miss/eviction counters for the download summary
+- Single-flight coalescing so concurrent lookups of one URL extract it once
+- Short-lived in-memory TTL cache for full format tables
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Optional, Dict, Tuple
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+# ====================================================================
+# Cache Configuration
+# ====================================================================
+
+# Time-to-live per content type, in seconds
+CONTENT_TYPE_TTLS = {
+    'video': 30 * 24 * 3600,   # Video metadata practically never changes
+    'playlist': 6 * 3600,      # Playlists get edited occasionally
+    'channel': 3600,           # Channels get new uploads all the time
+}
+
+# Upper bound for the total size of cached info dicts
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Keys kept from yt-dlp info dicts (everything else is dropped before storing)
+TRIMMED_INFO_KEYS = (
+    '_type', 'id', 'title', 'url', 'webpage_url', 'extractor', 'extractor_key',
+    'ie_key', 'uploader', 'uploader_id', 'channel', 'channel_id', 'playlist_count',
+    'duration', 'upload_date', 'filesize', 'filesize_approx', 'tbr',
+)
+
+
+def get_cache_dir() -> str:
+    """
+    Get the directory used for persistent caches.
+    Honours YTDP_CACHE_DIR, then the platform's usual cache location.
+
+    Returns:
+        str: Cache directory path (not necessarily existing yet)
+    """
+    override = os.environ.get('YTDP_CACHE_DIR')
+    if override:
+        return override
+
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base, 'youtube-downloader-pro')
+
+
+def get_data_dir() -> str:
+    """
+    Get the directory used for persistent state that must not be thrown
+    away like a cache (sync watermarks, download archive).
+    Honours YTDP_DATA_DIR, then the platform's usual data location.
+
+    Returns:
+        str: Data directory path (not necessarily existing yet)
+    """
+    override = os.environ.get('YTDP_DATA_DIR')
+    if override:
+        return override
+
+    if sys.platform.startswith('win'):
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+
+    return os.path.join(base, 'youtube-downloader-pro')
+
+
+# ====================================================================
+# URL Canonicalization
+# ====================================================================
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a YouTube URL so that aliases map to the same cache key.
+    Handles youtu.be short links, mobile/www hosts, tracking parameters
+    and trailing slashes.
+
+    Args:
+        url (str): YouTube URL
+
+    Returns:
+        str: Canonical URL string
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.netloc or '').lower()
+    path = parsed.path.rstrip('/') or '/'
+    query = parse_qs(parsed.query)
+
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+
+    if host == 'youtu.be':
+        # youtu.be/VIDEO_ID is an alias for youtube.com/watch?v=VIDEO_ID
+        video_id = path.strip('/')
+        host, path = 'youtube.com', '/watch'
+        query['v'] = [video_id]
+
+    # Only 'v' and 'list' change what the URL points to
+    kept = [(key, query[key][0]) for key in ('list', 'v') if query.get(key)]
+    canonical = f"https://{host}{path}"
+    if kept:
+        canonical += '?' + urlencode(kept)
+    return canonical
+
+
+def trim_info(info: Optional[Dict]) -> Dict:
+    """
+    Reduce a yt-dlp info dict to the small set of fields worth caching.
+
+    Args:
+        info (dict): Info dict returned by yt-dlp
+
+    Returns:
+        dict: JSON-serializable subset of the info dict
+    """
+    if not info:
+        return {}
+    return {key: info[key] for key in TRIMMED_INFO_KEYS
+            if key in info and isinstance(info[key], (str, int, float, bool, type(None)))}
+
+
+# ====================================================================
+# Persistent Cache
+# ====================================================================
+
+class MetadataCache:
+    """
+    SQLite-backed cache of (content_type, trimmed info) per canonical URL.
+    Safe to share between threads; failures to open or write the database
+    disable the cache instead of breaking downloads.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[Dict[str, int]] = None, enabled: bool = True):
+        self.path = path or os.path.join(get_cache_dir(), 'metadata.sqlite3')
+        self.max_bytes = max_bytes
+        self.ttls = dict(CONTENT_TYPE_TTLS, **(ttls or {}))
+        self.enabled = enabled and not os.environ.get('YTDP_NO_CACHE')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the database on first use (caller must hold the lock)"""
+        if self._conn is not None or not self.enabled:
+            return self._conn
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' url TEXT PRIMARY KEY,'
+                ' content_type TEXT NOT NULL,'
+                ' info TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' created REAL NOT NULL,'
+                ' accessed REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+            conn.commit()
+            self._conn = conn
+        except (sqlite3.Error, OSError):
+            # Read-only home, locked database, etc. - run without the cache
+            self.enabled = False
+        return self._conn
+
+    def get(self, url: str) -> Optional[Tuple[str, Dict]]:
+        """
+        Look up a URL in the cache.
+
+        Args:
+            url (str): YouTube URL (any alias)
+
+        Returns:
+            Optional[Tuple[str, Dict]]: (content_type, info) or None on miss/expiry
+        """
+        key = canonicalize_url(url)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                self.misses += 1
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT content_type, info, created FROM entries WHERE url = ?', (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                content_type, info_json, created = row
+                if now - created > self.ttls.get(content_type, 0):
+                    conn.execute('DELETE FROM entries WHERE url = ?', (key,))
+                    conn.commit()
+                    self.misses += 1
+                    return None
+
+                conn.execute('UPDATE entries SET accessed = ? WHERE url = ?', (now, key))
+                conn.commit()
+                self.hits += 1
+                return content_type, json.loads(info_json)
+            except (sqlite3.Error, ValueError):
+                self.misses += 1
+                return None
+
+    def put(self, url: str, content_type: str, info: Optional[Dict]) -> None:
+        """
+        Store a classification result and evict least recently used
+        entries if the cache grew past its byte budget.
+
+        Args:
+            url (str): YouTube URL (any alias)
+            content_type (str): 'video', 'playlist', or 'channel'
+            info (dict): Info dict (trimmed before storing)
+        """
+        key = canonicalize_url(url)
+        info_json = json.dumps(trim_info(info), separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (url, content_type, info, size, created, accessed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, content_type, info_json, len(key) + len(info_json), now, now))
+                self._evict(conn)
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the byte budget is met"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in conn.execute('SELECT url, size FROM entries ORDER BY accessed').fetchall():
+            conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            conn = self._connect()
+            if conn is not None:
+                conn.execute('DELETE FROM entries')
+                conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, entries and total bytes stored
+        """
+        with self._lock:
+            entries, total = 0, 0
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    entries, total = conn.execute(
+                        'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+                except sqlite3.Error:
+                    pass
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': total,
+            }
+
+
+# ====================================================================
+# Single-Flight Request Coalescing
+# ====================================================================
+
+class SingleFlight:
+    """
+    Thread-safe memoizing call coalescer.
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait on the same future instead of repeating the work.
+    Completed results are kept in a bounded LRU map.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.executions = 0
+        self.coalesced = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = OrderedDict()
+
+    def do(self, key: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Return the result for a key, running func(*args) at most once
+        for all concurrent callers.
+
+        Args:
+            key (str): Coalescing key (e.g. a canonical URL)
+            func (Callable): Function producing the result
+            *args: Arguments passed to func
+
+        Returns:
+            Any: The (possibly shared) result of func
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            dict: executions, duplicate calls coalesced onto in-flight work,
+            and memoized hits
+        """
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'hits': self.hits,
+            }
+
+
+# ====================================================================
+# Short-Lived In-Memory Cache
+# ====================================================================
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire after a fixed
+    freshness window. Meant for data that goes stale quickly, such as
+    format tables containing signed media URLs.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 64):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a value, evicting the oldest entry if the cache is full.
+
+        Args:
+            key (str): Cache key
+            value (Any): Value to store
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Get a value if it is still fresh.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Optional[Any]: Stored value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def pop(self, key: str) -> Optional[Any]:
+        """
+        Remove and return a value if it is still fresh.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Optional[Any]: Stored value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
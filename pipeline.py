@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Download / Post-Processing Pipeline
+===================================
+
+Splits every download into two stages. Network workers only download (and
+hand over) files; FFmpeg post-processing (merging, AAC/MP3 conversion) runs
+on a separately sized pool, so the next download starts while the previous
+file is still being transcoded.
+
+Features:
+- Bounded post-processing queue: downloads block when it is full (backpressure)
+- Post-processing pool sized independently (defaults to the CPU count)
+- Post hooks and download archive records are deferred until a file is
+  fully post-processed, so "finished" still means finished
+- Stage timing statistics for the download summary
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import PostProcessingError
+
+from remux import FinalizingYoutubeDL
+from scheduler import WorkQueue
+
+
+# ====================================================================
+# Post-Processing Pool
+# ====================================================================
+
+def run_post_processing(ydl: 'PipelinedYoutubeDL', filename: str, info: Dict,
+                        files_to_move: Optional[Dict] = None) -> Dict:
+    """
+    Post-process a downloaded file, then run the deferred post hooks and
+    download archive record of its downloader.
+
+    Args:
+        ydl (PipelinedYoutubeDL): Downloader whose post-processors and hooks apply
+        filename (str): Downloaded file
+        info (dict): Info dict of the video
+        files_to_move (dict, optional): Extra files yt-dlp moves with the video
+
+    Returns:
+        dict: Post-processed info dict
+    """
+    try:
+        info = FinalizingYoutubeDL.post_process(ydl, filename, info, files_to_move)
+    except PostProcessingError as err:
+        ydl.report_error(f'Postprocessing: {err}')
+        raise
+
+    for hook in ydl.deferred_post_hooks:
+        hook(info['filepath'])
+    if ydl.params.get('download_archive') is not None:
+        YoutubeDL.record_download_archive(ydl, info)
+    return info
+
+
+class PostProcessPool:
+    """
+    Worker pool that runs yt-dlp's post-processors for downloaded files.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Start the post-processing workers.
+
+        Args:
+            max_workers (int, optional): Concurrent FFmpeg jobs. Defaults to the CPU count
+            max_pending (int, optional): Downloaded files that may wait for a worker
+                before downloads block. Defaults to max_workers
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.processed = 0
+        self.failed = 0
+        self.busy_time = 0.0     # Seconds spent post-processing, summed over workers
+        self.blocked_time = 0.0  # Seconds downloads waited for room in the queue
+        self._lock = threading.Lock()
+        self._queue = WorkQueue(self._run, self.max_workers, max_pending=max_pending or self.max_workers,
+                                on_result=self._finished, name='postprocess-worker')
+
+    def submit(self, ydl: 'PipelinedYoutubeDL', filename: str, info: Dict,
+               files_to_move: Optional[Dict] = None) -> Future:
+        """
+        Queue a downloaded file, blocking while the queue is full.
+
+        Args:
+            ydl (PipelinedYoutubeDL): Downloader whose post-processors and hooks apply
+            filename (str): Downloaded file
+            info (dict): Info dict of the video (owned by the job from now on)
+            files_to_move (dict, optional): Extra files yt-dlp moves with the video
+
+        Returns:
+            Future: Resolves once the file has been post-processed
+        """
+        future = Future()
+        started = time.monotonic()
+        self._queue.submit({
+            'ydl': ydl,
+            'filename': filename,
+            'info': info,
+            'files_to_move': files_to_move,
+            'future': future,
+        })
+        with self._lock:
+            self.blocked_time += time.monotonic() - started
+        return future
+
+    def _run(self, job: Dict, worker_id: int) -> Dict:
+        """Post-process one file in a pool worker"""
+        started = time.monotonic()
+        try:
+            return run_post_processing(job['ydl'], job['filename'], job['info'], job['files_to_move'])
+        finally:
+            with self._lock:
+                self.busy_time += time.monotonic() - started
+
+    def _finished(self, job: Dict, result) -> None:
+        """Resolve the job's future from the worker result"""
+        with self._lock:
+            if isinstance(result, Exception):
+                self.failed += 1
+            else:
+                self.processed += 1
+        if isinstance(result, Exception):
+            job['future'].set_exception(result)
+        else:
+            # Don't keep the (large) info dict alive in the task's job list
+            job['future'].set_result(None)
+
+    def join(self) -> None:
+        """Wait until every queued file has been post-processed and stop the workers"""
+        self._queue.join()
+
+    def stats(self) -> Dict:
+        """
+        Get pipeline statistics for the download summary.
+
+        Returns:
+            dict: processed, failed, busy_time and blocked_time (seconds)
+        """
+        with self._lock:
+            return {
+                'processed': self.processed,
+                'failed': self.failed,
+                'busy_time': self.busy_time,
+                'blocked_time': self.blocked_time,
+            }
+
+
+# ====================================================================
+# Downloader Stage
+# ====================================================================
+
+class PipelinedYoutubeDL(FinalizingYoutubeDL):
+    """
+    YoutubeDL that hands each downloaded file to a PostProcessPool (or any
+    object with the same submit() method) instead of post-processing it in
+    the downloading thread.
+    """
+
+    def __init__(self, params: Optional[Dict] = None, post_process_pool=None):
+        super().__init__(params)
+        self.post_process_pool = post_process_pool
+        self.post_process_jobs: List[Future] = []
+        # Post hooks mean "file finished"; run them after post-processing
+        self.deferred_post_hooks, self._post_hooks = self._post_hooks, []
+
+    def post_process(self, filename, info, files_to_move=None):
+        info['filepath'] = filename
+        # The job gets its own copy: yt-dlp (and the prefetcher) keep changing
+        # the original after this returns
+        self.post_process_jobs.append(
+            self.post_process_pool.submit(self, filename, dict(info), files_to_move))
+        return info
+
+    def record_download_archive(self, info_dict):
+        # Recorded by the post-processing pool once the file is finished
+        pass
+
+
+def create_downloader(ydl_opts: Dict, post_process_pool: Optional[PostProcessPool] = None) -> YoutubeDL:
+    """
+    Create the downloader for one task.
+
+    Args:
+        ydl_opts (dict): yt-dlp options
+        post_process_pool (PostProcessPool, optional): Pool for the post-processing stage;
+            without one, files are post-processed in the downloading thread
+
+    Returns:
+        YoutubeDL: Pipelined downloader, or a FinalizingYoutubeDL
+    """
+    if post_process_pool is None:
+        return FinalizingYoutubeDL(ydl_opts)
+    return PipelinedYoutubeDL(ydl_opts, post_process_pool)
+
+
+def deferred_result(ydl: YoutubeDL, make_result: Callable[[], Dict]) -> Dict:
+    """
+    Build a task result now, or defer it until the task's files are post-processed.
+
+    Args:
+        ydl (YoutubeDL): Downloader used by the task
+        make_result (Callable): Builds the final result dict
+
+    Returns:
+        dict: The result, or {'post_processing': [Future, ...], 'finish': make_result}
+        while post-processing jobs are still pending
+    """
+    jobs = getattr(ydl, 'post_process_jobs', None)
+    if not jobs:
+        return make_result()
+    return {'post_processing': jobs, 'finish': make_result}
+
+
+def when_all_done(futures: List[Future], callback: Callable[[], None]) -> None:
+    """
+    Call callback once every future has finished (in the thread finishing the last one).
+
+    Args:
+        futures (List[Future]): Post-processing jobs
+        callback (Callable): Called without arguments
+    """
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_future: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            done = remaining[0] == 0
+        if done:
+            callback()
+
+    if not futures:
+        callback()
+    for future in futures:
+        future.add_done_callback(on_done)
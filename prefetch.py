@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Playlist Metadata Prefetch
+==========================
+
+Overlaps per-video extraction with downloading inside a playlist or channel.
+While yt-dlp downloads entry N, background threads already extract entries
+N+1..N+K, so extraction (including signature solving) leaves the critical path.
+
+Features:
+- Wraps the lazy entry stream of a raw playlist result, order preserved
+- Configurable look-ahead depth K
+- Prefetched info older than a freshness limit is discarded (signed URLs expire)
+- Skip predicate so archived / already-synced entries are never extracted
+- Nested playlists (channel tabs) are wrapped recursively
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from yt_dlp import YoutubeDL
+
+from url_classifier import classify_url
+
+
+# Prefetched info older than this (seconds) is re-extracted by yt-dlp instead
+PREFETCH_MAX_AGE = 20 * 60
+
+# Options that only matter for downloading and must not be copied to the
+# extraction-only YoutubeDL instances used by the prefetch threads
+_DOWNLOAD_ONLY_OPTIONS = (
+    'postprocessors', 'post_hooks', 'postprocessor_hooks', 'progress_hooks',
+    'match_filter', 'download_archive', 'outtmpl', 'lazy_playlist', 'extract_flat', 'logger',
+)
+
+# Bulky fields dropped from entries once they have been downloaded, so a long
+# playlist doesn't keep every format table in memory
+_HEAVY_KEYS = (
+    'formats', 'requested_formats', 'thumbnails', 'subtitles', 'automatic_captions',
+    'heatmap', 'http_headers', 'description',
+)
+
+
+def is_video_entry(entry: Dict) -> bool:
+    """
+    Check if a flat playlist entry points at a single video.
+
+    Args:
+        entry (dict): Flat entry from a raw playlist result
+
+    Returns:
+        bool: True for single-video URL results
+    """
+    if entry.get('_type') != 'url':
+        return False
+    return entry.get('ie_key') == 'Youtube' or classify_url(entry.get('url') or '') == 'video'
+
+
+class EntryPrefetcher:
+    """
+    Resolves upcoming playlist entries in background threads.
+    Each prefetch thread owns its own YoutubeDL instance.
+    """
+
+    def __init__(self, ydl_opts: Dict, depth: int = 2, max_age: float = PREFETCH_MAX_AGE,
+                 skip: Optional[Callable[[Dict], bool]] = None, slim_finished: bool = True):
+        self.ydl_opts = {key: value for key, value in ydl_opts.items() if key not in _DOWNLOAD_ONLY_OPTIONS}
+        self.ydl_opts.update({'quiet': True, 'no_warnings': True})
+        self.depth = max(1, depth)
+        self.max_age = max_age
+        self.skip = skip
+        # Only safe when the consumer finishes each entry before asking for
+        # the next one (yt-dlp's own playlist loop), not for task queues
+        self.slim_finished = slim_finished
+        self.prefetched = 0
+        self.expired = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _extract(self, entry: Dict):
+        """Extract one entry's full info in a prefetch thread"""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self._local.ydl = YoutubeDL(self.ydl_opts)
+        info = ydl.extract_info(entry['url'], download=False, process=False, ie_key=entry.get('ie_key'))
+        return time.monotonic(), info
+
+    def wrap(self, ydl: YoutubeDL, ie_result: Optional[Dict]) -> Optional[Dict]:
+        """
+        Prepare a raw result so its entries are prefetched while downloading.
+        URL results pointing at playlists are extracted (unprocessed) first.
+
+        Args:
+            ydl (YoutubeDL): Downloader that will process the result
+            ie_result (dict): Raw result from extract_info(process=False)
+
+        Returns:
+            Optional[dict]: The result with a prefetching entry stream
+        """
+        if ie_result is None:
+            return None
+
+        if ie_result.get('_type') == 'url' and not is_video_entry(ie_result):
+            resolved = ydl.extract_info(
+                ie_result['url'], download=False, process=False, ie_key=ie_result.get('ie_key'))
+            if resolved is None:
+                return ie_result
+            ie_result = resolved
+
+        if ie_result.get('_type') in ('playlist', 'multi_video') and ie_result.get('entries') is not None:
+            ie_result['entries'] = self._iter_entries(ydl, ie_result['entries'])
+        return ie_result
+
+    def _iter_entries(self, ydl: YoutubeDL, entries: Iterable) -> Iterator:
+        """Yield entries in order, keeping up to depth extractions in flight"""
+        executor = ThreadPoolExecutor(max_workers=self.depth)
+        pending = deque()
+        entries = iter(entries)
+        exhausted = False
+        previous = None
+        try:
+            while True:
+                # Keep the current entry plus `depth` upcoming ones queued
+                while not exhausted and len(pending) <= self.depth:
+                    try:
+                        entry = next(entries)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = None
+                    if entry and is_video_entry(entry) and not (self.skip and self.skip(entry)):
+                        future = executor.submit(self._extract, entry)
+                    pending.append((entry, future))
+
+                if not pending:
+                    return
+
+                entry, future = pending.popleft()
+                if previous is not None:
+                    # yt-dlp has finished with the previous entry by now
+                    for key in _HEAVY_KEYS:
+                        previous.pop(key, None)
+
+                resolved = self._resolve(entry, future)
+                if resolved is entry and entry and not is_video_entry(entry):
+                    resolved = self.wrap(ydl, entry)
+                is_video_info = resolved is not entry and resolved and resolved.get('_type', 'video') == 'video'
+                previous = resolved if is_video_info and self.slim_finished else None
+                yield resolved
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=False)
+
+    def _resolve(self, entry: Optional[Dict], future) -> Optional[Dict]:
+        """Use the prefetched info if it succeeded and is still fresh"""
+        if future is None:
+            return entry
+        try:
+            fetched_at, info = future.result()
+        except Exception:
+            # Let yt-dlp extract it again and report the error itself
+            return entry
+        if info is None:
+            return entry
+        if time.monotonic() - fetched_at > self.max_age:
+            with self._lock:
+                self.expired += 1
+            return entry
+        with self._lock:
+            self.prefetched += 1
+        info['__prefetched_at'] = fetched_at
+        return info
+
+    def is_fresh(self, info: Dict) -> bool:
+        """
+        Check if prefetched info can still be downloaded from.
+
+        Args:
+            info (dict): Entry yielded by the prefetcher
+
+        Returns:
+            bool: False if the info was prefetched longer than max_age ago
+        """
+        fetched_at = info.get('__prefetched_at')
+        return fetched_at is None or time.monotonic() - fetched_at <= self.max_age
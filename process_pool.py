@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Process-Pool Downloads
+======================
+
+Runs video downloads (and the CPU-heavy yt-dlp extraction before them) in
+worker processes instead of threads, so extraction scales across CPU cores
+instead of serializing on the GIL.
+
+Features:
+- Each worker process owns and reuses its own YoutubeDL instances
+- Tasks and results are compact, picklable records
+- One shared progress channel (multiprocessing queue) back to the parent,
+  feeding throughput/error measurements and a periodic progress line
+- Download archive shared between processes through SQLite
+- Bandwidth limit shared between processes (token bucket in shared memory)
+- FFmpeg process limit shared between processes; job stats reported to the parent
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+import json
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+
+from yt_dlp import YoutubeDL
+
+from bandwidth import TokenBucket
+from download_archive import DownloadArchive
+from ffmpeg_manager import FFmpegManager
+from metadata_cache import trim_info
+from remux import FinalizingYoutubeDL
+
+
+# Downloaders kept per worker process (one per distinct option set)
+MAX_DOWNLOADERS_PER_PROCESS = 4
+
+
+# ====================================================================
+# Worker Process Side
+# ====================================================================
+
+# State of the current worker process, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(channel, archive_path: Optional[str], bandwidth: Optional[TokenBucket],
+                 ffmpeg_options: Optional[Dict] = None, ffmpeg_slots=None) -> None:
+    """Process initializer: remember the progress channel"""
+    ffmpeg = None
+    if ffmpeg_options is not None:
+        # Job starts and stats go to the parent, which counts and reports them
+        ffmpeg = FFmpegManager(**ffmpeg_options, report=None, slots=ffmpeg_slots,
+                               on_start=lambda: _send('ffmpeg-start'),
+                               on_job=lambda job: _send('ffmpeg', job))
+    _worker.update(channel=channel, archive_path=archive_path, bandwidth=bandwidth, archive=None,
+                   downloaders={}, current=None, ffmpeg=ffmpeg)
+
+
+def _send(*message) -> None:
+    """Put a record on the shared progress channel"""
+    _worker['channel'].put((os.getpid(),) + message)
+
+
+def _progress_hook(status: Dict) -> None:
+    """yt-dlp progress hook: forward compact progress to the parent"""
+    if status.get('status') in ('downloading', 'finished'):
+        _send('progress', status.get('tmpfilename') or status.get('filename'), status['status'],
+              status.get('downloaded_bytes'), status.get('total_bytes') or status.get('total_bytes_estimate'))
+
+
+def _postprocessor_hook(status: Dict) -> None:
+    """yt-dlp postprocessor hook: remember the video that finished"""
+    if status.get('status') == 'finished' and status.get('postprocessor') == 'MoveFilesAfterDownload':
+        _worker['current']['video_id'] = (status.get('info_dict') or {}).get('id')
+
+
+def _post_hook(filepath: str) -> None:
+    """yt-dlp post hook: remember the finished file"""
+    _worker['current']['files'].append(filepath)
+
+
+def _get_downloader(ydl_opts: Dict, use_archive: bool) -> YoutubeDL:
+    """Get (or create) this process's YoutubeDL for an option set"""
+    key = json.dumps([ydl_opts, use_archive], sort_keys=True, default=str)
+    downloaders = _worker['downloaders']
+    if key not in downloaders:
+        if len(downloaders) >= MAX_DOWNLOADERS_PER_PROCESS:
+            downloaders.pop(next(iter(downloaders))).close()
+
+        ydl_opts = dict(ydl_opts)
+        ydl_opts.update({
+            # Interleaved progress bars from many processes are unreadable;
+            # the parent prints aggregate progress from the channel instead
+            'noprogress': True,
+            'progress_hooks': [_progress_hook],
+            'postprocessor_hooks': [_postprocessor_hook],
+            'post_hooks': [_post_hook],
+            'error_hooks': [lambda message: _send('error', message)],
+            'warning_hooks': [lambda message: _send('warning', message)],
+        })
+        if _worker['bandwidth'] is not None:
+            _worker['bandwidth'].apply(ydl_opts)
+        if use_archive:
+            if _worker['archive'] is None:
+                _worker['archive'] = DownloadArchive(_worker['archive_path'])
+            ydl_opts['download_archive'] = _worker['archive']
+        if _worker['ffmpeg'] is not None:
+            ydl_opts['ffmpeg_manager'] = _worker['ffmpeg']
+        downloaders[key] = FinalizingYoutubeDL(ydl_opts)
+    return downloaders[key]
+
+
+def run_download(payload: Dict) -> Dict:
+    """
+    Download one video in a worker process.
+
+    Args:
+        payload (dict): Task record from ProcessDownloadPool.run
+
+    Returns:
+        dict: Compact result record (url, success, message, video_id, files, info)
+    """
+    _worker['current'] = {'files': [], 'video_id': None}
+    ydl = _get_downloader(payload['ydl_opts'], payload['use_archive'])
+    name = payload['title'] or payload['url']
+    label = f"[Thread {payload['thread_id']}, PID {os.getpid()}]"
+
+    try:
+        info = ydl.process_ie_result(dict(payload['entry']), download=True, extra_info=payload['extra_info'])
+    except Exception as e:
+        return {
+            'url': payload['url'],
+            'success': False,
+            'message': f"❌ {label} Error downloading '{name}': {str(e)}",
+            'video_id': None,
+            'files': [],
+            'info': {},
+        }
+
+    files = _worker['current']['files']
+    return {
+        'url': payload['url'],
+        'success': bool(files),
+        'message': (f"✅ {label} Downloaded '{name}'" if files else
+                    f"❌ {label} Failed to download '{name}'. Video may be private or unavailable."),
+        'video_id': _worker['current']['video_id'],
+        'files': files,
+        'info': trim_info(info),
+    }
+
+
+# ====================================================================
+# Parent Side
+# ====================================================================
+
+class ProcessDownloadPool:
+    """
+    Pool of download worker processes plus a reader thread for their
+    shared progress channel.
+    """
+
+    def __init__(self, max_workers: int, archive_path: Optional[str] = None,
+                 bandwidth: Optional[TokenBucket] = None, ffmpeg: Optional[FFmpegManager] = None,
+                 on_progress: Optional[Callable[[Dict], None]] = None,
+                 on_error: Optional[Callable[[str], None]] = None,
+                 on_warning: Optional[Callable[[str], None]] = None, report_interval: float = 10.0):
+        """
+        Start the worker processes.
+
+        Args:
+            max_workers (int): Number of worker processes
+            archive_path (str, optional): Download archive database shared by all processes
+            bandwidth (TokenBucket, optional): Bandwidth limit shared by all processes
+            ffmpeg (FFmpegManager, optional): Settings for the workers' FFmpeg runs; its
+                process limit applies to all workers together, and it counts and reports their jobs
+            on_progress (Callable, optional): Receives yt-dlp style progress dicts
+            on_error (Callable, optional): Receives yt-dlp error messages
+            on_warning (Callable, optional): Receives yt-dlp warning messages
+            report_interval (float): Seconds between aggregate progress lines
+        """
+        # Spawn, not fork: the parent already runs threads and SQLite connections
+        context = multiprocessing.get_context('spawn')
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_warning = on_warning
+        self.report_interval = report_interval
+        self.ffmpeg = ffmpeg
+        self._channel = context.Queue()
+        ffmpeg_options = ffmpeg_slots = None
+        if ffmpeg is not None:
+            ffmpeg_options = ffmpeg.options()
+            ffmpeg_slots = context.BoundedSemaphore(ffmpeg.max_processes)
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                             initializer=_init_worker,
+                                             initargs=(self._channel, archive_path, bandwidth,
+                                                       ffmpeg_options, ffmpeg_slots))
+        self._reader = threading.Thread(target=self._read_channel, name='process-progress', daemon=True)
+        self._reader.start()
+
+    def run(self, payload: Dict) -> Dict:
+        """
+        Download one video in a worker process and wait for the result.
+
+        Args:
+            payload (dict): url, title, entry (flat URL result), extra_info,
+                ydl_opts (picklable), use_archive and thread_id
+
+        Returns:
+            dict: Compact result record from run_download
+        """
+        return self._executor.submit(run_download, payload).result()
+
+    def _read_channel(self) -> None:
+        """Consume the progress channel until shutdown"""
+        active = {}  # (pid, filename) -> downloaded bytes
+        interval_bytes = 0
+        last_report = time.monotonic()
+
+        while True:
+            message = self._channel.get()
+            if message is None:
+                return
+
+            pid, kind = message[0], message[1]
+            if kind == 'error':
+                if self.on_error is not None:
+                    self.on_error(message[2])
+            elif kind == 'warning':
+                if self.on_warning is not None:
+                    self.on_warning(message[2])
+            elif kind == 'ffmpeg-start':
+                if self.ffmpeg is not None:
+                    self.ffmpeg.job_started()
+            elif kind == 'ffmpeg':
+                if self.ffmpeg is not None:
+                    self.ffmpeg.record_remote(message[2])
+            elif kind == 'progress':
+                filename, status, downloaded, total = message[2:]
+                key = (pid, filename)
+                if status == 'finished':
+                    # Reported under the final name; its bytes were counted while downloading
+                    active.pop(key, None)
+                    active.pop((pid, f'{filename}.part'), None)
+                elif downloaded is not None:
+                    interval_bytes += max(0, downloaded - active.get(key, 0))
+                    active[key] = downloaded
+                if self.on_progress is not None:
+                    self.on_progress({
+                        'status': status,
+                        'tmpfilename': f'{pid}:{filename}',
+                        'downloaded_bytes': downloaded,
+                        'total_bytes': total,
+                    })
+
+            now = time.monotonic()
+            if now - last_report >= self.report_interval:
+                if active:
+                    rate = interval_bytes / (now - last_report) / (1024 * 1024)
+                    print(f"📡 [Processes] {len(active)} active download(s), {rate:.1f} MB/s")
+                interval_bytes = 0
+                last_report = now
+
+    def shutdown(self) -> None:
+        """Stop the worker processes and the progress reader"""
+        self._executor.shutdown(wait=True)
+        self._channel.put(None)
+        self._reader.join()
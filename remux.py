@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Codec-Aware MP4 Finalization
+============================
+
+Turns a downloaded (or merged) video into a compatible MP4 with as little
+FFmpeg work as possible. The codecs of the selected streams are inspected
+first. Streams MP4 players already handle are stream-copied; only the
+others are transcoded (audio to AAC, video to H.264).
+
+Features:
+- Nothing to do for MP4 files with compatible streams (no FFmpeg run)
+- Pure stream-copy remux when only the container is wrong
+- Per-stream transcoding, e.g. Opus audio -> AAC while the video is copied
+- Separate video and audio downloads are merged and converted in a single
+  FFmpeg run, so large files are written once
+- The post-processing plan of every video is logged before it runs
+- Codec decisions are plain functions (plan_streams), testable without FFmpeg
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import os
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from yt_dlp import YoutubeDL
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.postprocessor.ffmpeg import FFmpegMergerPP, FFmpegPostProcessor
+from yt_dlp.utils import prepend_extension
+
+from audio_stream import StreamingMP3PP
+
+
+# Codecs that go into the MP4 as they are
+MP4_VIDEO_CODECS = ('h264', 'hevc', 'av1', 'vp9', 'mpeg4')
+MP4_AUDIO_CODECS = ('aac',)
+
+# Screen message of yt-dlp's file downloaders for an error they retry
+RETRIED_ERROR_PREFIX = '[download] Got error:'
+
+# Encoders for streams that have to be transcoded
+VIDEO_ENCODER = 'libx264'
+AUDIO_ENCODER = 'aac'
+DEFAULT_AUDIO_BITRATE = '192k'
+
+# yt-dlp codec strings (RFC 6381 style) and FFprobe names -> codec family
+CODEC_ALIASES = {
+    'avc1': 'h264', 'avc3': 'h264', 'h264': 'h264',
+    'hvc1': 'hevc', 'hev1': 'hevc', 'hevc': 'hevc', 'h265': 'hevc',
+    'av01': 'av1', 'av1': 'av1',
+    'vp09': 'vp9', 'vp9': 'vp9', 'vp8': 'vp8',
+    'mp4v': 'mpeg4', 'mpeg4': 'mpeg4',
+    'mp4a': 'aac', 'aac': 'aac',
+    'opus': 'opus', 'vorbis': 'vorbis', 'mp3': 'mp3', 'flac': 'flac',
+    'ac-3': 'ac3', 'ac3': 'ac3', 'ec-3': 'eac3', 'eac3': 'eac3',
+}
+
+
+# ====================================================================
+# Stream Plan
+# ====================================================================
+
+def codec_family(codec: Optional[str]) -> Optional[str]:
+    """
+    Normalize a codec string, e.g. 'avc1.64001F' -> 'h264', 'mp4a.40.2' -> 'aac'.
+
+    Args:
+        codec (str, optional): Codec from yt-dlp format info or FFprobe
+
+    Returns:
+        Optional[str]: Codec family, 'none' for a missing stream, None if unknown
+    """
+    if not codec:
+        return None
+    codec = codec.strip().lower()
+    if codec == 'none':
+        return 'none'
+    prefix = codec.split('.', 1)[0]
+    return CODEC_ALIASES.get(prefix, prefix)
+
+
+def selected_codecs(info: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Get the video and audio codec of the format(s) yt-dlp downloaded.
+
+    Args:
+        info (dict): Video info dict
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: (video codec, audio codec) families;
+        'none' if there is no such stream, None if unknown
+    """
+    formats = info.get('requested_formats') or [info]
+    vcodec = acodec = 'none'
+    for fmt in formats:
+        video, audio = codec_family(fmt.get('vcodec')), codec_family(fmt.get('acodec'))
+        if video != 'none' and vcodec == 'none':
+            vcodec = video
+        if audio != 'none' and acodec == 'none':
+            acodec = audio
+    return vcodec, acodec
+
+
+def plan_streams(vcodec: Optional[str], acodec: Optional[str], container: Optional[str]) -> Dict:
+    """
+    Decide what has to happen to each stream for a compatible MP4.
+
+    Args:
+        vcodec (str, optional): Video codec family ('none' if there's no video)
+        acodec (str, optional): Audio codec family ('none' if there's no audio)
+        container (str, optional): Current container (file extension)
+
+    Returns:
+        dict: {'video': action, 'audio': action, 'remux': bool} where action is
+        'copy', 'transcode' or None (no such stream). remux is True if FFmpeg
+        has to run at all
+    """
+    def action(codec: Optional[str], compatible: Tuple[str, ...]) -> Optional[str]:
+        if codec == 'none':
+            return None
+        if codec is None:
+            # Unknown codec: trust an MP4 file, convert anything else
+            return 'copy' if container == 'mp4' else 'transcode'
+        return 'copy' if codec in compatible else 'transcode'
+
+    plan = {
+        'video': action(vcodec, MP4_VIDEO_CODECS),
+        'audio': action(acodec, MP4_AUDIO_CODECS),
+    }
+    plan['remux'] = container != 'mp4' or 'transcode' in plan.values()
+    return plan
+
+
+def describe_plan(plan: Dict, vcodec: Optional[str], acodec: Optional[str]) -> str:
+    """One line for the log, e.g. 'video h264: copy, audio opus: transcode'"""
+    parts = []
+    for kind, codec in (('video', vcodec), ('audio', acodec)):
+        if plan[kind] is not None:
+            parts.append(f"{kind} {codec or 'unknown'}: {plan[kind]}")
+    return ', '.join(parts) or 'no streams'
+
+
+# ====================================================================
+# Post-Processor
+# ====================================================================
+
+class MP4FinalizePP(FFmpegPostProcessor):
+    """
+    Last post-processing step for video downloads: produce a compatible MP4,
+    stream-copying everything that doesn't need transcoding.
+    """
+
+    def __init__(self, downloader=None, audio_bitrate: str = DEFAULT_AUDIO_BITRATE):
+        super().__init__(downloader)
+        self.audio_bitrate = audio_bitrate
+
+    def _probe_codecs(self, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """Read the codecs from the file (FFprobe) when the format info lacks them"""
+        vcodec = acodec = 'none'
+        try:
+            streams = self.get_metadata_object(path).get('streams', [])
+        except Exception:
+            return None, None
+        for stream in streams:
+            codec = codec_family(stream.get('codec_name'))
+            if stream.get('codec_type') == 'video' and vcodec == 'none':
+                # Cover art is stored as a video stream but isn't the video
+                if not (stream.get('disposition') or {}).get('attached_pic'):
+                    vcodec = codec
+            elif stream.get('codec_type') == 'audio' and acodec == 'none':
+                acodec = codec
+        return vcodec, acodec
+
+    def _codec_args(self, plan: Dict) -> List[str]:
+        """Per-stream codec options: copy where possible"""
+        args = ['-dn']
+        if plan['video'] is not None:
+            args += ['-c:v', 'copy' if plan['video'] == 'copy' else VIDEO_ENCODER]
+        if plan['audio'] == 'transcode':
+            args += ['-c:a', AUDIO_ENCODER, '-b:a', self.audio_bitrate]
+        elif plan['audio'] == 'copy':
+            args += ['-c:a', 'copy']
+        return args
+
+    @staticmethod
+    def _converted(info: Dict, plan: Dict) -> None:
+        """Update the info dict to what the FFmpeg run produced"""
+        info['ext'] = 'mp4'
+        if plan['audio'] == 'transcode':
+            info['acodec'] = 'mp4a.40.2'
+        if plan['video'] == 'transcode':
+            info['vcodec'] = 'avc1'
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        if info.pop('__mp4_finalized', False):
+            # MergeFinalizePP already converted while merging
+            return [], info
+
+        path = info['filepath']
+        vcodec, acodec = selected_codecs(info)
+        if vcodec is None or acodec is None:
+            vcodec, acodec = self._probe_codecs(path)
+
+        container = (info.get('ext') or '').lower()
+        plan = plan_streams(vcodec, acodec, container)
+        summary = describe_plan(plan, vcodec, acodec)
+        if not plan['remux']:
+            self.to_screen(f'Already a compatible MP4 ({summary}); nothing to convert')
+            return [], info
+
+        outpath = os.path.splitext(path)[0] + '.mp4'
+        temp_path = prepend_extension(outpath, 'temp')
+        self.to_screen(f'Finalizing MP4 ({summary}); Destination: {outpath}')
+        self.run_ffmpeg(path, temp_path, ['-map', '0:v:0?', '-map', '0:a:0?'] + self._codec_args(plan))
+        os.replace(temp_path, outpath)
+
+        info['filepath'] = outpath
+        self._converted(info, plan)
+        # The source is only deleted if it had a different name
+        return ([path] if outpath != path else []), info
+
+
+class MergeFinalizePP(MP4FinalizePP):
+    """
+    Replaces yt-dlp's merger when the merged file would have to be converted:
+    merges the video and audio downloads and transcodes what needs it in
+    one FFmpeg run, instead of writing the file twice.
+    """
+
+    def __init__(self, downloader=None, plan: Optional[Dict] = None,
+                 audio_bitrate: str = DEFAULT_AUDIO_BITRATE):
+        super().__init__(downloader, audio_bitrate)
+        self.plan = plan
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        filename = info['filepath']
+        temp_filename = prepend_extension(filename, 'temp')
+
+        # Same stream mapping as FFmpegMergerPP
+        args = []
+        audio_streams = 0
+        for index, fmt in enumerate(info['requested_formats']):
+            if fmt.get('acodec') != 'none':
+                args += ['-map', f'{index}:a:0']
+                if (self.plan['audio'] == 'copy' and fmt['protocol'].startswith('m3u8')
+                        and self.get_audio_codec(fmt['filepath']) == 'aac'):
+                    args += [f'-bsf:a:{audio_streams}', 'aac_adtstoasc']
+                audio_streams += 1
+            if fmt.get('vcodec') != 'none':
+                args += ['-map', f'{index}:v:0']
+
+        self.to_screen(f'Merging and converting formats into "{filename}"')
+        self.run_ffmpeg_multiple_files(info['__files_to_merge'], temp_filename, args + self._codec_args(self.plan))
+        os.replace(temp_filename, filename)
+
+        self._converted(info, self.plan)
+        info['__mp4_finalized'] = True
+        return info['__files_to_merge'], info
+
+
+class FinalizingYoutubeDL(YoutubeDL):
+    """
+    YoutubeDL that finalizes video downloads with MP4FinalizePP and plans
+    each video's post-processing before it runs: a merge followed by a
+    conversion becomes a single MergeFinalizePP run.
+
+    build_download_options asks for the finalizer with the (picklable)
+    'finalize_mp4' option, e.g. {'audio_bitrate': '192k'}, so worker
+    processes set it up on their own downloaders too. Audio downloads with
+    the 'stream_mp3' option are encoded to MP3 while they download (see
+    audio_stream.StreamingMP3PP). With an 'ffmpeg_manager' option
+    (ffmpeg_manager.FFmpegManager), all FFmpeg runs of post-processing and
+    streamed encoding go through that manager.
+
+    The 'warning_hooks' and 'error_hooks' options (lists of callables)
+    receive every warning and error message while yt-dlp keeps printing
+    its normal console output, progress bar included; errors yt-dlp is
+    about to retry count as warnings. The 'entry_gate' option is called
+    (and may block) before each video or playlist entry is processed.
+    """
+
+    def __init__(self, params: Optional[Dict] = None, auto_init: bool = True):
+        super().__init__(params, auto_init)
+        self.mp4_finalizer = None
+        settings = self.params.get('finalize_mp4')
+        if settings:
+            self.mp4_finalizer = MP4FinalizePP(self, **settings)
+            self.add_post_processor(self.mp4_finalizer, when='post_process')
+        self.mp3_streamer = None
+        settings = self.params.get('stream_mp3')
+        if settings:
+            self.mp3_streamer = StreamingMP3PP(self, **settings)
+            self.add_post_processor(self.mp3_streamer, when='post_process')
+
+    def _report_message(self, option: str, message: str) -> None:
+        """Pass a message to the callables of a hook option"""
+        for hook in self.params.get(option) or []:
+            hook(message)
+
+    def report_warning(self, message, only_once=False):
+        self._report_message('warning_hooks', message)
+        super().report_warning(message, only_once)
+
+    def report_error(self, message, *args, **kwargs):
+        self._report_message('error_hooks', message)
+        super().report_error(message, *args, **kwargs)
+
+    def to_screen(self, message, *args, **kwargs):
+        # File downloaders print the errors they retry, without a warning
+        if message.startswith(RETRIED_ERROR_PREFIX):
+            self._report_message('warning_hooks', message)
+        super().to_screen(message, *args, **kwargs)
+
+    def process_ie_result(self, ie_result, download=True, extra_info=None):
+        gate = self.params.get('entry_gate')
+        if gate is not None and ie_result.get('_type', 'video') not in ('playlist', 'multi_video'):
+            # Playlist entries request pages and media long after the task started
+            gate()
+        return super().process_ie_result(ie_result, download, extra_info)
+
+    def plan_post_processing(self, info: Dict) -> None:
+        """
+        Fold the merge and the MP4 conversion of a video into one FFmpeg run
+        and log the resulting plan.
+
+        Args:
+            info (dict): Info dict about to be post-processed (changed in place)
+        """
+        if self.mp4_finalizer is None:
+            return
+        steps = info.setdefault('__postprocessors', [])
+        merger = next((pp for pp in steps if isinstance(pp, FFmpegMergerPP)), None)
+
+        vcodec, acodec = selected_codecs(info)
+        plan = plan_streams(vcodec, acodec, 'mp4' if merger is not None else (info.get('ext') or '').lower())
+        summary = describe_plan(plan, vcodec, acodec)
+
+        names = [pp.PP_NAME for pp in steps]
+        if merger is not None and 'transcode' in plan.values():
+            steps[steps.index(merger)] = MergeFinalizePP(self, plan, self.mp4_finalizer.audio_bitrate)
+            names[names.index(merger.PP_NAME)] = f'MergeFinalize ({summary})'
+            names.append('MP4Finalize (done while merging)')
+        elif merger is not None:
+            names[names.index(merger.PP_NAME)] = f'Merger ({summary})'
+            names.append('MP4Finalize (nothing to convert)')
+        else:
+            names.append(f'MP4Finalize ({summary})')
+        self.mp4_finalizer.to_screen(f"Plan: {' -> '.join(names)}")
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if self.mp3_streamer is not None and not subtitle and not test:
+            blocker = self.mp3_streamer.stream_blocker(info)
+            if blocker is not None:
+                self.mp3_streamer.to_screen(f'Not streaming format {info.get("format_id")} ({blocker}); '
+                                            f'downloading the file first')
+            else:
+                manager = self.params.get('ffmpeg_manager')
+                # The encoding FFmpeg gets the shared manager's threads, priority and stats
+                with manager.activate() if manager is not None else nullcontext():
+                    streamed = self.mp3_streamer.stream(name, info)
+                if streamed:
+                    return True, True
+        return super().dl(name, info, subtitle, test)
+
+    def post_process(self, filename, info, files_to_move=None):
+        self.plan_post_processing(info)
+        manager = self.params.get('ffmpeg_manager')
+        if manager is None:
+            return super().post_process(filename, info, files_to_move)
+        # Every FFmpeg run of this video takes a slot of the shared manager
+        with manager.activate():
+            return super().post_process(filename, info, files_to_move)
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Download Scheduler
+==================
+
+Shared work queue for the YouTube Downloader. Playlists and channels are
+expanded into individual video tasks that all flow through one bounded
+queue, so every worker stays busy until the very last video.
+
+Features:
+- Lazy expansion of playlists/channels (including channel tabs) into video tasks
+- Bounded queue with blocking submit (backpressure for huge collections)
+- Pool of worker threads with stable worker IDs for logging
+- Active worker limit adjustable at runtime (adaptive concurrency)
+- Result callback invoked from the worker thread as each task finishes
+- Priority policies: input order, shortest-first, largest-first and
+  round-robin across playlists, with a simulated wall-time comparison
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import queue
+import itertools
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from prefetch import EntryPrefetcher, is_video_entry
+
+
+# ====================================================================
+# Collection Expansion
+# ====================================================================
+
+def iter_collection_entries(ydl, ie_result: Optional[Dict], prefetcher: Optional[EntryPrefetcher] = None,
+                            stop: Optional[Callable[[Dict], Any]] = None) -> Iterator[Tuple[Dict, Dict, int]]:
+    """
+    Lazily walk a raw playlist or channel result, descending into nested
+    playlists such as channel tabs.
+
+    Args:
+        ydl (YoutubeDL): Instance used to extract nested playlists
+        ie_result (dict): Raw result from extract_info(process=False)
+        prefetcher (EntryPrefetcher, optional): Extracts upcoming entries ahead of time
+        stop (Callable, optional): Called per video entry; a truthy result ends
+            the current (sub)playlist
+
+    Yields:
+        Tuple[dict, dict, int]: (entry, playlist it belongs to, 1-based playlist index).
+        The entry is a flat URL result, or full info if it was prefetched.
+    """
+    if ie_result is None:
+        return
+    if prefetcher is not None:
+        ie_result = prefetcher.wrap(ydl, ie_result)
+    elif ie_result.get('_type') == 'url' and not is_video_entry(ie_result):
+        ie_result = ydl.extract_info(
+            ie_result['url'], download=False, process=False, ie_key=ie_result.get('ie_key'))
+    if not ie_result or ie_result.get('_type') not in ('playlist', 'multi_video'):
+        return
+
+    entries = ie_result.get('entries') or []
+    try:
+        for index, entry in enumerate(entries, 1):
+            if not entry:
+                continue
+            if (entry.get('_type') in ('playlist', 'multi_video')
+                    or (entry.get('_type') == 'url' and not is_video_entry(entry))):
+                # Nested playlists arrive already wrapped when prefetching
+                yield from iter_collection_entries(ydl, entry, stop=stop)
+                continue
+            if stop is not None and stop(entry):
+                break
+            yield entry, ie_result, index
+    finally:
+        # Stop lazy enumeration (and pending prefetches) right away
+        close = getattr(entries, 'close', None)
+        if close is not None:
+            close()
+
+
+def playlist_entry_info(playlist: Dict, index: int) -> Dict:
+    """
+    Build the playlist fields yt-dlp adds to an entry while processing a
+    playlist, so an entry downloaded on its own gets the same filename.
+
+    Args:
+        playlist (dict): Raw playlist result the entry belongs to
+        index (int): 1-based position of the entry in the playlist
+
+    Returns:
+        dict: Extra info for process_ie_result
+    """
+    count = playlist.get('playlist_count')
+    entries = playlist.get('entries')
+    if not count and isinstance(entries, (list, tuple)):
+        # Extractors that list the whole playlist at once don't always report a count
+        count = len(entries)
+    return {
+        'playlist': playlist.get('title') or playlist.get('id'),
+        'playlist_id': playlist.get('id'),
+        'playlist_title': playlist.get('title'),
+        'playlist_uploader': playlist.get('uploader'),
+        'playlist_uploader_id': playlist.get('uploader_id'),
+        'playlist_channel': playlist.get('channel'),
+        'playlist_channel_id': playlist.get('channel_id'),
+        'playlist_webpage_url': playlist.get('webpage_url'),
+        'playlist_count': count,
+        'n_entries': count,
+        'playlist_index': index,
+        # Controls zero-padding of %(playlist_index)s, as for a full playlist
+        '__last_playlist_index': count or 0,
+    }
+
+
+def interleave(iterators: Dict[Any, Iterator], on_error: Optional[Callable[[Any, Exception], None]] = None
+               ) -> Iterator[Tuple[Any, Any]]:
+    """
+    Take items from several iterators in turn, so several collections are
+    listed side by side instead of one after another.
+
+    Args:
+        iterators (dict): Key -> iterator
+        on_error (Callable, optional): Called as on_error(key, exception) when an
+            iterator fails; it is dropped and the others continue
+
+    Yields:
+        Tuple[Any, Any]: (key, item)
+    """
+    active = list(iterators.items())
+    while active:
+        for key, iterator in list(active):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                active.remove((key, iterator))
+                continue
+            except Exception as e:
+                active.remove((key, iterator))
+                if on_error is None:
+                    raise
+                on_error(key, e)
+                continue
+            yield key, item
+
+
+# ====================================================================
+# Scheduling Policies
+# ====================================================================
+
+SCHEDULING_POLICIES = ('input', 'shortest', 'largest', 'round-robin')
+
+# Assumed average bitrate (bytes/second, ~4 Mbit/s) when only the duration is known
+DEFAULT_BYTES_PER_SECOND = 500_000
+
+
+def estimate_duration(info: Optional[Dict]) -> Optional[float]:
+    """
+    Get the duration of a video from (flat or full) yt-dlp info.
+
+    Args:
+        info (dict): Entry or info dict
+
+    Returns:
+        Optional[float]: Seconds, or None if unknown
+    """
+    duration = (info or {}).get('duration')
+    return float(duration) if isinstance(duration, (int, float)) and duration > 0 else None
+
+
+def estimate_size(info: Optional[Dict]) -> Optional[float]:
+    """
+    Estimate the download size of a video from yt-dlp info: the exact or
+    approximate file size if known, otherwise bitrate times duration.
+
+    Args:
+        info (dict): Entry or info dict
+
+    Returns:
+        Optional[float]: Bytes, or None if unknown
+    """
+    info = info or {}
+    size = info.get('filesize') or info.get('filesize_approx')
+    if size:
+        return float(size)
+    duration = estimate_duration(info)
+    if duration is None:
+        return None
+    # tbr is in KBit/s
+    return duration * (info['tbr'] * 125 if info.get('tbr') else DEFAULT_BYTES_PER_SECOND)
+
+
+class TaskPriority:
+    """
+    Sort keys for download tasks under a scheduling policy. Lower keys run
+    first; tasks with equal keys run in submission order.
+
+    Policies:
+        input:       submission order
+        shortest:    shortest video first (best time-to-first-results)
+        largest:     largest download first (packs long jobs early, shortest tail)
+        round-robin: alternate between playlists/channels and single videos
+    """
+
+    def __init__(self, policy: str = 'input', info: Optional[Callable[[Dict], Optional[Dict]]] = None):
+        """
+        Args:
+            policy (str): One of SCHEDULING_POLICIES
+            info (Callable, optional): Returns the known info for a task; defaults
+                to the task's 'entry' (flat playlist entry)
+        """
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling policy '{policy}' "
+                             f"(choose from {', '.join(SCHEDULING_POLICIES)})")
+        self.policy = policy
+        self.info = info or (lambda task: task.get('entry'))
+        self._turns: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, task: Dict) -> Tuple:
+        """
+        Args:
+            task (dict): Download task
+
+        Returns:
+            Tuple: Sort key; tasks without the needed metadata sort last
+        """
+        if self.policy == 'shortest':
+            duration = estimate_duration(self.info(task))
+            return (0, duration) if duration is not None else (1, 0.0)
+        if self.policy == 'largest':
+            size = estimate_size(self.info(task))
+            return (0, -size) if size is not None else (1, 0.0)
+        if self.policy == 'round-robin':
+            with self._lock:
+                turn = self._turns.get(task.get('source_url'), 0)
+                self._turns[task.get('source_url')] = turn + 1
+            return (turn,)
+        return ()
+
+
+def simulate_schedule(jobs: List[Dict], workers: int, policy: str,
+                      info: Optional[Callable[[Dict], Optional[Dict]]] = None) -> Dict:
+    """
+    Replay measured jobs on a fixed number of workers under a policy
+    (greedy list scheduling, every job known up front).
+
+    Args:
+        jobs (List[dict]): {'task': task, 'seconds': measured run time} in submission order
+        workers (int): Number of workers
+        policy (str): One of SCHEDULING_POLICIES
+        info (Callable, optional): As for TaskPriority
+
+    Returns:
+        dict: wall_time, first_result and mean_completion (seconds)
+    """
+    priority = TaskPriority(policy, info)
+    ordered = sorted(enumerate(jobs), key=lambda item: (priority(item[1]['task']), item[0]))
+    free_at = [0.0] * max(1, workers)
+    completions = []
+    for _, job in ordered:
+        worker = free_at.index(min(free_at))
+        free_at[worker] += job['seconds']
+        completions.append(free_at[worker])
+    return {
+        'wall_time': max(completions, default=0.0),
+        'first_result': min(completions, default=0.0),
+        'mean_completion': sum(completions) / len(completions) if completions else 0.0,
+    }
+
+
+# ====================================================================
+# Work Queue
+# ====================================================================
+
+
+class WorkQueue:
+    """
+    Bounded task queue served by a pool of worker threads.
+    submit() blocks while the queue is full, so a producer enumerating a
+    20k-video channel never runs far ahead of the workers.
+    """
+
+    _STOP = object()
+
+    def __init__(self, worker: Callable[[Any, int], Any], max_workers: int,
+                 max_pending: Optional[int] = None,
+                 on_result: Optional[Callable[[Any, Any], None]] = None, name: str = 'download-worker',
+                 priority: Optional[Callable[[Any], Tuple]] = None):
+        """
+        Start the worker threads.
+
+        Args:
+            worker (Callable): Called as worker(task, worker_id) for every task
+            max_workers (int): Number of worker threads
+            max_pending (int, optional): Queue capacity. Defaults to 2 * max_workers
+            on_result (Callable, optional): Called as on_result(task, result) when a
+                task finishes; result is the raised exception if the worker failed
+            name (str): Thread name prefix
+            priority (Callable, optional): Sort key per task (e.g. TaskPriority);
+                queued tasks with the lowest key run first. Only queued tasks can be
+                reordered, so pass a larger max_pending to give the policy room
+        """
+        self._worker = worker
+        self._on_result = on_result
+        self._priority = priority
+        self._sequence = itertools.count()
+        if priority is None:
+            self._queue = queue.Queue(maxsize=max_pending or max_workers * 2)
+        else:
+            self._queue = queue.PriorityQueue(maxsize=max_pending or max_workers * 2)
+        self._limit = max_workers
+        self._active = 0
+        self._stopping = False
+        self._limit_changed = threading.Condition()
+        self._threads = []
+        for worker_id in range(1, max_workers + 1):
+            thread = threading.Thread(
+                target=self._run, args=(worker_id,), name=f'{name}-{worker_id}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, task: Any) -> None:
+        """
+        Queue a task, blocking while the queue is full.
+
+        Args:
+            task (Any): Task passed to the worker function
+        """
+        self._put(task)
+        with self._limit_changed:
+            self._limit_changed.notify()
+
+    def _put(self, task: Any) -> None:
+        """Put a task (with its priority key, if prioritized) on the queue"""
+        if self._priority is None:
+            self._queue.put(task)
+        else:
+            key = (float('inf'),) if task is self._STOP else self._priority(task)
+            self._queue.put((key, next(self._sequence), task))
+
+    @property
+    def limit(self) -> int:
+        """Number of workers currently allowed to take tasks"""
+        return self._limit
+
+    def set_limit(self, limit: int) -> None:
+        """
+        Change how many workers run tasks at once. Surplus workers finish
+        their current task and then pause until the limit grows again.
+
+        Args:
+            limit (int): Active worker count, clamped to 1..max_workers
+        """
+        with self._limit_changed:
+            self._limit = max(1, min(len(self._threads), limit))
+            self._limit_changed.notify_all()
+
+    def _run(self, worker_id: int) -> None:
+        """Worker thread main loop"""
+        while True:
+            task = self._take()
+            if task is self._STOP:
+                return
+            try:
+                result = self._worker(task, worker_id)
+            except Exception as e:
+                result = e
+            self._release_slot()
+            try:
+                if self._on_result is not None:
+                    self._on_result(task, result)
+            except Exception as e:
+                # A failing callback must not kill the worker, or join() and submit() would hang
+                print(f"⚠️  Result handler failed in {threading.current_thread().name}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _take(self) -> Any:
+        """Wait for a free active slot and a task, and take both"""
+        with self._limit_changed:
+            while True:
+                if self._active < self._limit or self._stopping:
+                    try:
+                        task = self._queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    else:
+                        if self._priority is not None:
+                            task = task[-1]
+                        if task is not self._STOP:
+                            self._active += 1
+                        return task
+                # Woken by submit(), set_limit() and finished tasks
+                self._limit_changed.wait(timeout=0.2)
+
+    def _release_slot(self) -> None:
+        """Give back an active slot and wake a waiting worker"""
+        with self._limit_changed:
+            self._active -= 1
+            self._limit_changed.notify()
+
+    def join(self) -> None:
+        """Wait until every queued task has finished and stop the workers"""
+        # Drain with the current limit before waking paused workers
+        self._queue.join()
+        for _ in self._threads:
+            self._put(self._STOP)
+        with self._limit_changed:
+            # Paused workers must wake up to receive their stop signal
+            self._stopping = True
+            self._limit_changed.notify_all()
+        for thread in self._threads:
+            thread.join()
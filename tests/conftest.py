@@ -0,0 +1,6 @@
+"""Test setup: make the top-level modules importable from the tests directory"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,147 @@
+"""Tests for streamed MP3 transcoding"""
+
+import os
+import sys
+import threading
+
+import pytest
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadCancelled
+
+from audio_stream import StreamingMP3PP
+from ffmpeg_manager import FFmpegManager
+from remux import FinalizingYoutubeDL
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Stand-in ffmpeg: reads stdin and writes its arguments as the output; fails on b'bad' input"""
+    path = tmp_path / 'ffmpeg'
+    path.write_text(f"#!{sys.executable}\n"
+                    "import sys\n"
+                    "if sys.stdin.buffer.read() == b'bad':\n"
+                    "    sys.stderr.write('pipe:0: Invalid data found when processing input\\n')\n"
+                    "    sys.exit(1)\n"
+                    "with open(sys.argv[-1].replace('file:', '', 1), 'w') as f:\n"
+                    "    f.write(' '.join(sys.argv[1:]))\n")
+    path.chmod(0o755)
+    monkeypatch.setattr(StreamingMP3PP, 'executable', str(path))
+    return str(path)
+
+
+def downloader(pipe, **params):
+    """FinalizingYoutubeDL that streams MP3s, with the HTTP download replaced by pipe(stdin)"""
+    ydl = FinalizingYoutubeDL({'quiet': True, 'no_warnings': True, 'stream_mp3': {'preferredquality': '128'},
+                               **params})
+    ydl.mp3_streamer._pipe = lambda info, stdin, name, temp_path: pipe(stdin)
+    return ydl
+
+
+def write(data):
+    def pipe(stdin):
+        stdin.write(data)
+        return len(data)
+    return pipe
+
+
+def format_info(**fields):
+    return dict({'format_id': '251', 'url': 'https://example.com/audio', 'protocol': 'https',
+                 'container': 'webm_dash'}, **fields)
+
+
+@pytest.mark.parametrize('info, expected', [
+    (format_info(), None),
+    (format_info(protocol='http'), None),
+    (format_info(protocol=None), None),
+    (format_info(requested_formats=[{}, {}]), 'separate formats to merge'),
+    (format_info(protocol='m3u8_native'), 'm3u8_native fragments need reassembly'),
+    (format_info(fragments=[{'url': 'a'}]), 'fragmented format'),
+    (format_info(url=None), 'no media URL'),
+])
+def test_stream_blocker(info, expected):
+    assert StreamingMP3PP.stream_blocker(info) == expected
+
+
+def test_stream_uses_the_manager_settings(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(max_processes=2, threads=1, report=None)
+    ydl = downloader(write(b'audio'), ffmpeg_manager=manager)
+    name = str(tmp_path / 'song.webm')
+    info = format_info()
+
+    assert ydl.dl(name, info) == (True, True)
+    with open(name) as f:
+        command = f.read()
+    assert '-i pipe:0 -threads 1 -vn -c:a libmp3lame' in command
+    assert info['__mp3_streamed'] and 'container' not in info
+    assert [job['output'] for job in manager.jobs] == ['song.webm.part']
+    assert (manager.jobs[0]['returncode'], manager.jobs[0]['limited']) == (0, False)
+    # Outside the process limit: not a running job for the slots or the CPU estimate
+    assert (manager.peak, manager.running) == (0, 0)
+
+
+def test_streams_are_not_held_up_by_the_process_limit(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(max_processes=1, threads=1, report=None)
+    both_streaming = threading.Barrier(2, timeout=5)
+
+    def pipe(stdin):
+        # Returns only once the other stream is downloading too
+        both_streaming.wait()
+        stdin.write(b'audio')
+        return 5
+
+    results = []
+    threads = [threading.Thread(target=lambda index=index: results.append(
+        downloader(pipe, ffmpeg_manager=manager).dl(str(tmp_path / f'song{index}.webm'), format_info())))
+        for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert results == [(True, True), (True, True)]
+    assert len(manager.jobs) == 2
+    # The slot is still free for post-processing
+    assert manager._slots.acquire(blocking=False)
+
+
+def test_stream_without_a_manager(fake_ffmpeg, tmp_path):
+    name = str(tmp_path / 'song.webm')
+    assert downloader(write(b'audio')).mp3_streamer.stream(name, format_info())
+    assert os.path.exists(name)
+
+
+def test_ffmpeg_failure_falls_back_to_a_normal_download(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(threads=1, report=None)
+    warnings = []
+    ydl = downloader(write(b'bad'), ffmpeg_manager=manager, warning_hooks=[warnings.append])
+    name = str(tmp_path / 'song.webm')
+
+    with manager.activate():
+        assert ydl.mp3_streamer.stream(name, format_info()) is False
+    assert not os.path.exists(name + '.part')
+    assert manager.jobs[0]['returncode'] == 1
+    assert 'Invalid data found' in warnings[0]
+
+
+def test_cancelled_stream_stops_ffmpeg(fake_ffmpeg, tmp_path):
+    def cancel(stdin):
+        raise DownloadCancelled()
+
+    manager = FFmpegManager(threads=1, report=None)
+    ydl = downloader(cancel, ffmpeg_manager=manager)
+    name = str(tmp_path / 'song.webm')
+
+    with pytest.raises(DownloadCancelled):
+        ydl.dl(name, format_info())
+    assert not os.path.exists(name + '.part')
+    assert manager.running == 0
+    assert manager.jobs[0]['returncode'] != 0
+
+
+def test_blocked_formats_download_normally(tmp_path, monkeypatch):
+    ydl = downloader(write(b'audio'))
+    normal = []
+    monkeypatch.setattr(YoutubeDL, 'dl', lambda self, *args: normal.append(args) or (True, True))
+
+    assert ydl.dl(str(tmp_path / 'song.m4a'), format_info(protocol='m3u8_native')) == (True, True)
+    assert len(normal) == 1
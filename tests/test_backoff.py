@@ -0,0 +1,177 @@
+"""Tests for the shared rate-limit backoff and the yt-dlp message hooks that feed it"""
+
+import threading
+
+import pytest
+
+import backoff as backoff_module
+from backoff import BackoffCoordinator
+from concurrency import AdaptiveConcurrency
+from download import build_download_options
+from remux import FinalizingYoutubeDL
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; sleeping advances it"""
+    now = [1000.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(backoff_module.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(backoff_module.time, 'sleep', sleep)
+    return now, slept
+
+
+@pytest.fixture
+def coordinator():
+    return BackoffCoordinator(base_delay=10.0, max_delay=40.0, jitter=0.0, resume_spacing=3.0,
+                              reset_after=900.0, log=lambda line: None)
+
+
+def in_thread(function):
+    """Run function in a new thread and return its result"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join(5)
+    return result[0]
+
+
+# ====================================================================
+# Pauses
+# ====================================================================
+
+def test_only_rate_limit_messages_pause(clock, coordinator):
+    coordinator.record_message('HTTP Error 404: Not Found')
+    assert coordinator.remaining() == 0.0
+
+    coordinator.record_message('[download] Got error: HTTP Error 429: Too Many Requests')
+    assert coordinator.remaining() == 10.0
+    assert coordinator.pauses == 1
+
+
+def test_signals_during_a_pause_are_the_same_incident(clock, coordinator):
+    now, _ = clock
+    coordinator.rate_limited()
+    now[0] += 5
+    coordinator.rate_limited()
+
+    assert coordinator.pauses == 1
+    assert coordinator.remaining() == 5.0
+
+
+def test_pauses_double_up_to_the_maximum_and_reset(clock, coordinator):
+    now, _ = clock
+    pauses = []
+    for _ in range(4):
+        coordinator.rate_limited()
+        pauses.append(coordinator.remaining())
+        now[0] += pauses[-1]
+    assert pauses == [10.0, 20.0, 40.0, 40.0]
+
+    now[0] += 901
+    coordinator.rate_limited()
+    assert coordinator.remaining() == 10.0
+    assert coordinator.stats()['longest_pause'] == 40.0
+
+
+def test_retry_sleep_waits_out_the_pause_only(clock, coordinator, monkeypatch):
+    monkeypatch.setattr(backoff_module.random, 'uniform', lambda low, high: high)
+    assert coordinator.retry_sleep(0) == 0.0
+
+    coordinator.rate_limited()
+    assert coordinator.retry_sleep(0) == 13.0
+    assert coordinator.stats()['waited_time'] == 13.0
+
+
+# ====================================================================
+# Gradual Resume
+# ====================================================================
+
+def test_workers_are_admitted_apart_after_a_pause(clock, coordinator):
+    now, slept = clock
+    coordinator.rate_limited()
+    now[0] += 10
+
+    # Each worker starts resume_spacing after the previous one
+    assert [in_thread(coordinator.wait) for _ in range(3)] == [0.0, 3.0, 3.0]
+    assert now[0] == 1016.0
+
+
+def test_admitted_worker_is_not_queued_again(clock, coordinator):
+    now, _ = clock
+    coordinator.rate_limited()
+    now[0] += 10
+
+    assert coordinator.wait() == 0.0
+    # The same worker's next playlist entry goes on; other workers still queue
+    assert coordinator.wait() == 0.0
+    assert in_thread(coordinator.wait) == 3.0
+
+    # A new pause admits it again
+    now[0] += 100
+    coordinator.rate_limited()
+    now[0] += 20
+    in_thread(coordinator.wait)
+    assert coordinator.wait() == 3.0
+
+
+def test_no_admission_queue_long_after_a_pause(clock, coordinator):
+    now, slept = clock
+    coordinator.rate_limited()
+    now[0] += 100
+
+    assert [in_thread(coordinator.wait) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert slept == []
+
+
+# ====================================================================
+# yt-dlp Integration
+# ====================================================================
+
+def test_apply_adds_retry_sleeps_gate_and_hooks(coordinator):
+    ydl_opts = coordinator.apply({'error_hooks': [print]})
+
+    assert set(ydl_opts['retry_sleep_functions']) == {'http', 'fragment', 'extractor'}
+    assert ydl_opts['entry_gate'] == coordinator.wait
+    assert ydl_opts['warning_hooks'] == [coordinator.record_message]
+    assert ydl_opts['error_hooks'] == [print, coordinator.record_message]
+
+
+def test_download_options_keep_yt_dlp_console_output(tmp_path, coordinator):
+    concurrency = AdaptiveConcurrency(log=lambda line: None)
+    ydl_opts = build_download_options(str(tmp_path), 'playlist', concurrency=concurrency, backoff=coordinator)
+
+    # A logger would replace the in-place progress bar with one line per update
+    assert 'logger' not in ydl_opts
+    assert ydl_opts['error_hooks'] == [concurrency.record_error, coordinator.record_message]
+
+
+def test_downloader_passes_messages_to_hooks():
+    warnings, errors = [], []
+    ydl = FinalizingYoutubeDL({'quiet': True, 'no_warnings': True, 'ignoreerrors': True,
+                               'warning_hooks': [warnings.append], 'error_hooks': [errors.append]})
+
+    ydl.report_warning('slow down')
+    ydl.report_error('HTTP Error 429: Too Many Requests')
+    ydl.to_screen('[download] Got error: HTTP Error 429: Too Many Requests. Retrying (1/10)...')
+    ydl.to_screen('[download] Destination: video.mp4')
+
+    assert warnings == ['slow down', '[download] Got error: HTTP Error 429: Too Many Requests. Retrying (1/10)...']
+    assert errors == ['HTTP Error 429: Too Many Requests']
+
+
+def test_entry_gate_runs_before_every_playlist_entry():
+    gated = []
+    ydl = FinalizingYoutubeDL({'quiet': True, 'simulate': True, 'entry_gate': lambda: gated.append(True)})
+    entries = [{'id': video_id, 'title': video_id, 'url': f'https://example.com/{video_id}.mp4', 'ext': 'mp4'}
+               for video_id in ('a', 'b', 'c')]
+
+    ydl.process_ie_result({'_type': 'playlist', 'id': 'list', 'title': 'List', 'entries': entries,
+                           'extractor': 'generic', 'extractor_key': 'Generic'}, download=False)
+
+    assert len(gated) == 3
@@ -0,0 +1,197 @@
+"""Tests for the global bandwidth limiter"""
+
+from datetime import datetime
+
+import pytest
+
+import bandwidth
+from bandwidth import BandwidthGovernor, TokenBucket, format_rate, parse_rate, parse_schedule
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; sleeping advances it"""
+    now = [100.0]
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(bandwidth.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(bandwidth.time, 'sleep', sleep)
+    return now, slept
+
+
+# ====================================================================
+# Parsing
+# ====================================================================
+
+@pytest.mark.parametrize('value, expected', [
+    ('500K', 500 * 1024),
+    ('10M', 10 * 1024 * 1024),
+    (' 2m ', 2 * 1024 * 1024),
+    ('1234', 1234),
+    ('off', None),
+    ('unlimited', None),
+    ('0', None),
+])
+def test_parse_rate(value, expected):
+    assert parse_rate(value) == expected
+
+
+def test_parse_rate_percentages():
+    assert parse_rate('20%', base=1000.0) == 200.0
+    with pytest.raises(ValueError, match='needs a base limit'):
+        parse_rate('20%')
+    with pytest.raises(ValueError, match='Invalid rate'):
+        parse_rate('fast')
+
+
+def test_parse_schedule():
+    assert parse_schedule('09:00-18:00=20%, 23:30-06:00=off,', base=1000.0) == [
+        (9 * 60, 18 * 60, 200.0),
+        (23 * 60 + 30, 6 * 60, None),
+    ]
+    assert parse_schedule('') == []
+
+
+@pytest.mark.parametrize('spec', ['09:00=1M', '9-18=1M', '09:00-25:00=1M', '09:00-18:00=fast'])
+def test_parse_schedule_rejects_bad_windows(spec):
+    with pytest.raises(ValueError):
+        parse_schedule(spec, base=1000.0)
+
+
+def test_format_rate():
+    assert format_rate(None) == 'unlimited'
+    assert format_rate(2 * 1024 * 1024) == '2.0 MB/s'
+    assert format_rate(512 * 1024) == '512 KB/s'
+
+
+# ====================================================================
+# Token Bucket
+# ====================================================================
+
+def test_unlimited_bucket_never_sleeps(clock):
+    _, slept = clock
+    bucket = TokenBucket()
+    assert bucket.consume(10 ** 9) == 0.0
+    assert slept == []
+
+
+def test_bucket_sleeps_off_its_debt_in_short_steps(clock):
+    _, slept = clock
+    bucket = TokenBucket(rate=1000.0)
+
+    # 2500 bytes at 1000 B/s: 2.5 seconds, in sleeps of at most MAX_SLEEP
+    assert bucket.consume(2500) == pytest.approx(2.5)
+    assert max(slept) <= bandwidth.MAX_SLEEP
+
+
+def test_bucket_burst_is_capped(clock):
+    now, _ = clock
+    bucket = TokenBucket(rate=1000.0, burst=2.0)
+    now[0] += 60  # Idle for a minute saves up at most 2 seconds of traffic
+
+    assert bucket.consume(2000) == 0.0
+    assert bucket.consume(1000) == pytest.approx(1.0)
+
+
+def test_progress_hook_throttles_by_new_bytes(clock):
+    bucket = TokenBucket(rate=1000.0)
+    consumed = []
+    bucket.consume = lambda amount: consumed.append(amount) or 0.0
+
+    for downloaded in (1000, 1000, 3000):
+        bucket.progress_hook({'status': 'downloading', 'tmpfilename': 'a.part', 'downloaded_bytes': downloaded})
+    bucket.progress_hook({'status': 'finished', 'filename': 'a', 'downloaded_bytes': 3000})
+    bucket.progress_hook({'status': 'downloading', 'tmpfilename': 'a.part', 'downloaded_bytes': 500})
+
+    assert consumed == [1000, 2000, 500]
+
+
+def test_bucket_state_is_shared_with_worker_processes():
+    bucket = TokenBucket(rate=1000.0)
+    bucket._file_bytes['a.part'] = 10
+    # What a spawned worker process gets: the shared array, not the per-file progress
+    copy = TokenBucket.__new__(TokenBucket)
+    copy.__setstate__(bucket.__getstate__())
+
+    assert copy._file_bytes == {}
+    bucket.set_rate(5000.0)
+    assert copy.rate == 5000.0
+
+
+def test_apply_adds_hook_and_block_size():
+    bucket = TokenBucket(rate=1000.0)
+    existing = object()
+    options = bucket.apply({'progress_hooks': [existing]})
+
+    assert options['progress_hooks'] == [existing, bucket.progress_hook]
+    assert options['buffersize'] == bandwidth.LIMITED_BUFFER_SIZE and options['noresizebuffer']
+
+
+# ====================================================================
+# Governor
+# ====================================================================
+
+def test_schedule_windows_and_midnight_wrap():
+    governor = BandwidthGovernor(TokenBucket(), limit=1000.0, log=lambda line: None,
+                                 schedule=[(9 * 60, 18 * 60, 200.0), (23 * 60, 6 * 60, None)])
+
+    assert governor.current_limit(datetime(2024, 1, 1, 12, 0)) == 200.0
+    assert governor.current_limit(datetime(2024, 1, 1, 18, 0)) == 1000.0
+    assert governor.current_limit(datetime(2024, 1, 1, 23, 30)) is None
+    assert governor.current_limit(datetime(2024, 1, 1, 5, 59)) is None
+
+
+def test_set_limit_overrides_and_survives_a_missing_control_file(tmp_path):
+    lines = []
+    bucket = TokenBucket(rate=1000.0)
+    governor = BandwidthGovernor(bucket, limit=1000.0, control_file=str(tmp_path / 'rate'), log=lines.append)
+
+    governor.set_limit(512 * 1024)
+    governor.update()
+    governor.update()
+
+    assert bucket.rate == 512 * 1024
+    assert lines == ['🚦 Bandwidth limit: 512 KB/s']
+    governor.clear_override()
+    assert bucket.rate == 1000.0
+
+
+def test_control_file_applies_only_changed_contents(tmp_path):
+    control = tmp_path / 'rate'
+    control.write_text('50%\n', encoding='utf-8')
+    bucket = TokenBucket()
+    governor = BandwidthGovernor(bucket, limit=1000.0, control_file=str(control), log=lambda line: None)
+    assert bucket.rate == 500.0
+
+    # An API override stays until the file changes again
+    governor.set_limit(100.0)
+    governor.update()
+    assert bucket.rate == 100.0
+
+    control.write_text('off', encoding='utf-8')
+    governor.update()
+    assert bucket.rate is None
+
+    control.write_text('', encoding='utf-8')
+    governor.update()
+    assert bucket.rate == 1000.0
+
+    control.unlink()
+    governor.set_limit(300.0)
+    governor.update()
+    assert bucket.rate == 300.0
+
+
+def test_bad_control_file_contents_are_reported_once(tmp_path):
+    control = tmp_path / 'rate'
+    control.write_text('fast', encoding='utf-8')
+    lines = []
+    governor = BandwidthGovernor(TokenBucket(), limit=1000.0, control_file=str(control), log=lines.append)
+    governor.update()
+
+    assert len(lines) == 1 and 'Ignoring' in lines[0]
+    assert governor.current_limit() == 1000.0
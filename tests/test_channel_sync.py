@@ -0,0 +1,94 @@
+"""Tests for incremental channel sync watermarks"""
+
+import pytest
+from yt_dlp.utils import RejectedVideoReached
+
+from channel_sync import RECENT_IDS_KEPT, ChannelSync, ChannelSyncState, split_channel_tabs
+
+
+CHANNEL = 'https://youtube.com/@someone'
+
+
+@pytest.fixture
+def state(tmp_path):
+    return ChannelSyncState(path=str(tmp_path / 'channel_sync.sqlite3'))
+
+
+def finished(video_id, upload_date=None):
+    """postprocessor hook status of a video that went through every step"""
+    return {'status': 'finished', 'postprocessor': 'MoveFilesAfterDownload',
+            'info_dict': {'id': video_id, 'upload_date': upload_date}}
+
+
+def sync_run(state, entries, completed):
+    """One run over flat entries (newest first); returns the tracker after commit()"""
+    sync = ChannelSync(state, CHANNEL)
+    for entry in entries:
+        try:
+            sync.match_filter(entry, incomplete=True)
+        except RejectedVideoReached:
+            break
+    for video_id, upload_date in completed:
+        sync.postprocessor_hook(finished(video_id, upload_date))
+    sync.commit()
+    return sync
+
+
+def test_first_sync_records_finished_videos_only(state):
+    sync = sync_run(state, [{'id': 'c'}, {'id': 'b'}, {'id': 'a'}],
+                    completed=[('c', '20240103'), ('a', '20240101')])
+
+    assert sync.summary() == {'new': 2, 'skipped': 0}
+    assert state.get(CHANNEL) == {'recent_ids': ['c', 'a'], 'upload_date': '20240103', 'synced_count': 2}
+
+
+def test_next_sync_stops_at_watermark_and_counts_this_runs_skips(state):
+    sync_run(state, [{'id': 'b'}, {'id': 'a'}], completed=[('b', '20240102'), ('a', '20240101')])
+    sync_run(state, [{'id': 'c'}, {'id': 'b'}, {'id': 'a'}], completed=[('c', '20240103')])
+    sync = sync_run(state, [{'id': 'd'}, {'id': 'c'}, {'id': 'b'}], completed=[('d', '20240104')])
+
+    # Enumeration stopped at 'c': only that entry was skipped in this run
+    assert sync.seen_ids == {'d': None}
+    assert sync.summary() == {'new': 1, 'skipped': 1}
+    assert state.get(CHANNEL) == {'recent_ids': ['d', 'c', 'b', 'a'], 'upload_date': '20240104',
+                                  'synced_count': 4}
+
+
+def test_upload_date_watermark_comes_from_full_info(state):
+    # Flat entries have no upload_date; the finished video's full info does
+    sync_run(state, [{'id': 'b'}], completed=[('b', '20240102')])
+    sync = ChannelSync(state, CHANNEL)
+
+    assert sync.reached({'id': 'new', 'upload_date': '20240105'}) is None
+    assert 'older than 20240102' in sync.reached({'id': 'deleted-from-ids', 'upload_date': '20240101'})
+    assert sync.summary()['skipped'] == 1
+
+
+def test_failed_videos_do_not_advance_watermark(state):
+    sync_run(state, [{'id': 'b'}, {'id': 'a'}], completed=[('a', '20240101')])
+
+    sync = ChannelSync(state, CHANNEL)
+    assert sync.reached({'id': 'b'}) is None
+    assert sync.reached({'id': 'a'}) is not None
+
+
+def test_recent_ids_are_bounded(state):
+    ids = [f'v{n}' for n in range(RECENT_IDS_KEPT + 10)]
+    state.update(CHANNEL, ids, None)
+
+    watermark = state.get(CHANNEL)
+    assert watermark['recent_ids'] == ids[:RECENT_IDS_KEPT]
+    assert watermark['synced_count'] == RECENT_IDS_KEPT + 10
+
+
+def test_split_channel_tabs():
+    tabs = [{'_type': 'url', 'ie_key': 'YoutubeTab', 'url': f'{CHANNEL}/{tab}'}
+            for tab in ('videos', 'shorts', 'streams')]
+    assert split_channel_tabs({'_type': 'playlist', 'entries': iter(tabs)}) == tabs
+
+    videos = [{'_type': 'url', 'ie_key': 'Youtube', 'id': 'a'}, {'_type': 'url', 'ie_key': 'Youtube', 'id': 'b'}]
+    (result,) = split_channel_tabs({'_type': 'playlist', 'entries': iter(videos)})
+    assert list(result['entries']) == videos
+
+    video = {'_type': 'video', 'id': 'a'}
+    assert split_channel_tabs(video) == [video]
@@ -0,0 +1,109 @@
+"""Tests for the adaptive concurrency controller"""
+
+import math
+
+import pytest
+
+import concurrency
+from concurrency import AdaptiveConcurrency, is_rate_limit_error
+
+
+@pytest.fixture
+def cpu_load(monkeypatch):
+    load = [0.1]
+    monkeypatch.setattr(concurrency, 'get_cpu_load', lambda: load[0])
+    monkeypatch.setattr(concurrency.os, 'cpu_count', lambda: 4)
+    return load
+
+
+def downloading(controller, filename, downloaded):
+    controller.progress_hook({'status': 'downloading', 'tmpfilename': filename, 'downloaded_bytes': downloaded})
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error('ERROR: [youtube] abc: Unable to download webpage: HTTP Error 429: Too Many Requests')
+    assert not is_rate_limit_error('ERROR: [youtube] abc: Video unavailable')
+
+
+def test_progress_hook_counts_each_byte_once():
+    controller = AdaptiveConcurrency()
+    downloading(controller, 'a.mp4.part', 100)
+    downloading(controller, 'a.mp4.part', 250)
+    downloading(controller, 'b.mp4.part', 50)
+    controller.progress_hook({'status': 'finished', 'filename': 'a.mp4', 'downloaded_bytes': 250})
+    controller.progress_hook({'status': 'error', 'filename': 'b.mp4'})
+
+    assert controller._bytes == 300
+    assert controller._file_bytes == {'b.mp4.part': 50}
+
+
+def test_probes_up_and_gives_back_unproductive_workers(cpu_load):
+    controller = AdaptiveConcurrency(min_workers=1, max_workers=4)
+
+    downloading(controller, 'a', 1000)
+    assert controller.evaluate(1.0)['limit'] == 2
+    # Throughput with 2 workers must beat 1 worker's by min_gain
+    downloading(controller, 'a', 2020)
+    decision = controller.evaluate(1.0)
+    assert decision['limit'] == 1
+    assert decision['reason'] == 'no throughput gain from the last increase'
+    # Holds for a few rounds before probing again
+    assert [controller.evaluate(1.0)['reason'] for _ in range(4)] == ['holding'] * 3 + ['probing for more throughput']
+
+
+def test_rate_limits_and_failures_halve_workers(cpu_load):
+    controller = AdaptiveConcurrency(min_workers=2, max_workers=16)
+    controller.limit = 12
+
+    controller.record_error('HTTP Error 429: Too Many Requests')
+    assert controller.evaluate(1.0)['limit'] == 6
+
+    controller.record_result(True)
+    controller.record_result(False)
+    decision = controller.evaluate(1.0)
+    assert (decision['limit'], decision['reason']) == (3, 'error rate 50%')
+
+    controller.record_error('HTTP Error 429')
+    assert controller.evaluate(1.0)['limit'] == 2
+
+
+def test_cpu_saturation_halves_workers(cpu_load):
+    controller = AdaptiveConcurrency(min_workers=1, max_workers=16)
+    controller.limit = 8
+    cpu_load[0] = 0.95
+
+    decision = controller.evaluate(5.0)
+    assert decision['limit'] == 4
+    assert decision['reason'] == 'CPU load 0.95 per core'
+
+
+def simulate_load(controller, cpu_load, ffmpeg_cores, rounds, download_cores=0.4, interval=5.0):
+    """Evaluate while the load average (4 cores) follows downloads plus FFmpeg, as the kernel's does"""
+    decay = math.exp(-interval / concurrency.LOAD_AVERAGE_WINDOW)
+    decisions = []
+    for _ in range(rounds):
+        cpu_load[0] = (cpu_load[0] * 4 * decay + (download_cores + ffmpeg_cores[0]) * (1 - decay)) / 4
+        decisions.append(controller.evaluate(interval))
+    return decisions
+
+
+@pytest.mark.parametrize('exclude_ffmpeg', [False, True])
+def test_ffmpeg_load_does_not_count_against_downloads(cpu_load, exclude_ffmpeg):
+    # Two FFmpeg jobs with 2 threads each keep all 4 cores busy
+    ffmpeg_cores = [4.0]
+    controller = AdaptiveConcurrency(min_workers=1, max_workers=16,
+                                     excluded_load=(lambda: ffmpeg_cores[0]) if exclude_ffmpeg else None)
+    controller.limit = 8
+    cpu_load[0] = 0.1
+
+    decisions = simulate_load(controller, cpu_load, ffmpeg_cores, rounds=30)
+    if not exclude_ffmpeg:
+        assert any(decision['reason'].startswith('CPU load') for decision in decisions)
+        return
+    assert all(decision['limit'] >= 8 for decision in decisions)
+    assert decisions[-1]['cpu_load'] == pytest.approx(0.1)
+
+    # After the transcodes, the excluded share decays along with the load average
+    ffmpeg_cores[0] = 0.0
+    decisions = simulate_load(controller, cpu_load, ffmpeg_cores, rounds=30)
+    assert [decision['cpu_load'] for decision in decisions] == pytest.approx([0.1] * 30)
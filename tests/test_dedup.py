@@ -0,0 +1,106 @@
+"""Tests for in-run video de-duplication"""
+
+import os
+
+import pytest
+
+import dedup
+from dedup import VideoDeduplicator, link_or_copy
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'first' / 'video.mp4'
+    path.parent.mkdir()
+    path.write_bytes(b'x' * 100)
+    return str(path)
+
+
+def fail(*args):
+    raise OSError('not supported')
+
+
+# ====================================================================
+# Linking Files
+# ====================================================================
+
+def test_link_prefers_hardlinks(source, tmp_path):
+    destination = str(tmp_path / 'second' / 'video.mp4')
+
+    assert link_or_copy(source, destination) == 'hardlink'
+    assert os.path.samefile(source, destination)
+    assert link_or_copy(source, destination) == 'exists'
+
+
+def test_link_falls_back_to_reflink_then_copy(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup.os, 'link', fail)
+    monkeypatch.setattr(dedup, 'reflink', lambda src, dst: open(dst, 'wb').close())
+    assert link_or_copy(source, str(tmp_path / 'reflinked.mp4')) == 'reflink'
+
+    monkeypatch.setattr(dedup, 'reflink', fail)
+    destination = str(tmp_path / 'copied.mp4')
+    assert link_or_copy(source, destination) == 'copy'
+    assert open(destination, 'rb').read() == b'x' * 100
+
+
+# ====================================================================
+# De-duplication Map
+# ====================================================================
+
+def test_first_claim_downloads_and_later_claims_wait():
+    dedup_map = VideoDeduplicator()
+
+    assert dedup_map.claim('youtube a') is None
+    waiting = dedup_map.claim('youtube a')
+    assert not waiting.done()
+    assert dedup_map.claim('youtube b') is None
+
+    dedup_map.finish('youtube a', {'success': True})
+    assert waiting.result(0) == {'success': True}
+    assert dedup_map.stats()['duplicates'] == 1
+
+
+def test_publish_waits_for_post_processing():
+    dedup_map = VideoDeduplicator()
+    dedup_map.claim('youtube a')
+    waiting = dedup_map.claim('youtube a')
+
+    result = dedup_map.publish('youtube a', {'post_processing': [], 'finish': lambda: {'success': True}})
+    assert not waiting.done()
+    assert result['finish']() == {'success': True}
+    assert waiting.result(0) == {'success': True}
+
+
+def test_failed_post_processing_releases_duplicates():
+    def finish():
+        raise RuntimeError('FFmpeg failed')
+
+    dedup_map = VideoDeduplicator()
+    dedup_map.claim('youtube a')
+    waiting = dedup_map.claim('youtube a')
+
+    result = dedup_map.publish('youtube a', {'post_processing': [], 'finish': finish})
+    with pytest.raises(RuntimeError):
+        result['finish']()
+    assert waiting.result(0) is None
+
+
+def test_materialize_keeps_extension_and_extra_files(source, tmp_path):
+    subtitles = os.path.join(os.path.dirname(source), 'video.en.vtt')
+    with open(subtitles, 'w') as f:
+        f.write('WEBVTT')
+    dedup_map = VideoDeduplicator()
+
+    # The duplicate expected a .webm; post-processing made an .mp4
+    methods = dedup_map.materialize([source, subtitles], str(tmp_path / 'second' / 'video.webm'))
+
+    assert methods == ['hardlink', 'hardlink']
+    assert os.path.exists(tmp_path / 'second' / 'video.mp4')
+    assert os.path.exists(tmp_path / 'second' / 'video.en.vtt')
+    assert dedup_map.stats() == {'duplicates': 0, 'methods': {'hardlink': 2}, 'bytes_saved': 106}
+
+
+def test_materialize_onto_the_same_file(source):
+    dedup_map = VideoDeduplicator()
+
+    assert dedup_map.materialize([source], source) == ['exists']
@@ -0,0 +1,42 @@
+"""Tests for the up-front URL classification in download.py"""
+
+import threading
+
+import download
+from download import resolve_content_types
+
+
+def test_only_ambiguous_urls_are_probed_once_each(monkeypatch):
+    probed = []
+    lock = threading.Lock()
+
+    def get_content_type(url):
+        with lock:
+            probed.append(url)
+        return 'channel'
+
+    monkeypatch.setattr(download, 'get_content_type', get_content_type)
+    urls = [
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+        'https://www.youtube.com/playlist?list=PL1234567890',
+        'https://www.youtube.com/somename',
+        'https://www.youtube.com/somename',
+        'https://www.youtube.com/othername',
+    ]
+
+    assert resolve_content_types(urls, max_workers=4) == {
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ': 'video',
+        'https://www.youtube.com/playlist?list=PL1234567890': 'playlist',
+        'https://www.youtube.com/somename': 'channel',
+        'https://www.youtube.com/othername': 'channel',
+    }
+    assert sorted(probed) == ['https://www.youtube.com/othername', 'https://www.youtube.com/somename']
+
+
+def test_no_probes_for_unambiguous_urls(monkeypatch):
+    def get_content_type(url):
+        raise AssertionError('no network probe expected')
+
+    monkeypatch.setattr(download, 'get_content_type', get_content_type)
+    assert resolve_content_types(['https://youtu.be/dQw4w9WgXcQ']) == {'https://youtu.be/dQw4w9WgXcQ': 'video'}
+    assert resolve_content_types([]) == {}
@@ -0,0 +1,52 @@
+"""Tests for the indexed download archive"""
+
+import pytest
+
+from download_archive import DownloadArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return DownloadArchive(path=str(tmp_path / 'download_archive.sqlite3'))
+
+
+def test_membership_and_add(archive):
+    assert archive  # Truthy even when empty, so yt-dlp always checks it
+    assert 'youtube abc' not in archive
+
+    archive.add('youtube abc')
+    archive.add('youtube abc')
+
+    assert 'youtube abc' in archive
+    assert len(archive) == 1
+
+
+def test_other_instances_see_new_ids(archive):
+    # Each worker process opens its own connection to the same file
+    other = DownloadArchive(path=archive.path)
+    assert 'youtube abc' not in other
+
+    archive.add('youtube abc')
+    assert 'youtube abc' in other
+
+
+def test_import_file_counts_new_ids_and_skips_blank_lines(archive, tmp_path):
+    text_archive = tmp_path / 'archive.txt'
+    text_archive.write_text('youtube aaa\n\n  youtube bbb  \nyoutube aaa\n', encoding='utf-8')
+    archive.add('youtube bbb')
+
+    assert archive.import_file(str(text_archive)) == 1
+    assert 'youtube aaa' in archive and 'youtube bbb' in archive
+    assert len(archive) == 2
+
+
+def test_export_file_round_trip(archive, tmp_path):
+    archive.add_many(['youtube ccc', 'youtube aaa', 'vimeo 123'])
+    exported = tmp_path / 'archive.txt'
+
+    assert archive.export_file(str(exported)) == 3
+    assert exported.read_text(encoding='utf-8') == 'vimeo 123\nyoutube aaa\nyoutube ccc\n'
+
+    copy = DownloadArchive(path=str(tmp_path / 'copy.sqlite3'))
+    assert copy.import_file(str(exported)) == 3
+    assert copy.import_file(str(exported)) == 0
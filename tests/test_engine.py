@@ -0,0 +1,167 @@
+"""Tests for the asyncio download engine (downloads stubbed out)"""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+import engine
+from download_archive import DownloadArchive
+from engine import DownloadEngine, JobCancelled
+
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(engine, 'get_content_type', lambda url: 'video')
+
+
+def run_engine(downloader, urls=(URL,), **options):
+    """Run the engine with _download_blocking replaced by downloader(task, cancelled)"""
+    download_engine = DownloadEngine(output_path='unused', **options)
+    download_engine._download_blocking = lambda task, cancelled, post_process: downloader(task, cancelled)
+
+    async def collect():
+        return [result async for result in download_engine.run(list(urls))]
+    return asyncio.run(collect())
+
+
+def blocking_download(started=None):
+    """Stub that behaves like a download whose progress hook checks for cancellation"""
+    def download(task, cancelled):
+        if started is not None:
+            started.set()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if cancelled.is_set():
+                raise JobCancelled()
+            time.sleep(0.01)
+        raise AssertionError('download was never cancelled')
+    return download
+
+
+def test_downloaded_video():
+    (result,) = run_engine(lambda task, cancelled: {'jobs': [], 'files': ['a.mp4'], 'archived': False})
+
+    assert result['success'] and not result['skipped']
+    assert result['files'] == ['a.mp4']
+    assert result['message'] == f"✅ Downloaded '{URL}'"
+
+
+def test_archived_video_is_skipped_not_failed():
+    (result,) = run_engine(lambda task, cancelled: {'jobs': [], 'files': [], 'archived': True})
+
+    assert result['success'] and result['skipped']
+    assert 'already in the download archive' in result['message']
+
+
+def test_missing_files_are_a_failure():
+    (result,) = run_engine(lambda task, cancelled: {'jobs': [], 'files': [], 'archived': False})
+
+    assert not result['success'] and not result['skipped']
+    assert result['message'].startswith('❌ Failed to download')
+
+
+def test_timeout_cancels_the_download_and_frees_its_slot():
+    calls = []
+    stuck = blocking_download()
+
+    def download(task, cancelled):
+        calls.append(task['url'])
+        if task['url'] == URL:
+            return stuck(task, cancelled)
+        return {'jobs': [], 'files': ['b.mp4'], 'archived': False}
+
+    other = 'https://www.youtube.com/watch?v=9bZkp7q5f2w'
+    results = run_engine(download, urls=(URL, other), download_limit=1, job_timeout=0.2)
+    by_url = {result['url']: result for result in results}
+
+    assert by_url[URL]['message'] == f"⏱️ Timed out after 0.2s: '{URL}'"
+    assert not by_url[URL]['success']
+    # The only download slot came back once the timed-out thread stopped
+    assert by_url[other]['success']
+    assert sorted(calls) == sorted([URL, other])
+
+
+def test_post_processing_is_not_timed(monkeypatch):
+    finished = []
+
+    def slow_post_processing(ydl, filename, info, files_to_move):
+        time.sleep(0.5)
+        finished.append(filename)
+
+    monkeypatch.setattr(engine, 'run_post_processing', slow_post_processing)
+    download_engine = DownloadEngine(output_path='unused', job_timeout=0.2, postprocess_limit=1)
+    download_engine._download_blocking = lambda task, cancelled, post_process: {
+        'jobs': [post_process.submit(None, 'a.mp4', {})], 'files': ['a.mp4'], 'archived': False}
+
+    async def run():
+        results = [result async for result in download_engine.run([URL])]
+        # The pending slot is only released once the FFmpeg job has really finished
+        pending = download_engine._post_process._pending
+        return results, pending._value == pending._initial_value
+
+    (result,), released = asyncio.run(run())
+
+    assert result['success']
+    assert result['message'] == f"✅ Downloaded '{URL}'"
+    assert finished == ['a.mp4']
+    assert released
+
+
+def test_cancel_stops_running_downloads():
+    started = threading.Event()
+    download_engine = DownloadEngine(output_path='unused')
+    download_engine._download_blocking = lambda task, cancelled, post_process: \
+        blocking_download(started)(task, cancelled)
+
+    async def run():
+        results = download_engine.run([URL])
+        pending = asyncio.ensure_future(results.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        download_engine.cancel()
+        result = await pending
+        await results.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert not result['success']
+    assert result['message'] == f"❌ Error downloading '{URL}': Download cancelled"
+
+
+def test_closing_the_results_early_cancels_downloads():
+    started = threading.Event()
+    events = []
+    download_engine = DownloadEngine(output_path='unused')
+
+    def download(task, cancelled, post_process):
+        events.append(cancelled)
+        return blocking_download(started)(task, cancelled)
+
+    download_engine._download_blocking = download
+
+    async def run():
+        results = download_engine.run([URL])
+        pending = asyncio.ensure_future(results.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(run())
+    assert events and events[0].is_set()
+
+
+def test_archived_check_without_info(monkeypatch, tmp_path):
+    archive = DownloadArchive(path=str(tmp_path / 'archive.sqlite3'))
+    archive.add('youtube dQw4w9WgXcQ')
+    monkeypatch.setattr(engine, 'download_archive', archive)
+    download_engine = DownloadEngine(output_path='unused', use_archive=True)
+
+    assert download_engine._archived(None, {'kind': 'url', 'url': URL, 'content_type': 'video'}, None)
+    assert not download_engine._archived(
+        None, {'kind': 'url', 'url': 'https://youtu.be/9bZkp7q5f2w', 'content_type': 'video'}, None)
+    assert not DownloadEngine(output_path='unused')._archived(None, {'kind': 'url', 'url': URL}, None)
@@ -0,0 +1,197 @@
+"""Tests for the FFmpeg process manager"""
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from yt_dlp.postprocessor import ffmpeg as ffmpeg_postprocessor
+
+import ffmpeg_manager
+from ffmpeg_manager import FFmpegManager
+
+
+def job(output='a.mp4', seconds=2.0, cpu_seconds=3.0, waited=0.0, returncode=0):
+    return {'output': output, 'seconds': seconds, 'cpu_seconds': cpu_seconds, 'waited': waited,
+            'threads': 2, 'returncode': returncode}
+
+
+def test_cpu_demand_counts_jobs_of_worker_processes(monkeypatch):
+    monkeypatch.setattr(ffmpeg_manager.os, 'cpu_count', lambda: 8)
+    manager = FFmpegManager(max_processes=4, threads=3, report=None)
+    assert manager.cpu_demand() == 0.0
+
+    manager.job_started()
+    manager.job_started()
+    assert manager.cpu_demand() == 6.0
+    manager.job_started()
+    assert manager.cpu_demand() == 8.0
+
+    manager.record_remote(job())
+    assert manager.running == 2
+    assert manager.stats()['jobs'] == 1
+    assert manager.stats()['peak'] == 3
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Executable named ffmpeg that echoes its arguments to stderr, sleeps and writes its output"""
+    path = tmp_path / 'ffmpeg'
+    path.write_text(f"#!{sys.executable}\n"
+                    "import sys, time\n"
+                    "sys.stderr.write(' '.join(sys.argv[1:]))\n"
+                    "time.sleep(0.2)\n"
+                    "open(sys.argv[-1], 'w').close()\n"
+                    "sys.exit(3 if 'fail' in sys.argv[-1] else 0)\n")
+    path.chmod(0o755)
+    return str(path)
+
+
+# ====================================================================
+# Commands
+# ====================================================================
+
+@pytest.mark.parametrize('processes, cores, expected', [(1, 8, 8), (3, 8, 2), (16, 8, 1), (0, 4, 4)])
+def test_thread_budget(processes, cores, expected):
+    assert ffmpeg_manager.thread_budget(processes, cores) == expected
+
+
+def test_defaults_share_the_cores(monkeypatch):
+    monkeypatch.setattr(ffmpeg_manager.os, 'cpu_count', lambda: 8)
+    manager = FFmpegManager(max_processes=2)
+    assert (manager.max_processes, manager.threads) == (2, 4)
+    assert manager.describe() == 'up to 2 at once, 4 thread(s) each'
+
+
+def test_unknown_ionice_class():
+    with pytest.raises(ValueError):
+        FFmpegManager(ionice='realtime')
+
+
+@pytest.mark.parametrize('args, expected', [
+    (['ffmpeg', '-y', '-i', 'in.webm', '-c', 'copy', 'out.mp4'], True),
+    (['/usr/bin/ffmpeg.exe', '-i', 'a.webm', '-i', 'b.webm', 'out.mp4'], True),
+    (['ffmpeg', '-version'], False),
+    (['ffmpeg', '-i', 'in.webm'], False),
+    (['ffprobe', '-i', 'in.webm', '-show_streams', 'x'], False),
+    ([], False),
+])
+def test_manages_only_ffmpeg_runs_with_an_output(args, expected):
+    assert FFmpegManager.manages(args) is expected
+
+
+def test_command_adds_threads_after_the_last_input(monkeypatch):
+    monkeypatch.setattr(ffmpeg_manager.sys, 'platform', 'linux')
+    manager = FFmpegManager(max_processes=2, threads=3)
+
+    assert manager.command(['ffmpeg', '-y', '-i', 'v.webm', '-i', 'a.webm', '-c', 'copy', 'out.mp4']) == [
+        'ffmpeg', '-y', '-i', 'v.webm', '-i', 'a.webm', '-threads', '3', '-c', 'copy', 'out.mp4']
+
+
+def test_command_priority_wrappers_on_linux(monkeypatch):
+    monkeypatch.setattr(ffmpeg_manager.sys, 'platform', 'linux')
+    monkeypatch.setattr(ffmpeg_manager.shutil, 'which', lambda name: f'/usr/bin/{name}')
+    manager = FFmpegManager(threads=1, nice=10, ionice='idle')
+
+    assert manager.command(['ffmpeg', '-i', 'in', 'out']) == [
+        'ionice', '-c', '3', 'nice', '-n', '10', 'ffmpeg', '-i', 'in', '-threads', '1', 'out']
+    assert manager.describe().endswith(', nice 10, ionice idle')
+
+    # Missing tools and other platforms: no wrappers
+    monkeypatch.setattr(ffmpeg_manager.shutil, 'which', lambda name: None)
+    assert manager.command(['ffmpeg', '-i', 'in', 'out'])[0] == 'ffmpeg'
+    monkeypatch.setattr(ffmpeg_manager.shutil, 'which', lambda name: f'/usr/bin/{name}')
+    monkeypatch.setattr(ffmpeg_manager.sys, 'platform', 'darwin')
+    assert manager.command(['ffmpeg', '-i', 'in', 'out'])[0] == 'ffmpeg'
+
+
+# ====================================================================
+# Statistics
+# ====================================================================
+
+def test_stats_and_job_lines():
+    lines, finished = [], []
+    manager = FFmpegManager(threads=2, report=lines.append, on_job=finished.append)
+    manager.record(job(seconds=2.0, cpu_seconds=3.0))
+    manager.record(job(output='b.mp4', seconds=1.0, cpu_seconds=None, waited=1.5, returncode=1))
+
+    assert manager.stats() == {'jobs': 2, 'seconds': 3.0, 'cpu_seconds': 3.0, 'waited': 1.5, 'peak': 0}
+    assert lines == ["⏱️  FFmpeg job 'a.mp4': 2.0s, 3.0 CPU-s (1.5 cores), 2 thread(s)",
+                     "⏱️  FFmpeg job 'b.mp4': 1.0s, 2 thread(s), waited 1.5s for a slot, exit code 1"]
+    assert [entry['output'] for entry in finished] == ['a.mp4', 'b.mp4']
+
+
+def test_stats_without_cpu_times():
+    manager = FFmpegManager(report=None)
+    manager.record(job(cpu_seconds=None))
+    assert manager.stats()['cpu_seconds'] is None
+
+
+# ====================================================================
+# Running
+# ====================================================================
+
+def test_run_caps_concurrent_processes(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(max_processes=2, threads=1, report=None)
+    results = []
+
+    def convert(index):
+        results.append(manager.run([fake_ffmpeg, '-i', 'in.webm', str(tmp_path / f'{index}.mp4')], text=True))
+
+    threads = [threading.Thread(target=convert, args=(index,)) for index in range(4)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert time.monotonic() - started >= 0.4
+    assert manager.peak == 2
+    assert manager.running == 0
+    assert sorted(returncode for _, _, returncode in results) == [0, 0, 0, 0]
+    assert results[0][1].startswith('-i in.webm -threads 1 ')
+    stats = manager.stats()
+    assert stats['jobs'] == 4
+    assert stats['waited'] > 0.1
+
+
+def test_run_reports_failed_jobs(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(threads=1, report=None)
+    stdout, stderr, returncode = manager.run([fake_ffmpeg, '-i', 'in', str(tmp_path / 'fail.mp4')])
+
+    assert returncode == 3
+    assert isinstance(stderr, bytes)
+    assert manager.jobs[0]['output'] == 'fail.mp4'
+    assert manager.jobs[0]['returncode'] == 3
+
+
+def test_activate_routes_post_processor_runs(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(threads=1, report=None)
+    output = str(tmp_path / 'out.mp4')
+
+    with manager.activate():
+        assert ffmpeg_postprocessor.Popen.run([fake_ffmpeg, '-i', 'in', output],
+                                              stdout=subprocess.PIPE, stderr=subprocess.PIPE)[2] == 0
+    # Outside activate() the same call runs unmanaged
+    ffmpeg_postprocessor.Popen.run([fake_ffmpeg, '-i', 'in', output], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    assert len(manager.jobs) == 1
+
+
+def test_piped_runs_outside_the_limit_are_not_counted(fake_ffmpeg, tmp_path):
+    manager = FFmpegManager(max_processes=1, threads=1, report=None)
+    with manager._slots:
+        # The only slot is taken, yet the unlimited run starts
+        with manager.piped([fake_ffmpeg, '-i', 'pipe:0', str(tmp_path / 'out.mp3')], limited=False,
+                           stdin=subprocess.DEVNULL, stderr=subprocess.PIPE) as process:
+            assert manager.running == 0
+    assert process.returncode == 0
+    assert manager.jobs[0]['limited'] is False
+
+    # A worker process's unlimited job never reported job_started()
+    manager.job_started()
+    manager.record_remote(dict(job(), limited=False))
+    assert manager.running == 1
+    manager.record_remote(job())
+    assert manager.running == 0
@@ -0,0 +1,182 @@
+"""Tests for compatibility-first format selection against saved format tables"""
+
+import copy
+import json
+import os
+import pickle
+
+import pytest
+from yt_dlp import YoutubeDL
+
+from format_selection import (AUDIO_TRANSCODE_COST, COPY_COST, VIDEO_TRANSCODE_COST, CompatibleFormatSelector,
+                              audio_cost, rank_audio, rank_candidates, video_cost)
+
+
+# Format tables in the shape of yt-dlp's --write-info-json output: YouTube
+# itags (H.264/VP9/AV1 video, AAC/Opus audio), an audio-only upload and a
+# generic site without codec fields
+with open(os.path.join(os.path.dirname(__file__), 'data', 'formats.json'), encoding='utf-8') as f:
+    TABLES = json.load(f)
+
+
+@pytest.fixture
+def formats():
+    return copy.deepcopy(TABLES['youtube_video']['formats'])
+
+
+def without(formats, *format_ids):
+    return [fmt for fmt in formats if fmt['format_id'] not in format_ids]
+
+
+def pick(formats, max_height=None):
+    """format_id(s) of the best candidate"""
+    best = rank_candidates(formats, max_height)[0]
+    return '+'.join(fmt['format_id'] for fmt in (best['video'], best['audio']) if fmt is not None)
+
+
+# ====================================================================
+# Costs
+# ====================================================================
+
+@pytest.mark.parametrize('fmt, expected', [
+    ({'vcodec': 'avc1.640028', 'ext': 'mp4'}, 0),
+    ({'vcodec': 'vp09.00.40.08', 'ext': 'webm'}, COPY_COST),
+    ({'vcodec': 'av01.0.08M.08', 'ext': 'mp4'}, COPY_COST),
+    ({'vcodec': 'vp8', 'ext': 'webm'}, VIDEO_TRANSCODE_COST),
+    ({'ext': 'mp4'}, 0),
+    ({'ext': 'webm'}, VIDEO_TRANSCODE_COST),
+])
+def test_video_cost(fmt, expected):
+    assert video_cost(fmt) == expected
+
+
+@pytest.mark.parametrize('fmt, expected', [
+    ({'acodec': 'mp4a.40.2', 'ext': 'm4a'}, 0),
+    ({'acodec': 'opus', 'ext': 'webm'}, AUDIO_TRANSCODE_COST),
+    ({'ext': 'm4a'}, 0),
+    ({'ext': 'webm'}, AUDIO_TRANSCODE_COST),
+])
+def test_audio_cost(fmt, expected):
+    assert audio_cost(fmt) == expected
+
+
+def test_rank_audio_prefers_aac_over_higher_bitrate_opus(formats):
+    assert [fmt['format_id'] for fmt in rank_audio(formats)] == ['140', '139', '251', '249']
+
+
+# ====================================================================
+# Ranking
+# ====================================================================
+
+def test_h264_aac_beats_vp9_and_av1_at_the_same_quality(formats):
+    assert pick(formats, 1080) == '137+140'
+    # At 360p the combined H.264/AAC format has the higher bitrate
+    assert pick(formats, 480) == '18'
+    assert pick(without(formats, '18'), 480) == '134+140'
+
+
+def test_frame_rate_beats_conversion_cost(formats):
+    # 720p60 H.264 over 720p30 H.264, and 720p60 VP9 over 720p30 H.264
+    assert pick(formats, 720) == '298+140'
+    assert pick(without(formats, '298'), 720) == '302+140'
+
+
+def test_vp9_is_copied_before_av1_by_bitrate(formats):
+    # No H.264 at 2160p: both are stream copies, the higher bitrate wins
+    ranked = rank_candidates(formats)
+    assert [c['video']['format_id'] for c in ranked[:2]] == ['313', '401']
+    assert ranked[0]['cost'] == COPY_COST
+
+
+def test_av1_when_it_is_the_only_copy(formats):
+    assert pick(without(formats, '137', '248', '614'), 1080) == '399+140'
+
+
+def test_direct_download_beats_fragments(formats):
+    # The HLS VP9 has the highest bitrate but ranks below both direct copies
+    ranked = rank_candidates(without(formats, '137'), 1080)
+    assert [c['video']['format_id'] for c in ranked[:3]] == ['248', '399', '614']
+
+
+def test_opus_only_audio_costs_a_transcode(formats):
+    ranked = rank_candidates(without(formats, '139', '140'), 1080)
+
+    assert pick(without(formats, '139', '140'), 1080) == '137+251'
+    assert ranked[0]['cost'] == AUDIO_TRANSCODE_COST
+
+
+def test_combined_format_without_separate_streams(formats):
+    combined = [fmt for fmt in formats if fmt['format_id'] == '18']
+    assert rank_candidates(combined) == [{'video': combined[0], 'audio': None, 'height': 360, 'cost': 0}]
+
+
+def test_video_without_any_audio(formats):
+    video_only = [fmt for fmt in formats if fmt['format_id'] in ('137', '248')]
+    best = rank_candidates(video_only)[0]
+    assert (best['video']['format_id'], best['audio'], best['cost']) == ('137', None, 0)
+
+
+def test_smallest_video_when_none_fits_the_limit(formats):
+    assert pick(formats, 144) == '18'
+    assert rank_candidates(formats, 144)[-1]['height'] == 2160
+
+
+def test_drm_formats_are_skipped(formats):
+    for fmt in formats:
+        if fmt['format_id'] == '137':
+            fmt['has_drm'] = True
+    assert pick(formats, 1080) == '248+140'
+
+
+def test_audio_only_source():
+    formats = copy.deepcopy(TABLES['youtube_music']['formats'])
+    ranked = rank_candidates(formats, 1080)
+
+    assert [(c['video'], c['audio']['format_id'], c['cost']) for c in ranked] == [
+        (None, '140', 0), (None, '139', 0), (None, '251', AUDIO_TRANSCODE_COST), (None, '249', AUDIO_TRANSCODE_COST)]
+
+
+def test_formats_without_codec_fields():
+    formats = copy.deepcopy(TABLES['generic_video']['formats'])
+
+    # Quality first, even though the WebM of unknown codecs needs transcoding
+    assert pick(formats) == 'http-1080'
+    assert rank_candidates(formats)[0]['cost'] == VIDEO_TRANSCODE_COST + AUDIO_TRANSCODE_COST
+    # MP4 files of unknown codecs are trusted; the direct download wins
+    assert pick(formats, 720) == 'http-720'
+
+
+# ====================================================================
+# yt-dlp Format Selector
+# ====================================================================
+
+def test_selector_merges_the_best_pair(formats):
+    selected = list(CompatibleFormatSelector(max_height=1080)({'formats': formats}))
+
+    assert len(selected) == 1
+    assert selected[0]['format_id'] == '137+140'
+    assert [fmt['format_id'] for fmt in selected[0]['requested_formats']] == ['137', '140']
+    assert (selected[0]['ext'], selected[0]['height'], selected[0]['acodec']) == ('mp4', 1080, 'mp4a.40.2')
+
+
+def test_selector_yields_single_formats_as_they_are():
+    music = copy.deepcopy(TABLES['youtube_music']['formats'])
+    generic = copy.deepcopy(TABLES['generic_video']['formats'])
+
+    assert list(CompatibleFormatSelector()({'formats': music})) == [music[2]]
+    assert list(CompatibleFormatSelector(720)({'formats': generic})) == [generic[1]]
+    assert list(CompatibleFormatSelector()({'formats': []})) == []
+
+
+def test_selector_survives_pickling():
+    selector = pickle.loads(pickle.dumps(CompatibleFormatSelector(720, 'mkv')))
+    assert repr(selector) == "CompatibleFormatSelector(max_height=720, container='mkv')"
+
+
+def test_selector_as_yt_dlp_format_option():
+    info = dict(copy.deepcopy(TABLES['youtube_video']), extractor='youtube', extractor_key='Youtube',
+                webpage_url='https://www.youtube.com/watch?v=aqz-KE-bpKQ')
+    with YoutubeDL({'format': CompatibleFormatSelector(1080), 'quiet': True, 'simulate': True}) as ydl:
+        info = ydl.process_ie_result(info, download=False)
+
+    assert info['format_id'] == '137+140'
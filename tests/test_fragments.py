@@ -0,0 +1,68 @@
+"""Tests for the fragment connection budget"""
+
+import pytest
+
+from fragments import FragmentBudget, parse_fragments
+
+
+@pytest.mark.parametrize('value, expected', [('auto', None), (' AUTO ', None), ('4', 4), ('1', 1)])
+def test_parse_fragments(value, expected):
+    assert parse_fragments(value) == expected
+
+
+@pytest.mark.parametrize('value', ['0', '-2', 'many', ''])
+def test_parse_fragments_rejects_bad_values(value):
+    with pytest.raises(ValueError):
+        parse_fragments(value)
+
+
+def test_fixed_mode_ignores_the_budget():
+    budget = FragmentBudget(fixed=5, budget=8)
+
+    assert [budget.acquire() for _ in range(3)] == [5, 5, 5]
+    assert budget.in_use == 15
+
+
+def test_auto_mode_shares_the_budget_between_expected_jobs():
+    budget = FragmentBudget(budget=16, max_per_job=8, expected_jobs=4)
+
+    assert [budget.acquire() for _ in range(4)] == [4, 4, 4, 4]
+    # Budget used up: later jobs still get one connection each
+    assert budget.acquire() == 1
+    assert budget.peak == 17
+
+
+def test_auto_mode_caps_a_single_job():
+    budget = FragmentBudget(budget=16, max_per_job=6, expected_jobs=1)
+
+    assert budget.acquire() == 6
+    assert budget.acquire() == 6
+    # Fair share of three jobs is 5, but only 4 connections are left
+    assert budget.acquire() == 4
+
+
+def test_released_connections_return_to_the_budget():
+    budget = FragmentBudget(budget=8, max_per_job=8, expected_jobs=2)
+    first = budget.acquire()
+    with budget.job() as second:
+        assert (first, second) == (4, 4)
+        assert budget.in_use == 8
+    assert budget.in_use == 4
+
+    budget.release(first)
+    assert budget.in_use == 0
+    assert budget.acquire() == 4
+    assert budget.peak == 8
+
+
+def test_job_releases_after_a_failed_download():
+    budget = FragmentBudget(budget=8)
+    with pytest.raises(RuntimeError):
+        with budget.job():
+            raise RuntimeError('download failed')
+    assert budget.in_use == 0
+
+
+def test_describe():
+    assert FragmentBudget(fixed=3).describe() == '3 per video'
+    assert FragmentBudget(budget=12, max_per_job=4).describe() == 'auto (up to 4 per video, 12 connections in total)'
@@ -0,0 +1,198 @@
+"""Tests for the persistent metadata cache"""
+
+import time
+import threading
+
+import pytest
+
+from metadata_cache import MetadataCache, SingleFlight, TTLCache, canonicalize_url, trim_info
+
+
+# ====================================================================
+# URL Canonicalization
+# ====================================================================
+
+@pytest.mark.parametrize('url', [
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://m.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://youtube.com/watch?v=dQw4w9WgXcQ&feature=share&t=42',
+    'https://youtu.be/dQw4w9WgXcQ',
+    'https://youtu.be/dQw4w9WgXcQ/',
+    '  https://www.youtube.com/watch?v=dQw4w9WgXcQ  ',
+])
+def test_canonicalize_url_aliases(url):
+    assert canonicalize_url(url) == 'https://youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+def test_canonicalize_url_keeps_list_before_video():
+    url = 'https://www.youtube.com/watch?v=abc&list=PL123&index=4'
+    assert canonicalize_url(url) == 'https://youtube.com/watch?list=PL123&v=abc'
+
+
+def test_canonicalize_url_strips_trailing_slash():
+    assert canonicalize_url('https://www.youtube.com/@channel/videos/') == \
+        'https://youtube.com/@channel/videos'
+
+
+def test_trim_info_drops_unknown_and_nested_keys():
+    info = {'id': 'abc', 'title': 'T', 'formats': [{'format_id': '18'}],
+            'thumbnails': [], 'duration': 12.5, 'uploader': None}
+    assert trim_info(info) == {'id': 'abc', 'title': 'T', 'duration': 12.5, 'uploader': None}
+    assert trim_info(None) == {}
+
+
+# ====================================================================
+# Persistent Cache
+# ====================================================================
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.delenv('YTDP_NO_CACHE', raising=False)
+    return MetadataCache(path=str(tmp_path / 'metadata.sqlite3'))
+
+
+def test_round_trip_shared_by_aliases(cache):
+    cache.put('https://youtu.be/abc', 'video', {'id': 'abc', 'title': 'T', 'formats': []})
+
+    assert cache.get('https://www.youtube.com/watch?v=abc') == ('video', {'id': 'abc', 'title': 'T'})
+    assert cache.get('https://youtube.com/watch?v=other') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_expired_entries_are_misses(cache, monkeypatch):
+    cache.put('https://youtube.com/@chan', 'channel', {'id': 'chan'})
+    later = time.time() + cache.ttls['channel'] + 1
+    monkeypatch.setattr(time, 'time', lambda: later)
+
+    assert cache.get('https://youtube.com/@chan') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.delenv('YTDP_NO_CACHE', raising=False)
+    cache = MetadataCache(path=str(tmp_path / 'metadata.sqlite3'), max_bytes=250)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(time, 'time', lambda: next(clock))
+
+    cache.put('https://youtube.com/watch?v=a', 'video', {'id': 'a', 'title': 'x' * 40})
+    cache.put('https://youtube.com/watch?v=b', 'video', {'id': 'b', 'title': 'x' * 40})
+    cache.get('https://youtube.com/watch?v=a')
+    cache.put('https://youtube.com/watch?v=c', 'video', {'id': 'c', 'title': 'x' * 40})
+
+    assert cache.evictions == 1
+    assert cache.get('https://youtube.com/watch?v=b') is None
+    assert cache.get('https://youtube.com/watch?v=a') is not None
+    assert cache.get('https://youtube.com/watch?v=c') is not None
+
+
+def test_disabled_cache_only_counts_misses(tmp_path):
+    cache = MetadataCache(path=str(tmp_path / 'metadata.sqlite3'), enabled=False)
+    cache.put('https://youtube.com/watch?v=a', 'video', {'id': 'a'})
+
+    assert cache.get('https://youtube.com/watch?v=a') is None
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'evictions': 0, 'entries': 0, 'bytes': 0}
+    assert not (tmp_path / 'metadata.sqlite3').exists()
+
+
+# ====================================================================
+# Single-Flight Request Coalescing
+# ====================================================================
+
+def test_single_flight_coalesces_concurrent_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def lookup(url):
+        calls.append(url)
+        started.set()
+        release.wait(5)
+        return {'url': url}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', lookup, 'u')))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', lookup, 'u')))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()['coalesced'] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == ['u']
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    assert flight.do('k', lookup, 'u') is results[0]
+    assert flight.stats() == {'executions': 1, 'coalesced': 3, 'hits': 1}
+
+
+def test_single_flight_does_not_memoize_errors():
+    flight = SingleFlight()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('network down')
+        return 'ok'
+
+    with pytest.raises(RuntimeError):
+        flight.do('k', flaky)
+    assert flight.do('k', flaky) == 'ok'
+    assert flight.stats()['executions'] == 2
+
+
+def test_single_flight_lru_bound():
+    flight = SingleFlight(maxsize=2)
+    for key in 'abc':
+        flight.do(key, str.upper, key)
+    flight.do('a', str.upper, 'a')
+
+    assert flight.stats() == {'executions': 4, 'coalesced': 0, 'hits': 0}
+
+
+# ====================================================================
+# Short-Lived In-Memory Cache
+# ====================================================================
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(ttl=60)
+    cache.put('video', {'formats': []})
+
+    clock[0] += 60
+    assert cache.get('video') == {'formats': []}
+    clock[0] += 1
+    assert cache.get('video') is None
+
+
+def test_ttl_cache_pop_removes_fresh_entries_only_once(clock):
+    cache = TTLCache(ttl=60)
+    cache.put('fresh', 1)
+    cache.put('stale', 2)
+    clock[0] += 30
+    cache.put('fresh', 3)
+    clock[0] += 40
+
+    assert cache.pop('stale') is None
+    assert cache.pop('fresh') == 3
+    assert cache.pop('fresh') is None
+
+
+def test_ttl_cache_drops_oldest_when_full(clock):
+    cache = TTLCache(ttl=60, maxsize=2)
+    for key in 'abc':
+        cache.put(key, key)
+
+    assert [cache.get(key) for key in 'abc'] == [None, 'b', 'c']
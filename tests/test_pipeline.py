@@ -0,0 +1,89 @@
+"""Tests for the download / post-processing pipeline"""
+
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import pipeline
+from pipeline import PipelinedYoutubeDL, PostProcessPool, deferred_result, when_all_done
+
+
+def test_when_all_done_fires_once_after_the_last_future():
+    futures = [Future() for _ in range(3)]
+    calls = []
+    when_all_done(futures, lambda: calls.append(True))
+
+    futures[0].set_result(None)
+    futures[2].set_exception(RuntimeError('ffmpeg failed'))
+    assert calls == []
+    futures[1].set_result(None)
+    assert calls == [True]
+
+
+def test_when_all_done_with_finished_or_no_futures():
+    calls = []
+    when_all_done([], lambda: calls.append('empty'))
+    done = Future()
+    done.set_result(None)
+    when_all_done([done], lambda: calls.append('done'))
+
+    assert calls == ['empty', 'done']
+
+
+def test_deferred_result():
+    class Downloader:
+        post_process_jobs = []
+
+    ydl = Downloader()
+    assert deferred_result(ydl, lambda: {'success': True}) == {'success': True}
+
+    ydl.post_process_jobs = [Future()]
+    result = deferred_result(ydl, lambda: {'success': True})
+    assert result['post_processing'] == ydl.post_process_jobs
+    assert result['finish']() == {'success': True}
+
+
+def test_post_process_pool_resolves_futures_and_counts(monkeypatch):
+    processed = []
+
+    def fake_post_processing(ydl, filename, info, files_to_move=None):
+        if filename == 'broken.webm':
+            raise RuntimeError('Postprocessing: Conversion failed!')
+        processed.append((filename, threading.current_thread().name))
+        return dict(info, filepath=filename)
+
+    monkeypatch.setattr(pipeline, 'run_post_processing', fake_post_processing)
+    pool = PostProcessPool(max_workers=2)
+    good = pool.submit(None, 'a.webm', {'id': 'a'})
+    bad = pool.submit(None, 'broken.webm', {'id': 'b'})
+    pool.join()
+
+    assert good.result(timeout=5) is None
+    with pytest.raises(RuntimeError, match='Conversion failed'):
+        bad.result(timeout=5)
+    assert processed[0][0] == 'a.webm' and processed[0][1].startswith('postprocess-worker')
+    stats = pool.stats()
+    assert (stats['processed'], stats['failed']) == (1, 1)
+
+
+def test_pipelined_downloader_hands_over_a_copy_and_defers_post_hooks():
+    class Pool:
+        def __init__(self):
+            self.jobs = []
+
+        def submit(self, ydl, filename, info, files_to_move=None):
+            self.jobs.append((filename, info))
+            return Future()
+
+    hook_calls = []
+    pool = Pool()
+    ydl = PipelinedYoutubeDL({'quiet': True, 'post_hooks': [hook_calls.append]}, pool)
+    info = {'id': 'a', 'title': 'A'}
+    returned = ydl.post_process('a.mp4', info)
+
+    assert returned is info and info['filepath'] == 'a.mp4'
+    (filename, job_info), = pool.jobs
+    assert filename == 'a.mp4' and job_info == info and job_info is not info
+    assert ydl.post_process_jobs and hook_calls == []
+    assert ydl.deferred_post_hooks == [hook_calls.append]
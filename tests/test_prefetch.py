@@ -0,0 +1,79 @@
+"""Tests for playlist entry prefetching"""
+
+import time
+
+import pytest
+
+from prefetch import EntryPrefetcher, is_video_entry
+
+
+def video_entry(video_id):
+    return {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id,
+            'url': f'https://www.youtube.com/watch?v={video_id}'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def stub_extract(prefetcher, extracted, fail=(), fetched_at=1000.0):
+    def extract(entry):
+        extracted.append(entry['id'])
+        if entry['id'] in fail:
+            raise RuntimeError('extraction failed')
+        return fetched_at, {'id': entry['id'], 'title': entry['id'].upper(), 'formats': ['f']}
+    prefetcher._extract = extract
+
+
+def test_is_video_entry():
+    assert is_video_entry(video_entry('dQw4w9WgXcQ'))
+    assert is_video_entry({'_type': 'url', 'url': 'https://youtu.be/dQw4w9WgXcQ'})
+    assert not is_video_entry({'_type': 'url', 'ie_key': 'YoutubeTab', 'url': 'https://www.youtube.com/@x/videos'})
+    assert not is_video_entry({'_type': 'video', 'id': 'dQw4w9WgXcQ'})
+
+
+def test_order_skip_and_failures(clock):
+    prefetcher = EntryPrefetcher({'outtmpl': 'x', 'format': 'best'}, depth=2,
+                                 skip=lambda entry: entry['id'] == 'b')
+    extracted = []
+    stub_extract(prefetcher, extracted, fail={'c'})
+    entries = [video_entry(video_id) for video_id in 'abcd']
+
+    result = prefetcher.wrap(None, {'_type': 'playlist', 'entries': iter(entries)})
+    resolved = list(result['entries'])
+
+    assert 'outtmpl' not in prefetcher.ydl_opts and prefetcher.ydl_opts['format'] == 'best'
+    assert [entry['id'] for entry in resolved] == list('abcd')
+    # Skipped entries are never extracted; failed ones go back to yt-dlp as flat entries
+    assert sorted(extracted) == ['a', 'c', 'd']
+    assert resolved[0]['title'] == 'A'
+    assert resolved[1] is entries[1] and resolved[2] is entries[2]
+    assert prefetcher.prefetched == 2
+
+
+def test_expired_info_is_re_extracted(clock):
+    prefetcher = EntryPrefetcher({}, depth=1, max_age=60)
+    stub_extract(prefetcher, [])
+    entries = [video_entry('a'), video_entry('b')]
+    stream = prefetcher.wrap(None, {'_type': 'playlist', 'entries': iter(entries)})['entries']
+
+    first = next(stream)
+    assert prefetcher.is_fresh(first)
+    clock[0] += 61
+    assert not prefetcher.is_fresh(first)
+    assert next(stream) is entries[1]
+    assert prefetcher.expired == 1
+
+
+def test_finished_entries_are_slimmed(clock):
+    prefetcher = EntryPrefetcher({}, depth=1)
+    stub_extract(prefetcher, [])
+    stream = prefetcher.wrap(None, {'_type': 'playlist', 'entries': iter([video_entry('a'), video_entry('b')])})['entries']
+
+    first = next(stream)
+    assert 'formats' in first
+    next(stream)
+    assert 'formats' not in first and first['title'] == 'A'
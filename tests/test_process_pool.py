@@ -0,0 +1,70 @@
+"""Tests for the process-pool download mode"""
+
+import time
+
+import pytest
+
+from ffmpeg_manager import FFmpegManager
+from process_pool import ProcessDownloadPool
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool_factory():
+    pools = []
+
+    def create(**kwargs):
+        pool = ProcessDownloadPool(1, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield create
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_reader_forwards_progress_and_ffmpeg_jobs(pool_factory):
+    progress, errors = [], []
+    ffmpeg = FFmpegManager(max_processes=2, threads=1, report=None)
+    pool = pool_factory(ffmpeg=ffmpeg, on_progress=progress.append, on_error=errors.append)
+
+    channel = pool._channel
+    channel.put((101, 'progress', 'a.mp4.part', 'downloading', 500, 1000))
+    channel.put((101, 'error', 'ERROR: HTTP Error 429: Too Many Requests'))
+    channel.put((101, 'ffmpeg-start'))
+    channel.put((102, 'ffmpeg-start'))
+    wait_for(lambda: ffmpeg.running == 2)
+    channel.put((101, 'ffmpeg', {'output': 'a.mp4', 'seconds': 1.0, 'cpu_seconds': 2.0,
+                                 'waited': 0.0, 'threads': 1, 'returncode': 0}))
+    wait_for(lambda: ffmpeg.jobs)
+
+    assert progress == [{'status': 'downloading', 'tmpfilename': '101:a.mp4.part',
+                         'downloaded_bytes': 500, 'total_bytes': 1000}]
+    assert errors == ['ERROR: HTTP Error 429: Too Many Requests']
+    assert ffmpeg.running == 1 and ffmpeg.stats()['peak'] == 2
+
+
+def test_failed_download_in_worker_process(pool_factory, tmp_path):
+    errors = []
+    pool = pool_factory(on_error=errors.append)
+    result = pool.run({
+        'url': 'http://127.0.0.1:9/missing.mp4',
+        'title': 'Missing',
+        'entry': {'_type': 'url', 'url': 'http://127.0.0.1:9/missing.mp4', 'ie_key': 'Generic'},
+        'extra_info': {},
+        'ydl_opts': {'outtmpl': str(tmp_path / '%(title)s.%(ext)s'), 'retries': 0,
+                     'extractor_retries': 0, 'ignoreerrors': True},
+        'use_archive': False,
+        'thread_id': 1,
+    })
+
+    assert not result['success']
+    assert result['files'] == [] and result['video_id'] is None
+    assert 'Missing' in result['message']
+    wait_for(lambda: errors)
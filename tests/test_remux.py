@@ -0,0 +1,184 @@
+"""Tests for codec-aware MP4 finalization"""
+
+import os
+
+import pytest
+from yt_dlp.postprocessor.ffmpeg import FFmpegFixupM3u8PP, FFmpegMergerPP
+
+from remux import (FinalizingYoutubeDL, MergeFinalizePP, MP4FinalizePP, codec_family, describe_plan, plan_streams,
+                   selected_codecs)
+
+
+# ====================================================================
+# Stream Plan
+# ====================================================================
+
+@pytest.mark.parametrize('codec, expected', [
+    ('avc1.64001F', 'h264'),
+    ('hev1.1.6.L93.B0', 'hevc'),
+    ('av01.0.08M.08', 'av1'),
+    ('vp09.00.40.08', 'vp9'),
+    ('VP9', 'vp9'),
+    ('mp4a.40.2', 'aac'),
+    ('opus', 'opus'),
+    ('ec-3', 'eac3'),
+    ('theora', 'theora'),
+    ('none', 'none'),
+    ('', None),
+    (None, None),
+])
+def test_codec_family(codec, expected):
+    assert codec_family(codec) == expected
+
+
+def test_selected_codecs_of_merged_formats():
+    info = {'requested_formats': [
+        {'vcodec': 'vp09.00.40.08', 'acodec': 'none'},
+        {'vcodec': 'none', 'acodec': 'opus'},
+    ]}
+    assert selected_codecs(info) == ('vp9', 'opus')
+
+
+def test_selected_codecs_of_a_single_format():
+    assert selected_codecs({'vcodec': 'avc1.4d401f', 'acodec': 'mp4a.40.2'}) == ('h264', 'aac')
+    assert selected_codecs({'vcodec': 'none', 'acodec': 'opus'}) == ('none', 'opus')
+    assert selected_codecs({}) == (None, None)
+
+
+@pytest.mark.parametrize('vcodec, acodec, container, expected', [
+    # Compatible MP4: nothing to run
+    ('h264', 'aac', 'mp4', {'video': 'copy', 'audio': 'copy', 'remux': False}),
+    # Only the container is wrong
+    ('vp9', 'aac', 'webm', {'video': 'copy', 'audio': 'copy', 'remux': True}),
+    # Opus audio is transcoded while the video is copied
+    ('av1', 'opus', 'mp4', {'video': 'copy', 'audio': 'transcode', 'remux': True}),
+    ('vp8', 'vorbis', 'webm', {'video': 'transcode', 'audio': 'transcode', 'remux': True}),
+    # Missing streams
+    ('none', 'aac', 'm4a', {'video': None, 'audio': 'copy', 'remux': True}),
+    ('h264', 'none', 'mp4', {'video': 'copy', 'audio': None, 'remux': False}),
+    # Unknown codecs: trusted in an MP4, converted otherwise
+    (None, None, 'mp4', {'video': 'copy', 'audio': 'copy', 'remux': False}),
+    (None, None, 'mkv', {'video': 'transcode', 'audio': 'transcode', 'remux': True}),
+])
+def test_plan_streams(vcodec, acodec, container, expected):
+    assert plan_streams(vcodec, acodec, container) == expected
+
+
+def test_describe_plan():
+    plan = plan_streams('h264', 'opus', 'webm')
+    assert describe_plan(plan, 'h264', 'opus') == 'video h264: copy, audio opus: transcode'
+
+    plan = plan_streams(None, 'none', 'mkv')
+    assert describe_plan(plan, None, 'none') == 'video unknown: transcode'
+    assert describe_plan(plan_streams('none', 'none', 'mp4'), 'none', 'none') == 'no streams'
+
+
+# ====================================================================
+# Post-Processor
+# ====================================================================
+
+def test_codec_args_copy_what_they_can():
+    finalizer = MP4FinalizePP(audio_bitrate='128k')
+
+    assert finalizer._codec_args(plan_streams('vp9', 'opus', 'webm')) == [
+        '-dn', '-c:v', 'copy', '-c:a', 'aac', '-b:a', '128k']
+    assert finalizer._codec_args(plan_streams('vp8', 'aac', 'webm')) == [
+        '-dn', '-c:v', 'libx264', '-c:a', 'copy']
+    assert finalizer._codec_args(plan_streams('none', 'aac', 'm4a')) == ['-dn', '-c:a', 'copy']
+
+
+def test_compatible_mp4_is_left_alone():
+    finalizer = MP4FinalizePP()
+    info = {'filepath': 'video.mp4', 'ext': 'mp4', 'vcodec': 'avc1.64001F', 'acodec': 'mp4a.40.2'}
+
+    assert finalizer.run(info) == ([], info)
+    assert info['filepath'] == 'video.mp4'
+
+
+def test_already_merged_file_is_not_converted_again():
+    finalizer = MP4FinalizePP()
+    info = {'filepath': 'video.mp4', 'ext': 'mp4', '__mp4_finalized': True}
+
+    assert finalizer.run(info) == ([], {'filepath': 'video.mp4', 'ext': 'mp4'})
+
+
+# ====================================================================
+# Post-Processing Plan
+# ====================================================================
+
+@pytest.fixture
+def finalizing_ydl():
+    return FinalizingYoutubeDL({'quiet': True, 'finalize_mp4': {'audio_bitrate': '160k'}})
+
+
+def merge_info(ydl, vcodec, acodec, fixup=False):
+    steps = [FFmpegMergerPP(ydl)]
+    if fixup:
+        steps.append(FFmpegFixupM3u8PP(ydl))
+    return {
+        'ext': 'mp4',
+        'vcodec': vcodec,
+        'acodec': acodec,
+        'requested_formats': [
+            {'format_id': '248', 'vcodec': vcodec, 'acodec': 'none', 'protocol': 'https', 'filepath': 'v.f248.webm'},
+            {'format_id': '251', 'vcodec': 'none', 'acodec': acodec, 'protocol': 'https', 'filepath': 'v.f251.webm'},
+        ],
+        '__files_to_merge': ['v.f248.webm', 'v.f251.webm'],
+        '__postprocessors': steps,
+    }
+
+
+def test_merge_with_transcoding_becomes_one_run(finalizing_ydl):
+    info = merge_info(finalizing_ydl, 'vp09.00.40.08', 'opus', fixup=True)
+    finalizing_ydl.plan_post_processing(info)
+
+    steps = info['__postprocessors']
+    assert [type(pp) for pp in steps] == [MergeFinalizePP, FFmpegFixupM3u8PP]
+    assert steps[0].plan == {'video': 'copy', 'audio': 'transcode', 'remux': True}
+    assert steps[0].audio_bitrate == '160k'
+
+
+def test_merge_without_transcoding_keeps_the_merger(finalizing_ydl):
+    info = merge_info(finalizing_ydl, 'vp09.00.40.08', 'mp4a.40.2')
+    finalizing_ydl.plan_post_processing(info)
+
+    assert [type(pp) for pp in info['__postprocessors']] == [FFmpegMergerPP]
+
+
+def test_single_file_is_left_to_the_finalizer(finalizing_ydl):
+    info = {'ext': 'webm', 'vcodec': 'vp9', 'acodec': 'opus', '__postprocessors': []}
+    finalizing_ydl.plan_post_processing(info)
+
+    assert info['__postprocessors'] == []
+
+
+def test_no_plan_without_the_finalizer():
+    ydl = FinalizingYoutubeDL({'quiet': True})
+    info = merge_info(ydl, 'vp09.00.40.08', 'opus')
+    ydl.plan_post_processing(info)
+
+    assert [type(pp) for pp in info['__postprocessors']] == [FFmpegMergerPP]
+
+
+def test_merge_finalize_runs_ffmpeg_once(finalizing_ydl, monkeypatch, tmp_path):
+    info = merge_info(finalizing_ydl, 'vp09.00.40.08', 'opus')
+    finalizing_ydl.plan_post_processing(info)
+    merger = info['__postprocessors'][0]
+    runs = []
+
+    def run_ffmpeg_multiple_files(inputs, output, args):
+        runs.append((inputs, args))
+        open(output, 'w').close()
+
+    monkeypatch.setattr(merger, 'run_ffmpeg_multiple_files', run_ffmpeg_multiple_files)
+    info['filepath'] = str(tmp_path / 'v.mp4')
+    files_to_delete, info = merger.run(info)
+
+    assert runs == [(['v.f248.webm', 'v.f251.webm'],
+                     ['-map', '0:v:0', '-map', '1:a:0', '-dn', '-c:v', 'copy', '-c:a', 'aac', '-b:a', '160k'])]
+    assert files_to_delete == ['v.f248.webm', 'v.f251.webm']
+    assert (info['ext'], info['acodec'], info['vcodec']) == ('mp4', 'mp4a.40.2', 'vp09.00.40.08')
+    assert os.path.exists(info['filepath'])
+
+    # The finalizer step afterwards has nothing left to do
+    assert MP4FinalizePP(finalizing_ydl).run(info) == ([], info)
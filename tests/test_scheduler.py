@@ -0,0 +1,229 @@
+"""Tests for the shared work queue and collection expansion"""
+
+import threading
+import time
+
+import pytest
+
+from scheduler import (DEFAULT_BYTES_PER_SECOND, TaskPriority, WorkQueue, estimate_duration, estimate_size,
+                       interleave, iter_collection_entries, playlist_entry_info, simulate_schedule)
+
+
+def join_within(work_queue, tasks=(), timeout=5):
+    """Submit tasks and join() the queue, failing the test instead of hanging"""
+    def submit_and_join():
+        for task in tasks:
+            work_queue.submit(task)
+        work_queue.join()
+
+    thread = threading.Thread(target=submit_and_join, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'WorkQueue.join() hung'
+
+
+# ====================================================================
+# Collection Expansion
+# ====================================================================
+
+def video(video_id):
+    return {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id, 'url': f'https://youtu.be/{video_id}'}
+
+
+def test_iter_collection_entries_descends_into_tabs_and_stops_per_tab():
+    videos_tab = {'_type': 'playlist', 'id': 'videos', 'entries': [video('a'), video('b'), video('c')]}
+    shorts_tab = {'_type': 'playlist', 'id': 'shorts', 'entries': [video('d'), None, video('e')]}
+    channel = {'_type': 'playlist', 'id': 'chan', 'entries': [videos_tab, shorts_tab]}
+
+    walked = [(entry['id'], playlist['id'], index) for entry, playlist, index in
+              iter_collection_entries(None, channel, stop=lambda entry: entry['id'] == 'b')]
+
+    assert walked == [('a', 'videos', 1), ('d', 'shorts', 1), ('e', 'shorts', 3)]
+
+
+def test_iter_collection_entries_closes_lazy_entries():
+    closed = []
+
+    def entries():
+        try:
+            yield video('a')
+            yield video('b')
+        finally:
+            closed.append(True)
+
+    walk = iter_collection_entries(None, {'_type': 'playlist', 'entries': entries()})
+    next(walk)
+    walk.close()
+    assert closed == [True]
+
+
+def test_playlist_entry_info_pads_to_playlist_count():
+    info = playlist_entry_info({'id': 'PL1', 'title': 'Mix', 'playlist_count': 120}, 7)
+
+    assert info['playlist'] == 'Mix'
+    assert info['playlist_index'] == 7
+    assert info['n_entries'] == info['__last_playlist_index'] == 120
+
+
+def test_playlist_entry_info_falls_back_to_number_of_entries():
+    playlist = {'id': 'PL1', 'entries': [video(str(n)) for n in range(12)]}
+
+    assert playlist_entry_info(playlist, 3)['__last_playlist_index'] == 12
+    assert playlist_entry_info({'id': 'PL1', 'entries': iter([])}, 3)['__last_playlist_index'] == 0
+
+
+def test_interleave_alternates_and_drops_failed_iterators():
+    def broken():
+        yield 'x1'
+        raise RuntimeError('listing failed')
+
+    errors = []
+    items = list(interleave({'a': iter(['a1', 'a2', 'a3']), 'b': broken(), 'c': iter(['c1'])},
+                            on_error=lambda key, e: errors.append(key)))
+
+    assert items == [('a', 'a1'), ('b', 'x1'), ('c', 'c1'), ('a', 'a2'), ('a', 'a3')]
+    assert errors == ['b']
+
+
+# ====================================================================
+# Work Queue
+# ====================================================================
+
+def test_work_queue_runs_every_task_and_reports_failures():
+    results = {}
+    lock = threading.Lock()
+
+    def worker(task, worker_id):
+        assert 1 <= worker_id <= 3
+        if task == 3:
+            raise ValueError('bad task')
+        return task * 10
+
+    def on_result(task, result):
+        with lock:
+            results[task] = result
+
+    work_queue = WorkQueue(worker, max_workers=3, on_result=on_result)
+    join_within(work_queue, range(10))
+
+    assert isinstance(results.pop(3), ValueError)
+    assert results == {task: task * 10 for task in range(10) if task != 3}
+
+
+def test_failing_result_handler_does_not_kill_workers(capsys):
+    finished = []
+
+    def on_result(task, result):
+        if task < 4:
+            raise RuntimeError('handler bug')
+        finished.append(task)
+
+    work_queue = WorkQueue(lambda task, worker_id: task, max_workers=2, max_pending=1, on_result=on_result)
+    join_within(work_queue, range(8))
+
+    assert sorted(finished) == [4, 5, 6, 7]
+    assert capsys.readouterr().out.count('Result handler failed') == 4
+
+
+def test_set_limit_bounds_running_workers():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker(task, worker_id):
+        with lock:
+            running.append(task)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(task)
+
+    work_queue = WorkQueue(worker, max_workers=4, max_pending=16)
+    work_queue.set_limit(2)
+    assert work_queue.limit == 2
+    join_within(work_queue, range(12))
+
+    assert max(peak) <= 2
+
+
+def test_priority_orders_queued_tasks():
+    order = []
+    gate = threading.Event()
+
+    def worker(task, worker_id):
+        gate.wait(5)
+        order.append(task)
+
+    work_queue = WorkQueue(worker, max_workers=1, max_pending=10, priority=lambda task: (task,))
+    work_queue.submit(5)
+    # The only worker is busy with the first task while the rest queue up
+    while work_queue._queue.qsize():
+        time.sleep(0.001)
+    for task in (9, 1, 7, 3):
+        work_queue.submit(task)
+    gate.set()
+    join_within(work_queue)
+
+    assert order == [5, 1, 3, 7, 9]
+
+
+@pytest.mark.parametrize('limit, expected', [(0, 1), (3, 3), (99, 4)])
+def test_set_limit_is_clamped(limit, expected):
+    work_queue = WorkQueue(lambda task, worker_id: None, max_workers=4)
+    work_queue.set_limit(limit)
+    assert work_queue.limit == expected
+    join_within(work_queue)
+
+
+# ====================================================================
+# Scheduling Policies
+# ====================================================================
+
+def entry_task(source, duration=None, filesize=None):
+    return {'source_url': source, 'entry': {'duration': duration, 'filesize': filesize}}
+
+
+def test_estimates_from_partial_metadata():
+    assert estimate_duration({'duration': 90}) == 90.0
+    assert estimate_duration({'duration': 0}) is None
+    assert estimate_duration(None) is None
+    assert estimate_size({'filesize_approx': 1000}) == 1000.0
+    assert estimate_size({'duration': 10, 'tbr': 800}) == 10 * 800 * 125
+    assert estimate_size({'duration': 10}) == 10 * DEFAULT_BYTES_PER_SECOND
+    assert estimate_size({}) is None
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match='Unknown scheduling policy'):
+        TaskPriority('fastest')
+
+
+@pytest.mark.parametrize('policy, expected', [
+    ('input', [0, 1, 2, 3]),
+    ('shortest', [2, 0, 1, 3]),
+    ('largest', [1, 0, 2, 3]),
+])
+def test_policy_order(policy, expected):
+    tasks = [entry_task('p', duration=300), entry_task('p', duration=3600),
+             entry_task('p', duration=30), entry_task('p')]
+    priority = TaskPriority(policy)
+    order = sorted(range(len(tasks)), key=lambda index: (priority(tasks[index]), index))
+    assert order == expected
+
+
+def test_round_robin_alternates_sources():
+    priority = TaskPriority('round-robin')
+    tasks = [entry_task('a'), entry_task('a'), entry_task('a'), entry_task('b'), entry_task('c')]
+    keys = [priority(task) for task in tasks]
+    order = sorted(range(len(tasks)), key=lambda index: (keys[index], index))
+    assert [tasks[index]['source_url'] for index in order] == ['a', 'b', 'c', 'a', 'a']
+
+
+def test_simulate_schedule_largest_first_shortens_the_tail():
+    jobs = [{'task': entry_task('p', duration=seconds), 'seconds': seconds} for seconds in (1, 1, 1, 1, 4)]
+
+    assert simulate_schedule(jobs, 2, 'input')['wall_time'] == 6
+    assert simulate_schedule(jobs, 2, 'largest')['wall_time'] == 4
+    shortest = simulate_schedule(jobs, 2, 'shortest')
+    assert shortest['first_result'] == 1
+    assert simulate_schedule([], 2, 'input') == {'wall_time': 0.0, 'first_result': 0.0, 'mean_completion': 0.0}
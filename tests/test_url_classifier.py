@@ -0,0 +1,49 @@
+"""Tests for the offline URL classifier"""
+
+import pytest
+
+from url_classifier import classify_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    # Videos
+    ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'video'),
+    ('https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=1', 'video'),
+    ('youtube.com/watch?v=dQw4w9WgXcQ', 'video'),
+    ('https://youtu.be/dQw4w9WgXcQ?si=abcdef', 'video'),
+    ('https://m.youtube.com/shorts/dQw4w9WgXcQ', 'video'),
+    ('https://www.youtube.com/embed/dQw4w9WgXcQ', 'video'),
+    ('https://www.youtube.com/live/dQw4w9WgXcQ', 'video'),
+    # Playlists
+    ('https://www.youtube.com/playlist?list=PLabcdefghijk', 'playlist'),
+    ('https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabcdefghijk', 'playlist'),
+    ('https://youtu.be/dQw4w9WgXcQ?list=OLAK5uy_abcdef', 'playlist'),
+    ('https://music.youtube.com/playlist?list=UUabcdefghijk', 'playlist'),
+    # Channels
+    ('https://www.youtube.com/@someone', 'channel'),
+    ('https://www.youtube.com/@someone/videos/', 'channel'),
+    ('https://www.youtube.com/channel/UCabcdefghijklmnopqrstuv', 'channel'),
+    ('https://www.youtube.com/c/someone/playlists', 'channel'),
+    ('https://www.youtube.com/user/someone', 'channel'),
+])
+def test_unambiguous_urls(url, expected):
+    assert classify_url(url) == expected
+
+
+@pytest.mark.parametrize('url', [
+    # Mixes, Watch Later and Liked next to a video don't resolve to the list
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=RDdQw4w9WgXcQ',
+    'https://youtu.be/dQw4w9WgXcQ?list=LL',
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=WL',
+    # The live tab redirects to the current stream
+    'https://www.youtube.com/@someone/live',
+    # Malformed or unknown shapes
+    'https://www.youtube.com/watch?v=short',
+    'https://www.youtube.com/playlist',
+    'https://www.youtube.com/results?search_query=cats',
+    'https://youtu.be/',
+    'https://vimeo.com/123456',
+    '',
+])
+def test_ambiguous_urls_need_yt_dlp(url):
+    assert classify_url(url) is None
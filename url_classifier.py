@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Offline URL Classifier
+======================
+
+Classifies YouTube URLs as video, playlist or channel from the URL shape alone,
+without any network access. Used as a fast path in front of yt-dlp.
+
+Features:
+- Precompiled regular expressions, no URL parsing library overhead
+- Returns None for ambiguous shapes (e.g. watch?v=...&list=RD... mixes)
+  so the caller can fall back to yt-dlp
+- Built-in throughput benchmark: python url_classifier.py --benchmark
+
+Author: AdemCE-eng
+License: MIT License
+"""
+
+import re
+import sys
+import time
+from typing import Optional, List
+
+
+# ====================================================================
+# URL Patterns
+# ====================================================================
+
+_URL_RE = re.compile(
+    r'^(?:https?://)?(?:(?:www|m|music)\.)?(?P<host>youtube\.com|youtu\.be)'
+    r'(?P<path>/[^?#]*)?(?:\?(?P<query>[^#]*))?', re.IGNORECASE)
+
+# /@handle, /channel/UC..., /c/name, /user/name with an optional listing tab.
+# The /live tab is excluded on purpose: it redirects to the current stream.
+_CHANNEL_PATH_RE = re.compile(
+    r'^/(?:@[^/]+|channel/UC[\w-]{22}|c/[^/]+|user/[^/]+)'
+    r'(?:/(?:featured|videos|shorts|streams|playlists|community|about|releases|podcasts))?/?$')
+
+_VIDEO_PATH_RE = re.compile(r'^/(?:shorts|live|embed|v)/[\w-]{11}/?$')
+_SHORT_LINK_PATH_RE = re.compile(r'^/[\w-]{11}/?$')
+
+_VIDEO_PARAM_RE = re.compile(r'(?:^|&)v=[\w-]{11}(?:&|$)')
+_LIST_PARAM_RE = re.compile(r'(?:^|&)list=([\w-]+)')
+
+# Regular, album and uploads playlists always resolve to the playlist itself.
+# Mixes (RD...), Watch Later/Liked (WL, LL) and other special lists do not.
+_STABLE_LIST_RE = re.compile(r'^(?:PL|OLAK5uy_|UU|FL)[\w-]+$')
+
+
+# ====================================================================
+# Classification
+# ====================================================================
+
+def classify_url(url: str) -> Optional[str]:
+    """
+    Classify a YouTube URL from its shape, with zero network I/O.
+
+    Args:
+        url (str): YouTube URL to classify
+
+    Returns:
+        Optional[str]: 'video', 'playlist', 'channel', or None if the URL
+        is ambiguous and needs yt-dlp to decide
+    """
+    match = _URL_RE.match(url.strip())
+    if not match:
+        return None
+
+    path = match.group('path') or '/'
+    query = match.group('query') or ''
+    list_match = _LIST_PARAM_RE.search(query)
+
+    if match.group('host').lower() == 'youtu.be':
+        if not _SHORT_LINK_PATH_RE.match(path):
+            return None
+        if list_match:
+            return 'playlist' if _STABLE_LIST_RE.match(list_match.group(1)) else None
+        return 'video'
+
+    if path == '/watch':
+        if list_match:
+            return 'playlist' if _STABLE_LIST_RE.match(list_match.group(1)) else None
+        return 'video' if _VIDEO_PARAM_RE.search(query) else None
+
+    if path == '/playlist':
+        return 'playlist' if list_match else None
+
+    if _VIDEO_PATH_RE.match(path):
+        return 'video'
+
+    if _CHANNEL_PATH_RE.match(path):
+        return 'channel'
+
+    return None
+
+
+# ====================================================================
+# Benchmark
+# ====================================================================
+
+def _benchmark_urls(count: int) -> List[str]:
+    """Build a list of mixed URL shapes for benchmarking"""
+    shapes = [
+        'https://www.youtube.com/watch?v={id}',
+        'https://youtu.be/{id}?si=abcdef',
+        'https://www.youtube.com/playlist?list=PL{id}{id}',
+        'https://www.youtube.com/@channel{n}/videos',
+        'https://www.youtube.com/channel/UC{id}{id}',
+        'https://www.youtube.com/watch?v={id}&list=RD{id}',
+        'https://m.youtube.com/shorts/{id}',
+        'https://www.youtube.com/user/someone{n}',
+    ]
+    urls = []
+    for n in range(count):
+        video_id = f'{n:011d}'[-11:]
+        urls.append(shapes[n % len(shapes)].format(id=video_id, n=n))
+    return urls
+
+
+def benchmark(count: int = 1_000_000) -> None:
+    """
+    Measure classification throughput on a synthetic URL list.
+
+    Args:
+        count (int): Number of URLs to classify
+    """
+    urls = _benchmark_urls(count)
+
+    start = time.perf_counter()
+    ambiguous = sum(1 for url in urls if classify_url(url) is None)
+    elapsed = time.perf_counter() - start
+
+    batch = urls[:500]
+    batch_start = time.perf_counter()
+    for url in batch:
+        classify_url(url)
+    batch_elapsed = time.perf_counter() - batch_start
+
+    print(f"🔍 Classified {count:,} URLs in {elapsed:.2f}s "
+          f"({count / elapsed:,.0f} URLs/s, {ambiguous:,} ambiguous)")
+    print(f"📋 500-URL batch: {batch_elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000)
+    else:
+        for line in sys.stdin:
+            if line.strip():
+                print(f"{classify_url(line) or 'ambiguous'}\t{line.strip()}")